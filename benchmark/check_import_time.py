@@ -0,0 +1,96 @@
+'''
+시작 시간(import 시간) 예산 확인
+메인 스크립트를 새 인터프리터에서 여러 번 import해서 중앙값을 재고,
+selenium/Gemini 등 무거운 라이브러리가 import 시점에 로드되지 않는지 확인한다
+
+사용 예:
+    python benchmark/check_import_time.py
+    python benchmark/check_import_time.py --budget-ms 200 --runs 10
+'''
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+MODULE_NAME = 'tistory_auto_posting_selenium_sheet'
+
+# import 시점에 로드되면 안 되는 모듈 (각 단계 함수 안에서만 import)
+LAZY_MODULES = ['selenium', 'googleapiclient', 'google.generativeai', 'google.api_core',
+                'markdown2', 'requests', 'psutil', 'httplib2', 'google.auth']
+
+CHILD_SCRIPT = f"""
+import sys, json, time
+sys.path.insert(0, {REPO_DIR!r})
+started = time.perf_counter()
+import {MODULE_NAME}
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{'elapsed_ms': elapsed_ms, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def parse_args():
+    """명령행 인자 처리"""
+    parser = argparse.ArgumentParser(description='메인 스크립트 import 시간 예산 확인')
+    parser.add_argument('--budget-ms', type=float, default=250, help='import 시간 중앙값 예산(ms) (기본값: 250)')
+    parser.add_argument('--runs', type=int, default=5, help='측정 횟수 (기본값: 5)')
+    parser.add_argument('--top', type=int, default=10, help='오래 걸린 import 상위 개수 (기본값: 10)')
+    return parser.parse_args()
+
+
+def run_child(work_dir, importtime=False):
+    """새 인터프리터에서 메인 스크립트를 import하고 (결과, stderr) 반환"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CHILD_SCRIPT]
+    completed = subprocess.run(command, cwd=work_dir, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(importtime_output, top):
+    """-X importtime 출력에서 누적 시간이 긴 최상위 import 목록"""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        # 들여쓰기가 없는 항목만 (하위 import는 상위 항목 누적 시간에 포함됨)
+        if name == name.lstrip():
+            rows.append((int(cumulative) / 1000, name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix='tistory_import_')
+
+    # 첫 실행은 .pyc 생성이 포함되므로 측정에서 제외하고 import 상세 내역만 확인
+    _, importtime_output = run_child(work_dir, importtime=True)
+    results = [run_child(work_dir)[0] for _ in range(args.runs)]
+
+    timings = sorted(result['elapsed_ms'] for result in results)
+    median = timings[len(timings) // 2]
+    loaded = sorted({module for result in results for module in result['loaded']})
+
+    print(f"=== {MODULE_NAME} import 시간 ({args.runs}회) ===")
+    print(f"중앙값 {median:.1f}ms, 최소 {timings[0]:.1f}ms, 최대 {timings[-1]:.1f}ms (예산 {args.budget_ms:.0f}ms)")
+    print("\n오래 걸린 import:")
+    for elapsed_ms, name in slowest_imports(importtime_output, args.top):
+        print(f"  {elapsed_ms:8.1f}ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"\nimport 시점에 로드된 무거운 모듈: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"\nimport 시간이 예산을 초과했습니다: {median:.1f}ms > {args.budget_ms:.0f}ms")
+        failed = True
+    if not failed:
+        print("\nimport 시간 예산 통과")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+'''
+벤치마크용 로컬 대역 서비스
+YouTube Data API, Google Sheets API, Gemini 모델, 티스토리 글쓰기 페이지/API를 흉내내서
+실제 서비스 없이 포스팅 파이프라인의 처리량을 측정할 수 있게 한다
+'''
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EDITOR_HTML_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_tistory_editor.html')
+
+# 검색어마다 돌려줄 수 있는 전체 결과 수 (pageToken으로 나눠서 반환)
+SEARCH_RESULTS = 200
+
+SAMPLE_MARKDOWN = """# {title} - 핵심 정리와 리뷰
+
+원본 영상: https://youtu.be/{video_id}
+
+이 글에서는 영상의 주요 내용을 정리하고 실제로 활용할 수 있는 팁을 소개합니다.
+
+## 영상 개요
+
+{paragraph}
+
+## 주요 내용
+
+{paragraph}
+
+| 항목 | 내용 |
+| --- | --- |
+| 채널 | 벤치마크 채널 |
+| 조회수 | 12,345 |
+
+## 활용 팁
+
+{paragraph}
+
+## 결론
+
+{paragraph}
+"""
+SAMPLE_PARAGRAPH = "벤치마크용으로 생성된 문단입니다. 실제 Gemini 응답과 비슷한 길이를 만들기 위해 같은 문장을 반복합니다. " * 8
+
+
+class FakeServer:
+    """스레드에서 동작하는 로컬 HTTP 서버 (start/stop, url 속성 제공)"""
+
+    def __init__(self, handler_class):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    """JSON 응답 공통 처리"""
+
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_youtube_handler(latency=0.0):
+    """YouTube Data API v3의 search.list / videos.list를 흉내내는 핸들러"""
+
+    class YouTubeHandler(JsonHandler):
+        stats = {'search': 0, 'videos': 0, 'video_ids': 0}
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            if url.path.endswith('/youtube/v3/search'):
+                self.stats['search'] += 1
+                query = params.get('q', [''])[0]
+                count = int(params.get('maxResults', ['5'])[0])
+                offset = int(params.get('pageToken', ['0'])[0])
+                items = [
+                    {'id': {'kind': 'youtube#video', 'videoId': fake_video_id(f"{query}-{index}")}}
+                    for index in range(offset, min(offset + count, SEARCH_RESULTS))
+                ]
+                response = {'items': items}
+                if offset + count < SEARCH_RESULTS:
+                    response['nextPageToken'] = str(offset + count)
+                self.send_json(response)
+
+            elif url.path.endswith('/youtube/v3/videos'):
+                video_ids = params.get('id', [''])[0].split(',')
+                self.stats['videos'] += 1
+                self.stats['video_ids'] += len(video_ids)
+                self.send_json({'items': [fake_video_item(video_id) for video_id in video_ids if video_id]})
+
+            else:
+                self.send_json({'error': {'code': 404, 'message': 'not found'}}, status=404)
+
+    return YouTubeHandler
+
+
+def fake_video_id(seed):
+    """시드 문자열로 11자리 가짜 video_id 생성"""
+    return hashlib.md5(seed.encode('utf-8')).hexdigest()[:11]
+
+
+def fake_video_item(video_id):
+    """videos.list 응답 항목 형식의 가짜 영상 정보"""
+    number = int(hashlib.md5(video_id.encode('utf-8')).hexdigest()[:6], 16)
+    return {
+        'id': video_id,
+        'snippet': {
+            'title': f"벤치마크 영상 {video_id}",
+            'description': "벤치마크용 영상 설명입니다. " * 20,
+            'channelTitle': f"벤치마크 채널 {number % 7}",
+            'publishedAt': f"2025-{number % 12 + 1:02d}-{number % 28 + 1:02d}T00:00:00Z",
+            'tags': ['벤치마크', '테스트', f"태그{number % 13}"]
+        },
+        'statistics': {'viewCount': str(number)},
+        'contentDetails': {'duration': f"PT{number % 50 + 1}M{number % 60}S"}
+    }
+
+
+def make_sheets_handler(rows, latency=0.0, failures=0):
+    """Sheets API v4의 values.batchGet / values.batchUpdate를 흉내내는 핸들러
+
+    rows는 1행(머리글)부터의 셀 값 목록이며, batchUpdate로 받은 값은 같은 목록에 기록된다.
+    failures를 주면 처음 그 수만큼의 요청에 503을 돌려준다. (재시도/백오프 확인용, 실행 중에는 fail_remaining으로 조정)
+    """
+
+    range_pattern = re.compile(r"!([A-Z])(\d+):([A-Z])(\d*)$")
+
+    def parse_range(cell_range):
+        first_col, first_row, last_col, last_row = range_pattern.search(cell_range).groups()
+        return ord(first_col) - ord('A'), int(first_row), ord(last_col) - ord('A'), int(last_row) if last_row else None
+
+    class SheetsHandler(JsonHandler):
+        stats = {'batch_get': 0, 'batch_update': 0, 'cells_written': 0, 'failed': 0}
+        sheet = rows
+        lock = threading.Lock()
+        fail_remaining = failures
+
+        def fail_if_needed(self):
+            """아직 실패시킬 요청이 남았으면 503을 보내고 True 반환"""
+            with self.lock:
+                if type(self).fail_remaining <= 0:
+                    return False
+                type(self).fail_remaining -= 1
+                self.stats['failed'] += 1
+            self.send_json({'error': {'code': 503, 'message': 'unavailable'}}, status=503)
+            return True
+
+        def read(self, cell_range):
+            first_col, first_row, last_col, last_row = parse_range(cell_range)
+            last_row = last_row or len(self.sheet)
+            values = []
+            for row in self.sheet[first_row - 1:last_row]:
+                cells = [str(value) for value in row[first_col:last_col + 1]]
+                while cells and cells[-1] == '':
+                    cells.pop()
+                values.append(cells)
+            # 실제 API처럼 끝부분의 빈 행은 생략
+            while values and not values[-1]:
+                values.pop()
+            return {'range': cell_range, 'majorDimension': 'ROWS', 'values': values}
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.fail_if_needed():
+                return
+            url = urlparse(self.path)
+            if not url.path.endswith('/values:batchGet'):
+                self.send_json({'error': {'code': 404, 'message': 'not found'}}, status=404)
+                return
+            self.stats['batch_get'] += 1
+            with self.lock:
+                value_ranges = [self.read(cell_range) for cell_range in parse_qs(url.query).get('ranges', [])]
+            self.send_json({'valueRanges': value_ranges})
+
+        def do_POST(self):
+            time.sleep(latency)
+            if self.fail_if_needed():
+                return
+            if not urlparse(self.path).path.endswith('/values:batchUpdate'):
+                self.send_json({'error': {'code': 404, 'message': 'not found'}}, status=404)
+                return
+            length = int(self.headers.get('Content-Length', '0'))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            self.stats['batch_update'] += 1
+            with self.lock:
+                for value_range in payload.get('data', []):
+                    first_col, first_row, _, _ = parse_range(value_range['range'])
+                    for row_offset, values in enumerate(value_range['values']):
+                        index = first_row - 1 + row_offset
+                        while len(self.sheet) <= index:
+                            self.sheet.append([])
+                        row = self.sheet[index]
+                        for col_offset, value in enumerate(values):
+                            while len(row) <= first_col + col_offset:
+                                row.append('')
+                            row[first_col + col_offset] = value
+                            self.stats['cells_written'] += 1
+            self.send_json({'totalUpdatedRows': len(payload.get('data', []))})
+
+    return SheetsHandler
+
+
+def make_tistory_handler(latency=0.0):
+    """글쓰기 페이지(/manage/write/)와 글쓰기 API(/manage/post.json)를 흉내내는 핸들러"""
+
+    with open(EDITOR_HTML_FILE, 'rb') as f:
+        editor_html = f.read()
+
+    class TistoryHandler(JsonHandler):
+        posts = []
+        lock = threading.Lock()
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path.startswith('/manage/write') or path.startswith('/manage/newpost'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(editor_html)))
+                self.end_headers()
+                self.wfile.write(editor_html)
+            else:
+                self.send_json({'ok': True})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/manage/post.json':
+                self.send_json({'error': 'not found'}, status=404)
+                return
+
+            time.sleep(latency)
+            length = int(self.headers.get('Content-Length', '0'))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            with self.lock:
+                self.posts.append(payload)
+                entry_id = len(self.posts)
+            self.send_json({'entryUrl': f"http://{self.headers.get('Host')}/{entry_id}"})
+
+    return TistoryHandler
+
+
+class FakeResponse:
+    """generate_content 응답/스트림 청크 대역"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """지연 시간을 설정할 수 있는 Gemini 모델 대역
+
+    latency초 동안 생성한 것처럼 기다린 뒤 마크다운을 반환하고,
+    stream=True이면 같은 시간에 걸쳐 chunks개의 청크로 나눠서 보낸다.
+    다이제스트 프롬프트(<!-- POST video_id --> 구분 줄)에는 영상마다 구분 줄로 시작하는 글을 이어서 반환하며,
+    글이 하나 늘 때마다 latency * digest_cost초가 더 걸린다.
+    """
+
+    def __init__(self, latency=1.0, chunks=10, model_name='models/fake-gemini', digest_cost=0.5):
+        self.latency = latency
+        self.chunks = chunks
+        self.model_name = model_name
+        self.digest_cost = digest_cost
+        self.calls = 0
+
+    def render(self, prompt):
+        video_id = prompt.split('https://youtu.be/')[1].split()[0] if 'https://youtu.be/' in prompt else 'unknown'
+        title = prompt.split('- 제목:')[1].split('\n')[0].strip() if '- 제목:' in prompt else '벤치마크 영상'
+        return SAMPLE_MARKDOWN.format(title=title, video_id=video_id, paragraph=SAMPLE_PARAGRAPH)
+
+    def render_digest(self, prompt):
+        video_ids = re.findall(r'^## 영상 \d+ \(video_id: ([\w-]+)\)$', prompt, flags=re.M)
+        titles = re.findall(r'^- 제목: (.*)$', prompt, flags=re.M)
+        return '\n'.join(
+            f"<!-- POST {video_id} -->\n" + SAMPLE_MARKDOWN.format(title=title, video_id=video_id, paragraph=SAMPLE_PARAGRAPH)
+            for video_id, title in zip(video_ids, titles)
+        ), len(video_ids)
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        self.calls += 1
+        latency = self.latency
+        if '<!-- POST' in contents[0]:
+            text, count = self.render_digest(contents[0])
+            latency *= 1 + (count - 1) * self.digest_cost
+        else:
+            text = self.render(contents[0])
+        if not stream:
+            time.sleep(latency)
+            return FakeResponse(text)
+
+        def chunk_iterator():
+            size = max(1, len(text) // self.chunks)
+            for start in range(0, len(text), size):
+                time.sleep(latency / self.chunks)
+                yield FakeResponse(text[start:start + size])
+        return chunk_iterator()
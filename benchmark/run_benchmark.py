@@ -0,0 +1,302 @@
+'''
+오프라인 종단간 벤치마크
+로컬 대역 YouTube API 서버, 지연 시간을 설정할 수 있는 가짜 Gemini 모델,
+티스토리 에디터를 흉내낸 로컬 페이지를 띄우고 포스팅 파이프라인의
+단계별/종단간 처리량(posts/min)과 p50/p99 지연 시간을 측정한다
+
+사용 예:
+    python benchmark/run_benchmark.py --posts 40 --gemini-latency 2 --workers 4
+    python benchmark/run_benchmark.py --browser --json result.json
+    python benchmark/run_benchmark.py --sheet  # 배치 입력을 가짜 구글 시트에서 읽고 상태 기록
+    python benchmark/run_benchmark.py --baseline result.json  # 기준보다 느려지면 종료 코드 1
+'''
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import shutil
+import tempfile
+import contextlib
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+# 이보다 작은 p99 증가는 측정 오차로 보고 무시
+MIN_P99_DELTA_MS = 5
+
+from fake_services import (FakeServer, FakeGeminiModel, make_youtube_handler, make_tistory_handler,
+                           make_sheets_handler, fake_video_id)
+
+
+def parse_args():
+    """명령행 인자 처리"""
+    parser = argparse.ArgumentParser(description='포스팅 파이프라인 오프라인 벤치마크')
+    parser.add_argument('--posts', type=int, default=20, help='측정할 포스트 수 (기본값: 20)')
+    parser.add_argument('--workers', type=int, default=4, help='파이프라인 수집/생성 동시 작업 수 (기본값: 4)')
+    parser.add_argument('--gemini-latency', type=float, default=1.0, help='가짜 Gemini 응답 시간(초) (기본값: 1.0)')
+    parser.add_argument('--youtube-latency', type=float, default=0.05, help='가짜 YouTube API 응답 시간(초) (기본값: 0.05)')
+    parser.add_argument('--publish-latency', type=float, default=0.1, help='가짜 글쓰기 API 응답 시간(초) (기본값: 0.1)')
+    parser.add_argument('--stream', action='store_true', help='Gemini 스트리밍 생성으로 측정')
+    parser.add_argument('--digest', type=int, default=1, metavar='N', help='배치 파이프라인에서 영상 N개씩 한 번의 Gemini 요청으로 생성 (기본값: 1)')
+    parser.add_argument('--browser', action='store_true', help='HTTP 대신 헤드리스 크롬으로 로컬 에디터 페이지에 발행 (Chrome 필요)')
+    parser.add_argument('--sheet', action='store_true', help='배치 파이프라인 입력을 로컬 가짜 구글 시트에서 읽고 상태를 시트에 기록')
+    parser.add_argument('--json', metavar='FILE', help='측정 결과를 JSON 파일로 저장')
+    parser.add_argument('--baseline', metavar='FILE', help='기준 결과 JSON과 비교해서 성능이 떨어지면 종료 코드 1')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='기준 대비 허용 오차 비율 (기본값: 0.2)')
+    parser.add_argument('--verbose', action='store_true', help='파이프라인 출력도 함께 표시')
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    """최근접 순위 방식 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(stage, durations):
+    """단계별 지연 시간 목록을 요약 (단일 작업자 기준 posts/min 포함)"""
+    mean = sum(durations) / len(durations) if durations else 0.0
+    return {
+        'stage': stage,
+        'count': len(durations),
+        'mean_ms': round(mean * 1000, 1),
+        'p50_ms': round(percentile(durations, 50) * 1000, 1),
+        'p99_ms': round(percentile(durations, 99) * 1000, 1),
+        'posts_per_min': round(60 / mean, 1) if mean else 0.0
+    }
+
+
+def load_pipeline_module(args, work_dir, youtube_url, session_file):
+    """대역 서비스를 바라보도록 환경 변수를 설정한 뒤 메인 스크립트 로드"""
+    os.environ.update({
+        'CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'YOUTUBE_API_KEY': 'benchmark-key',
+        'YOUTUBE_API_ENDPOINT': youtube_url + '/',
+        'YOUTUBE_CACHE_TTL': '0',  # 매번 API를 거치도록 캐시 사용 안 함
+        'GEMINI_API_KEY': 'benchmark-key',
+        'GEMINI_CACHE_BYPASS': '1',
+        'GEMINI_RPM': '1000000',
+        'GEMINI_TPM': '1000000000',
+        'GEMINI_CONCURRENCY': str(max(1, args.workers)),
+        'TISTORY_SESSION_FILE': session_file,
+        'TISTORY_CATEGORY_IDS': json.dumps({'IT': 1}),
+        'TISTORY_DAILY_POSTS': '0',  # 발행 한도와 발행 간격 없이 측정 (사용량 기록은 그대로)
+        'TISTORY_PUBLISH_INTERVAL': '0',
+        'DUPLICATE_CHECK': '0',  # 가짜 영상 정보는 서로 비슷하고, 같은 입력을 두 번 측정하므로 중복 검사 안 함
+    })
+    # cache/, ChromeProfile 등 작업 파일이 저장소가 아닌 임시 디렉토리에 생기도록 이동
+    os.chdir(work_dir)
+    sys.path.insert(0, REPO_DIR)
+    import tistory_auto_posting_selenium_sheet as pipeline
+
+    pipeline.model = FakeGeminiModel(latency=args.gemini_latency)
+    return pipeline
+
+
+def make_queries(count):
+    """URL과 검색어를 반씩 섞은 입력 목록"""
+    queries = []
+    for index in range(count):
+        if index % 2 == 0:
+            queries.append(f"https://youtu.be/{fake_video_id(f'url-{index}')}")
+        else:
+            queries.append(f"벤치마크 검색어 {index}")
+    return queries
+
+
+def run_stages(pipeline, publisher, queries, stream):
+    """포스트를 하나씩 처리하면서 단계별 지연 시간 측정"""
+    durations = {'fetch': [], 'generate': [], 'render': [], 'publish': [], 'end_to_end': []}
+    failures = 0
+
+    for query in queries:
+        started = time.perf_counter()
+
+        video_data = pipeline.search_youtube(query)
+        fetched = time.perf_counter()
+        if not video_data:
+            failures += 1
+            continue
+
+        markdown_content = pipeline.generate_content_with_gemini(video_data, stream)
+        generated = time.perf_counter()
+        if not markdown_content:
+            failures += 1
+            continue
+
+        title, html_content = pipeline.render_markdown(markdown_content, video_data)
+        rendered = time.perf_counter()
+
+        result = publisher.publish(title, html_content, 'IT', video_data.get('tags', []))
+        published = time.perf_counter()
+        if not result['success']:
+            failures += 1
+            continue
+
+        durations['fetch'].append(fetched - started)
+        durations['generate'].append(generated - fetched)
+        durations['render'].append(rendered - generated)
+        durations['publish'].append(published - rendered)
+        durations['end_to_end'].append(published - started)
+
+    return [summarize(stage, values) for stage, values in durations.items()], failures
+
+
+def run_pipeline(pipeline, publisher, queries, workers, stream):
+    """배치 파이프라인(run_batch) 전체 처리량 측정"""
+    started = time.perf_counter()
+    calls = pipeline.model.calls
+    results = pipeline.run_batch(publisher, queries, workers=workers, stream=stream)
+    elapsed = time.perf_counter() - started
+    return {
+        'posts': results['success'],
+        'failed': results['failed'],
+        'gemini_calls': pipeline.model.calls - calls,
+        'wall_s': round(elapsed, 2),
+        'posts_per_min': round(results['success'] * 60 / elapsed, 1) if elapsed else 0.0
+    }
+
+
+def compare_with_baseline(result, baseline, tolerance):
+    """기준 결과보다 처리량이 떨어졌거나 p99가 늘어난 항목 목록"""
+    regressions = []
+    minimum = baseline['pipeline']['posts_per_min'] * (1 - tolerance)
+    if result['pipeline']['posts_per_min'] < minimum:
+        regressions.append(
+            f"파이프라인 처리량 {result['pipeline']['posts_per_min']} < {minimum:.1f} posts/min"
+        )
+
+    baseline_stages = {stage['stage']: stage for stage in baseline['stages']}
+    for stage in result['stages']:
+        base = baseline_stages.get(stage['stage'])
+        if not base or not base['p99_ms']:
+            continue
+        maximum = base['p99_ms'] * (1 + tolerance)
+        if stage['p99_ms'] > maximum and stage['p99_ms'] - base['p99_ms'] > MIN_P99_DELTA_MS:
+            regressions.append(f"{stage['stage']} p99 {stage['p99_ms']}ms > {maximum:.1f}ms")
+    return regressions
+
+
+def print_report(result):
+    """측정 결과 표 출력"""
+    print(f"\n=== 단계별 지연 시간 (포스트 {result['config']['posts']}건, 순차 처리) ===")
+    print(f"{'단계':<12}{'건수':>6}{'평균(ms)':>12}{'p50(ms)':>12}{'p99(ms)':>12}{'posts/min':>12}")
+    for stage in result['stages']:
+        print(f"{stage['stage']:<12}{stage['count']:>6}{stage['mean_ms']:>12}{stage['p50_ms']:>12}"
+              f"{stage['p99_ms']:>12}{stage['posts_per_min']:>12}")
+    if result['stage_failures']:
+        print(f"실패: {result['stage_failures']}건")
+
+    pipeline = result['pipeline']
+    print(f"\n=== 배치 파이프라인 (작업자 {result['config']['workers']}명) ===")
+    print(f"성공 {pipeline['posts']}건, 실패 {pipeline['failed']}건, "
+          f"{pipeline['wall_s']}초, {pipeline['posts_per_min']} posts/min, Gemini 요청 {pipeline['gemini_calls']}회")
+    
+    quota = result['quota']
+    print(f"\n할당량 사용: YouTube {quota['youtube']:g}단위, Gemini {quota['gemini']:g}회, 발행 {quota['tistory']:g}건")
+
+    sheets = result.get('sheets')
+    if sheets:
+        print("\n=== 구글 시트 ===")
+        print(f"batchGet {sheets['batch_get']}회, batchUpdate {sheets['batch_update']}회, "
+              f"셀 {sheets['cells_written']}개 기록, posted 행 {sheets['posted_rows']}건")
+
+
+def main():
+    args = parse_args()
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='tistory_bench_')
+    session_file = os.path.join(work_dir, 'session.json')
+
+    youtube = FakeServer(make_youtube_handler(args.youtube_latency)).start()
+    tistory = FakeServer(make_tistory_handler(args.publish_latency)).start()
+    queries = make_queries(args.posts)
+    sheet_rows = [['입력', '채널', '상태', '글 주소', '오류', '갱신 시각']] + [[query] for query in queries]
+    sheets = FakeServer(make_sheets_handler(sheet_rows)).start() if args.sheet else None
+
+    # HTTP 발행용 가짜 로그인 세션
+    with open(session_file, 'w', encoding='utf-8') as f:
+        json.dump({'saved_at': time.time(), 'cookies': [
+            {'name': 'TSSESSION', 'value': 'benchmark', 'domain': '127.0.0.1', 'path': '/'}
+        ]}, f)
+
+    pipeline = load_pipeline_module(args, work_dir, youtube.url, session_file)
+    pipeline.tistory_blog_name = tistory.url
+
+    if args.browser:
+        driver = pipeline.init_driver(os.path.join(work_dir, 'ChromeProfile'), lean=True)
+        if not driver:
+            print("크롬을 시작할 수 없습니다. --browser 없이 HTTP 발행으로 측정하세요.")
+            youtube.stop()
+            tistory.stop()
+            if sheets:
+                sheets.stop()
+            os.chdir(original_dir)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return 2
+        publisher = pipeline.SeleniumPublisher(driver)
+    else:
+        publisher = pipeline.HttpPublisher(blog_url=tistory.url, session_path=session_file)
+
+    output = None if args.verbose else io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+            stages, stage_failures = run_stages(pipeline, publisher, queries, args.stream)
+            pipeline_queries = queries
+            pipeline.set_digest_size(args.digest)
+            if sheets:
+                pipeline_queries = pipeline.open_sheet_source('benchmark', endpoint=sheets.url + '/v4/spreadsheets')
+            pipeline_result = run_pipeline(pipeline, publisher, pipeline_queries, max(1, args.workers), args.stream)
+            pipeline.close_sheet_source()
+            quota = {budget: usage['used'] for budget, usage in pipeline.get_quota_scheduler().headroom().items()}
+    finally:
+        publisher.close()
+        youtube.stop()
+        tistory.stop()
+        if sheets:
+            sheets.stop()
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {
+        'config': {
+            'posts': args.posts, 'workers': args.workers, 'stream': args.stream, 'digest': args.digest,
+            'publisher': publisher.name, 'gemini_latency': args.gemini_latency,
+            'youtube_latency': args.youtube_latency, 'publish_latency': args.publish_latency
+        },
+        'stages': stages,
+        'stage_failures': stage_failures,
+        'pipeline': pipeline_result,
+        'quota': quota
+    }
+    if sheets:
+        result['sheets'] = dict(sheets.httpd.RequestHandlerClass.stats,
+                                posted_rows=sum(1 for row in sheet_rows[1:] if row[2:3] == ['posted']))
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(result, json.load(f), args.tolerance)
+        if regressions:
+            print("\n성능 저하 감지:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("\n기준 결과 대비 성능 저하 없음")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+'''
+테스트 공통 설정
+메인 스크립트는 import 시점에 환경 변수를 읽으므로 작업 파일 경로를 임시 디렉토리로 먼저 바꿔 두고 불러온다
+'''
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmark'))
+
+WORK_DIR = tempfile.mkdtemp(prefix='tistory_test_')
+atexit.register(shutil.rmtree, WORK_DIR, True)
+os.environ.update({
+    'CACHE_DIR': WORK_DIR,
+    'METADATA_DB': os.path.join(WORK_DIR, 'videos.sqlite3'),
+    'JOB_DB': os.path.join(WORK_DIR, 'jobs.sqlite3'),
+    'QUOTA_DB': '',  # 할당량은 파일에 남기지 않음
+    'TISTORY_SESSION_FILE': os.path.join(WORK_DIR, 'session.json'),
+})
+
+import tistory_auto_posting_selenium_sheet as pipeline  # noqa: E402
+
+
+@pytest.fixture
+def metadata_store(tmp_path, monkeypatch):
+    """테스트마다 새로 만든 영상 정보 저장소 (공용 저장소도 이것으로 바꿔 둠)"""
+    store = pipeline.MetadataStore(str(tmp_path / 'videos.sqlite3'))
+    monkeypatch.setattr(pipeline, '_metadata_store', store)
+    return store
+
+
+def youtube_url(seed):
+    """테스트용 11자리 video_id로 만든 영상 URL"""
+    return f"https://youtu.be/{str(seed).rjust(11, 'x')}"
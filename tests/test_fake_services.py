@@ -0,0 +1,160 @@
+'''
+로컬 대역 서비스(benchmark/fake_services.py)를 상대로 하는 시트 작업 원본, HTTP 발행, 다이제스트 분리 테스트
+'''
+
+import json
+import time
+
+import pytest
+
+from conftest import pipeline, youtube_url
+from fake_services import FakeServer, FakeGeminiModel, make_sheets_handler, make_tistory_handler
+
+
+@pytest.fixture
+def serve():
+    """대역 서버를 띄우고 테스트가 끝나면 종료"""
+    servers = []
+    
+    def start(handler_class):
+        server = FakeServer(handler_class).start()
+        servers.append(server)
+        return server
+        
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def sheet_rows():
+    return [
+        ['입력', '채널', '상태', '글 주소', '오류', '갱신 시각'],
+        [youtube_url(1)],
+        ['파이썬 강의', '테스트 채널'],
+        [youtube_url(3), '', 'posted'],
+    ]
+
+
+def open_sheet(serve, rows, **kwargs):
+    server = serve(make_sheets_handler(rows, **kwargs))
+    source = pipeline.SheetJobSource('sheet-id', endpoint=server.url, flush_interval=3600, flush_rows=100)
+    return server, source
+
+
+def test_sheet_source_reads_pending_rows(serve):
+    """완료 상태가 아닌 행만 읽고, URL이 아닌 입력은 채널 이름을 붙여 검색어로 만듦"""
+    rows = sheet_rows()
+    _, source = open_sheet(serve, rows)
+    try:
+        assert source.load_pending() == [youtube_url(1), '파이썬 강의 테스트 채널']
+    finally:
+        source.close()
+    assert source.stats['batch_get'] == 1
+
+
+def test_sheet_source_batches_status_updates(serve):
+    """여러 행의 상태를 한 번의 batchUpdate로 기록"""
+    rows = sheet_rows()
+    server, source = open_sheet(serve, rows)
+    queries = source.load_pending()
+    source.update(queries[0], 'posted', url='https://example.tistory.com/1')
+    source.update(queries[1], 'error', error='생성 실패')
+    assert source.flush()
+    source.close()
+    
+    assert rows[1][2:4] == ['posted', 'https://example.tistory.com/1']
+    assert rows[2][2:5] == ['error', '', '생성 실패']
+    assert server.httpd.RequestHandlerClass.stats['batch_update'] == 1
+
+
+def test_sheet_source_retries_server_errors(serve):
+    """503 응답은 백오프 후 다시 시도해서 성공"""
+    rows = sheet_rows()
+    _, source = open_sheet(serve, rows, failures=1)
+    try:
+        assert len(source.load_pending()) == 2
+    finally:
+        source.close()
+    assert source.stats['retries'] == 1
+
+
+def test_sheet_source_keeps_failed_updates(serve, monkeypatch):
+    """기록에 실패한 상태는 버리지 않고 다음 flush에서 다시 기록"""
+    monkeypatch.setattr(pipeline, 'SHEETS_MAX_RETRIES', 0)
+    rows = sheet_rows()
+    server, source = open_sheet(serve, rows)
+    queries = source.load_pending()
+    server.httpd.RequestHandlerClass.fail_remaining = 1  # 다음 요청 하나만 실패
+    source.update(queries[0], 'posted')
+    assert not source.flush()
+    assert rows[1][2:3] != ['posted']
+    assert source.flush()
+    source.close()
+    assert rows[1][2] == 'posted'
+
+
+def write_session(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'saved_at': time.time(), 'cookies': [
+            {'name': 'TSSESSION', 'value': 'test', 'domain': '127.0.0.1', 'path': '/'}
+        ]}, f)
+
+
+def test_http_publisher_posts_to_write_api(serve, tmp_path):
+    server = serve(make_tistory_handler())
+    session_path = str(tmp_path / 'session.json')
+    write_session(session_path)
+    publisher = pipeline.HttpPublisher(blog_url=server.url, session_path=session_path, category_ids={'IT': 3})
+    try:
+        result = publisher.publish('제목', '<p>본문</p>', 'IT', ['파이썬', ' ', 'asyncio'])
+    finally:
+        publisher.close()
+        
+    assert result['success'] and not result['uncertain']
+    assert result['url'].endswith('/1')
+    payload = server.httpd.RequestHandlerClass.posts[0]
+    assert (payload['title'], payload['category'], payload['tag']) == ('제목', 3, '파이썬,asyncio')
+
+
+def test_http_publisher_timeout_is_uncertain(serve, tmp_path, monkeypatch):
+    """요청을 보낸 뒤 응답이 늦으면 발행됐을 수 있으므로 uncertain으로 알림 (다시 보내면 안 됨)"""
+    monkeypatch.setattr(pipeline, 'HTTP_PUBLISH_TIMEOUT', 0.2)
+    server = serve(make_tistory_handler(latency=1.0))
+    session_path = str(tmp_path / 'session.json')
+    write_session(session_path)
+    publisher = pipeline.HttpPublisher(blog_url=server.url, session_path=session_path)
+    try:
+        result = publisher.publish('제목', '<p>본문</p>')
+    finally:
+        publisher.close()
+    assert not result['success']
+    assert result['uncertain']
+
+
+def test_http_publisher_without_session(tmp_path):
+    publisher = pipeline.HttpPublisher(blog_url='http://127.0.0.1:9', session_path=str(tmp_path / 'none.json'))
+    result = publisher.publish('제목', '<p>본문</p>')
+    publisher.close()
+    assert not publisher.ready
+    assert not result['success'] and not result['uncertain']
+
+
+def test_split_digest_response_from_fake_model():
+    """다이제스트 응답을 영상별 글로 나누고, 요청하지 않은 영상과 제목 없는 글은 버림"""
+    videos = [
+        {'video_id': f"digest{index:05d}", 'title': f"영상 {index}", 'channel_title': '채널', 'tags': [], 'description': ''}
+        for index in range(3)
+    ]
+    prompt = pipeline.build_digest_prompt(videos)
+    text, count = FakeGeminiModel(latency=0).render_digest(prompt)
+    assert count == 3
+    
+    text += '\n<!-- POST unknown0001 -->\n# 모르는 영상\n\n본문\n<!-- POST digest00001 -->\n제목 없는 중복'
+    posts = pipeline.split_digest_response(text, [video['video_id'] for video in videos[:2]])
+    assert set(posts) == {'digest00000', 'digest00001'}
+    assert posts['digest00001'].startswith('# 영상 1')
+
+
+def test_split_digest_response_strips_code_fences():
+    text = '```\n<!-- POST abc -->\n# 제목\n\n본문\n```'
+    assert pipeline.split_digest_response(text, ['abc']) == {'abc': '# 제목\n\n본문'}
@@ -0,0 +1,150 @@
+'''
+할당량 스케줄러(QuotaScheduler)와 Gemini 속도 제한(RateWindow) 테스트
+'''
+
+import asyncio
+import time
+from datetime import datetime
+
+from conftest import pipeline, youtube_url
+
+
+def make_scheduler(tistory=0, youtube=0, gemini=0, interval=0, window=''):
+    return pipeline.QuotaScheduler(
+        path='', limits={'youtube': youtube, 'gemini': gemini, 'tistory': tistory}, interval=interval, window=window
+    )
+
+
+def test_plan_defers_jobs_beyond_remaining_quota():
+    """남은 발행 수를 넘는 작업은 미룸"""
+    scheduler = make_scheduler(tistory=2)
+    queries = [youtube_url(i) for i in range(3)]
+    planned, deferred = scheduler.plan(queries)
+    assert len(planned) == 2
+    assert len(deferred) == 1
+    assert set(planned + deferred) == set(queries)
+
+
+def test_plan_puts_cheaper_jobs_first():
+    """이미 변환까지 끝난 작업은 새 작업보다 먼저 처리"""
+    scheduler = make_scheduler(youtube=10000, gemini=10)
+    fresh, rendered = youtube_url(1), youtube_url(2)
+    planned, deferred = scheduler.plan([fresh, rendered], jobs={rendered: {'stage': 'rendered'}})
+    assert planned == [rendered, fresh]
+    assert deferred == []
+
+
+def test_plan_counts_recorded_usage():
+    """이미 기록된 사용량만큼 남은 할당량이 줄어듦"""
+    scheduler = make_scheduler(youtube=10)
+    scheduler.record('youtube', 9)
+    assert scheduler.remaining('youtube') == 1
+    planned, deferred = scheduler.plan([youtube_url(1)], budgets=('youtube',))
+    assert planned == [youtube_url(1)]
+    scheduler.record('youtube', 1)
+    planned, deferred = scheduler.plan([youtube_url(1)], budgets=('youtube',))
+    assert deferred == [youtube_url(1)]
+
+
+def test_require_raises_when_quota_is_short():
+    scheduler = make_scheduler(gemini=1)
+    scheduler.require('gemini')
+    scheduler.record('gemini')
+    try:
+        scheduler.require('gemini')
+    except pipeline.QuotaExceededError:
+        pass
+    else:
+        raise AssertionError('QuotaExceededError가 나야 함')
+
+
+def test_unlimited_budgets_only_track_usage():
+    """한도가 0인 항목은 기록만 하고 작업을 미루지 않음"""
+    scheduler = make_scheduler()
+    scheduler.record('tistory', 100)
+    assert scheduler.remaining('tistory') is None
+    planned, deferred = scheduler.plan([youtube_url(i) for i in range(5)])
+    assert len(planned) == 5 and deferred == []
+
+
+def test_window_bounds_same_day():
+    scheduler = make_scheduler(window='9-23')
+    start, end = scheduler.window_bounds(datetime(2026, 3, 1, 8, 0).timestamp())
+    assert datetime.fromtimestamp(start) == datetime(2026, 3, 1, 9, 0)
+    assert datetime.fromtimestamp(end) == datetime(2026, 3, 1, 23, 0)
+
+
+def test_window_bounds_across_midnight():
+    """자정을 넘는 시간대는 시작 전날/다음날 기준으로 계산"""
+    scheduler = make_scheduler(window='22-6')
+    start, end = scheduler.window_bounds(datetime(2026, 3, 1, 23, 30).timestamp())
+    assert datetime.fromtimestamp(start) == datetime(2026, 3, 1, 22, 0)
+    assert datetime.fromtimestamp(end) == datetime(2026, 3, 2, 6, 0)
+    start, end = scheduler.window_bounds(datetime(2026, 3, 2, 3, 0).timestamp())
+    assert datetime.fromtimestamp(start) == datetime(2026, 3, 1, 22, 0)
+    assert datetime.fromtimestamp(end) == datetime(2026, 3, 2, 6, 0)
+
+
+def test_window_capacity_and_plan_outside_window(monkeypatch):
+    """발행 시간대 밖이면 발행할 수 있는 수가 0이라 발행까지 가는 작업은 모두 미룸"""
+    scheduler = make_scheduler(interval=600, window='9-23')
+    monkeypatch.setattr(scheduler, 'next_publish_time', lambda: datetime(2026, 3, 1, 8, 0).timestamp())
+    assert scheduler.window_capacity() == 0
+    planned, deferred = scheduler.plan([youtube_url(1)])
+    assert planned == [] and deferred == [youtube_url(1)]
+    # YouTube 할당량만 보는 수집 단계는 시간대와 상관없이 진행
+    planned, deferred = scheduler.plan([youtube_url(1)], budgets=('youtube',))
+    assert planned == [youtube_url(1)]
+
+
+def test_window_capacity_inside_window(monkeypatch):
+    """시간대가 끝날 때까지 최소 간격으로 발행할 수 있는 수"""
+    scheduler = make_scheduler(interval=600, window='9-23')
+    monkeypatch.setattr(scheduler, 'next_publish_time', lambda: datetime(2026, 3, 1, 22, 0).timestamp())
+    assert scheduler.window_capacity() == 6
+    planned, deferred = scheduler.plan([youtube_url(i) for i in range(8)])
+    assert len(planned) == 6 and len(deferred) == 2
+
+
+def test_acquire_publish_slot_respects_daily_limit():
+    scheduler = make_scheduler(tistory=1)
+    assert scheduler.acquire_publish_slot()
+    # 결과가 기록되기 전에도 발행 중인 수만큼 한도를 차지함
+    assert not scheduler.acquire_publish_slot()
+    scheduler.finish_publish(False)
+    assert scheduler.acquire_publish_slot()
+    scheduler.finish_publish(True)
+    assert not scheduler.acquire_publish_slot()
+
+
+def test_rate_window_never_exceeds_limit_in_any_period():
+    """어느 period 구간에서도 사용량 합계가 limit을 넘지 않음"""
+    async def run():
+        window = pipeline.RateWindow(3, period=0.2)
+        stamps = []
+        for _ in range(7):
+            await window.acquire()
+            stamps.append(time.monotonic())
+        return stamps
+        
+    stamps = asyncio.run(run())
+    for index, stamp in enumerate(stamps):
+        in_window = [other for other in stamps[index:] if other - stamp < 0.2]
+        assert len(in_window) <= 3
+    # 한도를 넘는 요청은 기다렸다가 진행
+    assert stamps[3] - stamps[0] >= 0.2
+
+
+def test_rate_window_settle_releases_unused_reservation():
+    """미리 잡은 양보다 적게 썼으면 남은 양을 바로 다른 요청이 쓸 수 있음"""
+    async def run():
+        window = pipeline.RateWindow(10, period=60)
+        entry = await window.acquire(8)
+        window.settle(entry, 2)
+        started = time.monotonic()
+        await asyncio.wait_for(window.acquire(8), 1)
+        return window.used, time.monotonic() - started
+        
+    used, waited = asyncio.run(run())
+    assert used == 10
+    assert waited < 0.5
@@ -0,0 +1,174 @@
+'''
+작업 저장소(JobStore), 영상 정보 저장소(MetadataStore), 중복 영상 색인(DuplicateIndex) 테스트
+'''
+
+import json
+import sqlite3
+import time
+
+import pytest
+
+from conftest import pipeline
+
+
+def make_video(video_id, title='파이썬 비동기 프로그래밍 입문', tags=('python', 'asyncio'), description=None):
+    return {
+        'video_id': video_id,
+        'title': title,
+        'channel_title': '테스트 채널',
+        'tags': list(tags),
+        'description': description or f"{title} 영상입니다. 이벤트 루프와 코루틴, 태스크를 예제로 설명합니다.",
+        'upload_date': '2026-01-01T00:00:00Z',
+    }
+
+
+def create_legacy_job_db(path, video):
+    """결과물을 작업 행에도 복사해 두던 예전 형식의 작업 저장소"""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE jobs (job_id TEXT PRIMARY KEY, query TEXT NOT NULL UNIQUE, video_id TEXT, '
+        'stage TEXT NOT NULL, video_data TEXT, markdown TEXT, title TEXT, html_content TEXT, '
+        'url TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+    )
+    conn.execute(
+        "INSERT INTO jobs VALUES ('job-1', 'query-1', ?, 'rendered', ?, '# 제목', '제목', '<p>본문</p>', "
+        "NULL, NULL, 0, 1, 1)",
+        (video['video_id'], json.dumps(video, ensure_ascii=False))
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_job_store_migrates_legacy_columns(tmp_path, metadata_store):
+    """예전 형식의 결과물은 영상 정보 저장소로 옮기고 작업 행의 컬럼은 제거"""
+    path = str(tmp_path / 'jobs.sqlite3')
+    video = make_video('legacy00001')
+    create_legacy_job_db(path, video)
+    
+    store = pipeline.JobStore(path)
+    columns = [row[1] for row in store.conn.execute('PRAGMA table_info(jobs)')]
+    assert columns == pipeline.JobStore.COLUMNS
+    
+    record = metadata_store.get('legacy00001')
+    assert record['data']['title'] == video['title']
+    assert (record['markdown'], record['title'], record['html_content']) == ('# 제목', '제목', '<p>본문</p>')
+    
+    job = store.get_or_create('query-1')
+    assert job['stage'] == 'rendered'
+    assert job['video_data']['video_id'] == 'legacy00001'
+    assert job['html_content'] == '<p>본문</p>'
+
+
+def test_job_store_migration_keeps_newer_metadata(tmp_path, metadata_store):
+    """영상 정보 저장소에 이미 있는 글은 예전 작업 행의 값으로 덮어쓰지 않음"""
+    path = str(tmp_path / 'jobs.sqlite3')
+    video = make_video('legacy00002')
+    metadata_store.put_video(video)
+    metadata_store.put_content('legacy00002', '# 새 글', '새 글', '<p>새 본문</p>')
+    create_legacy_job_db(path, video)
+    
+    pipeline.JobStore(path)
+    assert metadata_store.get('legacy00002')['markdown'] == '# 새 글'
+
+
+def test_job_store_attaches_artifacts_by_stage(tmp_path, metadata_store):
+    """작업은 끝난 단계까지의 결과물만 영상 레코드에서 붙여서 돌려줌"""
+    store = pipeline.JobStore(str(tmp_path / 'jobs.sqlite3'))
+    video = make_video('stage000001')
+    metadata_store.put_video(video)
+    metadata_store.put_content('stage000001', '# 글', '글', '<p>글</p>')
+    job = store.get_or_create('query')
+    
+    store.update(job['job_id'], stage='fetched', video_id='stage000001')
+    job = store.get_or_create('query')
+    assert job['video_data']['video_id'] == 'stage000001'
+    assert job['markdown'] is None and job['html_content'] is None
+    
+    store.update(job['job_id'], stage='generated')
+    job = store.get_or_create('query')
+    assert job['markdown'] == '# 글' and job['title'] is None
+    
+    store.update(job['job_id'], stage='rendered')
+    job = store.get_or_create('query')
+    assert job['title'] == '글' and job['html_content'] == '<p>글</p>'
+
+
+def test_job_store_remembers_search_expansions(tmp_path, metadata_store):
+    store = pipeline.JobStore(str(tmp_path / 'jobs.sqlite3'))
+    assert store.get_expansion('검색어') is None
+    store.save_expansion('검색어', ['https://youtu.be/aaaaaaaaaaa'])
+    assert store.get_expansion('검색어') == ['https://youtu.be/aaaaaaaaaaa']
+
+
+def test_metadata_cache_ttl(metadata_store):
+    metadata_store.cache_video(make_video('cache000001'), ttl=100)
+    assert metadata_store.get_cached_video('cache000001', ttl=100)['video_id'] == 'cache000001'
+    metadata_store.conn.execute("UPDATE videos SET fetched_at = ? WHERE video_id = 'cache000001'", (time.time() - 200,))
+    assert metadata_store.get_cached_video('cache000001', ttl=100) is None
+
+
+def test_metadata_cache_eviction_keeps_selected_records(metadata_store):
+    """캐시로만 남은 레코드만 오래 사용하지 않은 순서로 제거하고, 선택/생성/발행된 레코드는 유지"""
+    for index in range(6):
+        metadata_store.cache_video(make_video(f"cache{index:06d}"), ttl=100)
+        metadata_store.conn.execute(
+            'UPDATE videos SET accessed_at = ? WHERE video_id = ?', (index, f"cache{index:06d}")
+        )
+    metadata_store.put_video(dict(make_video('cache000000'), search_date='2026-01-01 00:00:00'))
+    metadata_store.put_content('cache000001', '# 글', '글', '<p>글</p>')
+    metadata_store.get_cached_video('cache000002', ttl=100)
+    
+    removed = metadata_store.evict_cache(max_entries=2, ttl=100)
+    remaining = {row[0] for row in metadata_store.conn.execute('SELECT video_id FROM videos')}
+    assert removed == 2
+    assert remaining == {'cache000000', 'cache000001', 'cache000002', 'cache000005'}
+
+
+def test_metadata_cache_eviction_removes_expired(metadata_store):
+    metadata_store.cache_video(make_video('cache000001'), ttl=100)
+    metadata_store.conn.execute("UPDATE videos SET fetched_at = ? WHERE video_id = 'cache000001'", (time.time() - 200,))
+    assert metadata_store.evict_cache(max_entries=0, ttl=100) == 1
+    assert metadata_store.get('cache000001') is None
+
+
+@pytest.fixture
+def duplicates(metadata_store):
+    return pipeline.DuplicateIndex(store=metadata_store, threshold=0.8, enabled=True)
+
+
+def test_duplicate_index_same_video_in_one_run(duplicates):
+    """같은 실행에서 처리 중인 영상은 중복, 실패해서 release하면 다시 처리 가능"""
+    video = make_video('dup00000001')
+    duplicates.check(video)
+    with pytest.raises(pipeline.DuplicateVideoError):
+        duplicates.check(video)
+    duplicates.release('dup00000001')
+    duplicates.check(video)
+
+
+def test_duplicate_index_published_video(metadata_store, duplicates):
+    """이미 발행한 영상은 다음 실행에서도 중복"""
+    video = make_video('dup00000002')
+    metadata_store.put_video(video)
+    metadata_store.mark_published('dup00000002', 'https://example.tistory.com/1')
+    with pytest.raises(pipeline.DuplicateVideoError):
+        duplicates.check(video)
+
+
+def test_duplicate_index_similar_reupload(duplicates):
+    """다른 채널이 다시 올린 거의 같은 영상은 유사 중복, 내용이 다른 영상은 통과"""
+    duplicates.check(make_video('dup00000003'))
+    with pytest.raises(pipeline.DuplicateVideoError):
+        duplicates.check(make_video('dup00000004'))
+    duplicates.check(make_video(
+        'dup00000005', title='집에서 만드는 김치찌개 레시피', tags=('요리', '김치찌개'),
+        description='돼지고기와 묵은지로 깊은 맛을 내는 김치찌개 끓이는 법을 알려드립니다.'
+    ))
+    assert duplicates.stats == {'checked': 3, 'exact': 0, 'similar': 1}
+
+
+def test_duplicate_index_disabled(duplicates):
+    duplicates.enabled = False
+    video = make_video('dup00000006')
+    duplicates.check(video)
+    duplicates.check(video)
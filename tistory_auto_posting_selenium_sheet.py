@@ -4,25 +4,28 @@
 Gemini API로 콘텐츠를 생성하고 티스토리에 자동 업로드
 '''
 
-from time import sleep
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium import webdriver
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-import platform
-import subprocess
-import pyperclip
-from selenium.webdriver import ActionChains
-from selenium.webdriver.common.keys import Keys
+# selenium, googleapiclient, google.generativeai, markdown2, requests, psutil은 불러오는 데 시간이 오래 걸리므로
+# 실제로 쓰는 단계의 함수 안에서 import한다 (메타데이터 수집만 하는 실행이 브라우저/Gemini 라이브러리를 읽지 않도록)
 import os
+import re
+import abc
 import json
-from datetime import datetime
-from googleapiclient.discovery import build
+import math
+import time
+import queue
+import argparse
+import sqlite3
+import threading
+import hashlib
+import shutil
+import random
+import asyncio
+import uuid
+import contextlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
-import google.generativeai as genai
-import markdown2
 
 # 환경 변수 로드
 load_dotenv()
@@ -36,9 +39,8 @@ TISTORY_PASSWORD = os.getenv('TISTORY_PASSWORD')
 KAKAO_ID = os.getenv('KAKAO_ID')
 KAKAO_PW = os.getenv('KAKAO_PW')
 
-# Gemini API 설정
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-pro-exp-02-05')
+# Gemini 모델 (생성 단계에서 처음 필요할 때 get_model()이 설정/생성)
+model = None
 
 C_END = "\033[0m"
 C_BOLD = "\033[1m"
@@ -60,20 +62,481 @@ C_BGPURPLE = "\033[45m"
 C_BGCYAN = "\033[46m"
 C_BGWHITE = "\033[47m"
 
-osName = platform.system()  # window 인지 mac 인지 알아내기 위한
+# 단계별 대기 시간 예산(초) - 고정 sleep/암묵적 대기 대신 조건이 충족되는 즉시 진행
+WAIT_BUDGETS = {
+    'login_page': 10,        # 로그인 페이지의 카카오 로그인 버튼
+    'kakao_login_form': 10,  # 카카오 아이디/비밀번호 입력창, 로그인 버튼
+    'login_complete': 60,    # 로그인 후 프로필 아이콘
+    'write_page': 10,        # 글쓰기 페이지 에디터와 제목 입력창
+    'editor_settle': 3,      # 에디터 초기화로 인한 DOM 변경이 멈출 때까지
+    'html_button': 5,
+    'html_editor': 5,        # HTML 모드 전환 후 CodeMirror 준비
+    'category_button': 5,
+    'category_list': 5,
+    'save_button': 5,
+    'save_confirm': 10,      # 저장 확인 대화상자
+    'save_complete': 30,     # 저장 완료 레이어
+}
+WAIT_BUDGET_SCALE = float(os.getenv('WAIT_BUDGET_SCALE', '1'))  # 느린 환경에서는 전체 예산을 배수로 늘림
+WAIT_POLL_INTERVAL = 0.1
+WAIT_LOG = os.getenv('WAIT_LOG', '') == '1'  # 1이면 단계별 실제 대기 시간 출력
 
-# 대기 시간 최적화 (기존 값 감소)
-LOADING_WAIT_TIME = 3  # 5초에서 3초로 감소
-PAUSE_TIME = 1  # 3초에서 1초로 감소
+# DOM 변경이 quiet_ms 동안 없으면 true (처음 호출 시 MutationObserver 설치)
+DOM_QUIET_SCRIPT = """
+if (!window.__waitObserver) {
+    window.__lastMutation = performance.now();
+    window.__waitObserver = new MutationObserver(() => { window.__lastMutation = performance.now(); });
+    window.__waitObserver.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    return false;
+}
+return performance.now() - window.__lastMutation >= arguments[0];
+"""
+CODEMIRROR_READY_SCRIPT = """
+const host = document.querySelector('.CodeMirror');
+return !!(host && host.CodeMirror);
+"""
 
 tistory_blog_name = 'https://yourblog.tistory.com'  # 자신의 티스토리 블로그 주소로 변경하세요
 tistory_category_name = 'IT'  # 원하는 카테고리로 변경하세요
 
-def init_driver():
+# 배치 모드 설정 (수집/생성 단계 동시 작업 수)
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+
+# 로컬 캐시 설정
+CACHE_DIR = os.getenv('CACHE_DIR', 'cache')
+YOUTUBE_CACHE_TTL = int(os.getenv('YOUTUBE_CACHE_TTL', str(24 * 60 * 60)))  # 초 단위, 0이면 캐시 사용 안 함
+YOUTUBE_CACHE_MAX_ENTRIES = int(os.getenv('YOUTUBE_CACHE_MAX_ENTRIES', '5000'))  # 캐시로만 남은 영상 정보 최대 수
+
+# 단계별 추적(span) 기록 및 지표 내보내기 설정 (빈 값이면 해당 파일을 쓰지 않음)
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(CACHE_DIR, 'traces.jsonl'))
+METRICS_FILE = os.getenv('METRICS_FILE', os.path.join(CACHE_DIR, 'metrics.prom'))
+METRICS_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]  # 히스토그램 구간(초)
+
+# 영상 정보와 생성된 글을 보관하는 저장소 (영상마다 JSON 파일을 만들지 않음)
+METADATA_DB = os.getenv('METADATA_DB', os.path.join(CACHE_DIR, 'videos.sqlite3'))
+
+# 배치 작업 진행 상태 저장소 (빈 값이면 사용 안 함)
+JOB_DB = os.getenv('JOB_DB', os.path.join(CACHE_DIR, 'jobs.sqlite3'))
+# 작업 단계 순서 (publishing은 발행 요청 중에 중단되어 발행 여부를 알 수 없는 상태,
+# duplicate는 이미 발행한 영상과 같거나 비슷해서 생성 전에 건너뛴 상태)
+JOB_STAGES = ['pending', 'fetched', 'generated', 'rendered', 'publishing', 'published', 'duplicate']
+
+# 중복/유사 영상 검사 (이미 발행했거나 처리 중인 영상과 같거나 비슷하면 Gemini 생성 전에 건너뜀)
+DUPLICATE_CHECK = os.getenv('DUPLICATE_CHECK', '1') == '1'
+DUPLICATE_THRESHOLD = float(os.getenv('DUPLICATE_THRESHOLD', '0.8'))  # 중복으로 볼 추정 자카드 유사도
+DUPLICATE_DESCRIPTION_CHARS = 500  # 설명은 앞부분만 비교 (채널 공통 문구가 뒤에 붙는 경우가 많음)
+SHINGLE_SIZE = 5  # 문자 n-gram 길이
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # LSH 밴드 수 (밴드당 MINHASH_PERMUTATIONS / MINHASH_BANDS개 값)
+MINHASH_PRIME = (1 << 61) - 1
+
+# YouTube Data API 일괄 조회 설정
+YOUTUBE_BATCH_SIZE = 50  # videos().list 한 번에 조회할 수 있는 최대 ID 수
+# search_youtube가 저장하는 키만 받아오도록 응답 필드 제한
+YOUTUBE_VIDEO_FIELDS = 'items(id,snippet(title,description,channelTitle,publishedAt,tags),statistics/viewCount,contentDetails/duration)'
+YOUTUBE_SEARCH_FIELDS = 'items/id/videoId'
+YOUTUBE_SEARCH_PAGE_FIELDS = 'nextPageToken,items/id/videoId'
+
+# 검색 결과 순위 설정 (첫 번째 결과 대신 후보 전체를 점수로 비교해서 선택)
+SEARCH_RANK = os.getenv('SEARCH_RANK', '') == '1'
+SEARCH_PER_QUERY = int(os.getenv('SEARCH_PER_QUERY', '1'))  # 검색어 하나로 만들 포스트 수 (2 이상이면 순위 모드)
+SEARCH_PAGES = int(os.getenv('SEARCH_PAGES', '1'))  # 후보를 모을 검색 결과 페이지 수 (페이지마다 할당량 100 사용)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '25'))  # 페이지당 후보 수 (최대 50)
+RANK_WEIGHTS = json.loads(os.getenv('RANK_WEIGHTS', '{"views": 1.0, "recency": 0.5, "duration": 0.5, "channel": 2.0}'))
+RANK_RECENCY_HALF_LIFE_DAYS = float(os.getenv('RANK_RECENCY_HALF_LIFE_DAYS', '30'))  # 이 기간마다 최신성 점수가 절반
+RANK_DURATION_MINUTES = os.getenv('RANK_DURATION_MINUTES', '3-30')  # 선호하는 영상 길이(분) 범위
+RANK_CHANNELS = [name.strip() for name in os.getenv('RANK_CHANNELS', '').split(',') if name.strip()]  # 우대할 채널
+YOUTUBE_HTTP_TIMEOUT = int(os.getenv('YOUTUBE_HTTP_TIMEOUT', '30'))
+# 내장 discovery 문서가 없을 때 받아 둔 문서를 다시 받기까지의 시간(초)
+YOUTUBE_DISCOVERY_MAX_AGE = int(os.getenv('YOUTUBE_DISCOVERY_MAX_AGE', str(7 * 24 * 60 * 60)))
+YOUTUBE_API_ENDPOINT = os.getenv('YOUTUBE_API_ENDPOINT')  # 로컬 대역 서버 등 다른 API 주소를 쓸 때만 설정
+
+# Gemini 생성 설정 및 응답 캐시
+GEMINI_GENERATION_CONFIG = json.loads(os.getenv('GEMINI_GENERATION_CONFIG', '{}'))
+GEMINI_CACHE_MAX_BYTES = int(os.getenv('GEMINI_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+GEMINI_CACHE_BYPASS = os.getenv('GEMINI_CACHE_BYPASS', '') == '1'  # 1이면 캐시를 읽지 않고 새로 생성
+
+# Gemini 호출 속도 제한 및 재시도 설정
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', '15'))  # 분당 요청 수
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', '1000000'))  # 분당 토큰 수
+GEMINI_CONCURRENCY = int(os.getenv('GEMINI_CONCURRENCY', '4'))  # 동시 요청 수
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '5'))
+GEMINI_TIMEOUT = int(os.getenv('GEMINI_TIMEOUT', '180'))  # 요청당 타임아웃(초)
+GEMINI_BACKOFF_BASE = 2.0  # 재시도 대기 시간 = BASE * 2^시도횟수 (지터 적용)
+GEMINI_BACKOFF_MAX = 60.0
+GEMINI_STREAM = os.getenv('GEMINI_STREAM', '') == '1'  # 1이면 스트리밍 생성 사용
+GEMINI_STREAM_STALL_TIMEOUT = int(os.getenv('GEMINI_STREAM_STALL_TIMEOUT', '30'))  # 청크 사이 최대 대기(초)
+
+# Gemini 프롬프트 토큰 예산 (요구사항과 출력 형식은 항상 유지하고, 영상 정보 필드를 우선순위 순서대로 잘라서 맞춤)
+GEMINI_PROMPT_TOKEN_BUDGET = int(os.getenv('GEMINI_PROMPT_TOKEN_BUDGET', '4000'))  # 영상 한 편당 프롬프트 토큰
+GEMINI_INPUT_TOKEN_LIMIT = int(os.getenv('GEMINI_INPUT_TOKEN_LIMIT', '30000'))  # 요청 하나의 최대 입력 토큰
+GEMINI_OUTPUT_TOKEN_LIMIT = int(os.getenv('GEMINI_OUTPUT_TOKEN_LIMIT', '8192'))  # 요청 하나의 최대 출력 토큰
+GEMINI_POST_OUTPUT_TOKENS = 2000  # 포스트 한 편의 예상 출력 토큰 (2000자 이상 한국어)
+GEMINI_FIELD_TOKEN_LIMITS = {'title': 100, 'channel': 50, 'tags': 100, 'description': 600}  # 필드별 상한 (우선순위 순서)
+# 토큰 추정용 UTF-8 바이트당 토큰 비율 (모델의 count_tokens로 한 번 재서 저장, 재지 못하면 4바이트당 1토큰)
+GEMINI_TOKEN_RATIO_FILE = os.path.join(CACHE_DIR, 'gemini_token_ratio.json')
+DEFAULT_BYTES_PER_TOKEN = 4.0
+
+# 다이제스트 모드: 동시에 생성 중인 영상 여러 편을 한 번의 Gemini 요청으로 묶음 (1이면 사용 안 함)
+GEMINI_DIGEST_SIZE = int(os.getenv('GEMINI_DIGEST_SIZE', '1'))
+GEMINI_DIGEST_WAIT = float(os.getenv('GEMINI_DIGEST_WAIT', '2'))  # 첫 요청 후 묶음이 찰 때까지 기다리는 시간(초)
+DIGEST_MARKER = '<!-- POST {video_id} -->'
+
+# 에디터 직접 입력 스크립트 (클립보드/키 입력 없이 값 설정 후 적용된 값을 반환)
+SET_TITLE_SCRIPT = """
+const el = document.querySelector('.textarea_tit');
+if (!el) return null;
+const setter = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set;
+setter.call(el, arguments[0]);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value;
+"""
+SET_HTML_SCRIPT = """
+const host = document.querySelector('.CodeMirror');
+if (!host || !host.CodeMirror) return null;
+host.CodeMirror.setValue(arguments[0]);
+if (host.CodeMirror.save) host.CodeMirror.save();
+return host.CodeMirror.getValue();
+"""
+ADD_TAGS_SCRIPT = """
+const input = document.querySelector('.wrap_tag input');
+if (!input) return null;
+const setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+for (const tag of arguments[0]) {
+    input.focus();
+    setter.call(input, tag);
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    for (const type of ['keydown', 'keypress', 'keyup']) {
+        const event = new KeyboardEvent(type, {key: 'Enter', code: 'Enter', bubbles: true, cancelable: true});
+        Object.defineProperty(event, 'keyCode', {get: () => 13});
+        Object.defineProperty(event, 'which', {get: () => 13});
+        input.dispatchEvent(event);
+    }
+}
+// 등록된 태그 요소마다 자기 텍스트(#은 제외)를 모아서 반환 (삭제 버튼 등 자식 요소의 텍스트는 따로 모임)
+const texts = [];
+for (const element of document.querySelectorAll('.wrap_tag *')) {
+    if (element.tagName === 'INPUT') continue;
+    const text = Array.from(element.childNodes)
+        .filter(node => node.nodeType === Node.TEXT_NODE)
+        .map(node => node.textContent).join('').trim().replace(/^#/, '');
+    if (text) texts.push(text);
+}
+return texts;
+"""
+
+# 브라우저 프로필 및 발행 작업자 설정
+CHROME_PROFILE_DIR = os.path.join(os.getcwd(), "ChromeProfile")
+CHROME_WORKER_PROFILES_DIR = os.path.join(os.getcwd(), "ChromeProfiles")
+PUBLISH_BROWSERS = int(os.getenv('PUBLISH_BROWSERS', '1'))  # 동시에 발행할 브라우저 수
+
+# 발행 백엔드 설정
+PUBLISHER = os.getenv('PUBLISHER', 'selenium')  # selenium 또는 http
+TISTORY_VISIBILITY = int(os.getenv('TISTORY_VISIBILITY', '20'))  # HTTP 발행 공개 설정 (0: 비공개, 15: 보호, 20: 공개)
+TISTORY_CATEGORY_IDS = json.loads(os.getenv('TISTORY_CATEGORY_IDS', '{}'))  # HTTP 발행용 {"카테고리 이름": 카테고리 ID}
+HTTP_PUBLISH_TIMEOUT = int(os.getenv('HTTP_PUBLISH_TIMEOUT', '30'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '4'))
+
+# 구글 시트 작업 원본 설정
+# 열 구성: A 입력(URL 또는 영상 제목), B 채널 제목(선택), C 상태, D 글 주소, E 오류, F 갱신 시각 (1행은 머리글)
+SHEET_ID = os.getenv('SHEET_ID')
+SHEET_NAME = os.getenv('SHEET_NAME', 'Sheet1')
+SHEETS_API_ENDPOINT = os.getenv('SHEETS_API_ENDPOINT', 'https://sheets.googleapis.com/v4/spreadsheets')
+SHEETS_CREDENTIALS_FILE = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE')  # 서비스 계정 키 (시트를 이 계정과 공유해야 함)
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+SHEETS_HTTP_TIMEOUT = int(os.getenv('SHEETS_HTTP_TIMEOUT', '30'))
+SHEETS_MAX_RETRIES = 5  # 429/5xx 응답 재시도 횟수
+SHEET_FLUSH_INTERVAL = float(os.getenv('SHEET_FLUSH_INTERVAL', '10'))  # 상태를 모아서 기록하는 주기(초)
+SHEET_FLUSH_ROWS = int(os.getenv('SHEET_FLUSH_ROWS', '500'))  # 이만큼 쌓이면 주기를 기다리지 않고 기록
+SHEET_FIRST_ROW = 2
+SHEET_INPUT_COLUMNS = ('A', 'B')
+SHEET_STATUS_COLUMNS = ('C', 'F')
+SHEET_DONE_STATUSES = ('posted', 'duplicate')  # 다시 읽지 않는 상태
+
+# 할당량 기록 및 발행 일정 (사용량은 날짜별로 누적, QUOTA_DB가 빈 값이면 파일에 남기지 않음)
+QUOTA_DB = os.getenv('QUOTA_DB', os.path.join(CACHE_DIR, 'quota.sqlite3'))
+QUOTA_RESET_TIMEZONE = 'America/Los_Angeles'  # YouTube/Gemini 하루 할당량이 초기화되는 시간대
+YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000'))  # 하루 할당량 단위
+YOUTUBE_QUOTA_COSTS = {'search': 100, 'videos': 1}  # API 호출 한 번에 쓰는 단위
+GEMINI_DAILY_REQUESTS = int(os.getenv('GEMINI_DAILY_REQUESTS', '0'))  # 하루 요청 수 한도 (0이면 제한 없음)
+TISTORY_DAILY_POSTS = int(os.getenv('TISTORY_DAILY_POSTS', '0'))  # 하루 발행 수 한도 (0이면 제한 없음)
+TISTORY_PUBLISH_INTERVAL = int(os.getenv('TISTORY_PUBLISH_INTERVAL', '0'))  # 발행 사이 최소 간격(초, 0이면 간격 없음)
+TISTORY_PUBLISH_WINDOW = os.getenv('TISTORY_PUBLISH_WINDOW', '')  # 발행 시간대 (예: 9-23, 빈 값이면 언제나)
+
+# 경량(헤드리스) 브라우저 모드 설정
+BROWSER_LEAN = os.getenv('BROWSER_LEAN', '') == '1'  # 1이면 --lean과 같이 경량 모드 사용
+BROWSER_RENDERER_MEMORY_MB = int(os.getenv('BROWSER_RENDERER_MEMORY_MB', '512'))  # 렌더러 V8 힙 상한
+# 오래 실행할 때 브라우저를 새로 띄우는 기준 (0이면 해당 기준 사용 안 함)
+BROWSER_RECYCLE_POSTS = int(os.getenv('BROWSER_RECYCLE_POSTS', '50'))  # 마지막 재시작 이후 발행 수
+BROWSER_RECYCLE_RSS_MB = int(os.getenv('BROWSER_RECYCLE_RSS_MB', '1500'))  # chromedriver+크롬 RSS 합계(MB)
+BROWSER_RECYCLE_HANDLES = int(os.getenv('BROWSER_RECYCLE_HANDLES', '5000'))  # 열린 핸들(파일 디스크립터) 합계
+BROWSER_METRICS_MAX = 1000  # 보관할 포스트별 브라우저 지표 수 (상주 모드에서 계속 늘어나지 않도록)
+DAEMON_POLL_INTERVAL = int(os.getenv('DAEMON_POLL_INTERVAL', '300'))  # 상주 모드에서 작업 원본을 다시 읽는 간격(초)
+# 글 작성에 필요 없는 리소스(이미지, 폰트, 미디어)와 광고/분석 도메인 차단 패턴
+LEAN_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*adservice.google.com*',
+    '*display.ad.daum.net*', '*t1.daumcdn.net/adfit*', '*analytics.ad.daum.net*',
+]
+# 로그인 세션 스냅샷 (쿠키 + 스토리지) - 인증 정보이므로 저장소에 올리지 않도록 CACHE_DIR에 저장
+TISTORY_SESSION_FILE = os.getenv('TISTORY_SESSION_FILE', os.path.join(CACHE_DIR, 'tistory_session.json'))
+TISTORY_SESSION_MAX_AGE = int(os.getenv('TISTORY_SESSION_MAX_AGE', str(7 * 24 * 60 * 60)))  # 초
+TISTORY_AUTH_COOKIES = ['TSSESSION']  # 티스토리 로그인 상태를 나타내는 쿠키
+SESSION_COOKIE_KEYS = ['name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires']
+EXPORT_STORAGE_SCRIPT = """
+const dump = (storage) => Object.fromEntries(Object.keys(storage).map((key) => [key, storage.getItem(key)]));
+return {origin: location.origin, local: dump(localStorage), session: dump(sessionStorage)};
+"""
+# 새 문서가 열릴 때 페이지 스크립트보다 먼저 실행되어 저장된 스토리지 값을 채움
+RESTORE_STORAGE_SCRIPT = """
+(function (snapshot) {
+    if (location.origin !== snapshot.origin) return;
+    for (const [key, value] of Object.entries(snapshot.local)) {
+        if (localStorage.getItem(key) === null) localStorage.setItem(key, value);
+    }
+    for (const [key, value] of Object.entries(snapshot.session)) {
+        if (sessionStorage.getItem(key) === null) sessionStorage.setItem(key, value);
+    }
+})(%s);
+"""
+NAVIGATION_TIMING_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+return nav ? Math.round((nav.loadEventEnd || nav.domContentLoadedEventEnd || performance.now()) - nav.startTime) : null;
+"""
+
+stage_metrics = {}
+_trace_lock = threading.Lock()
+_trace_local = threading.local()
+_trace_file = None
+
+
+def new_post_id():
+    """포스트 한 건을 추적하기 위한 ID"""
+    return uuid.uuid4().hex[:12]
+
+
+@contextlib.contextmanager
+def trace_context(**attrs):
+    """블록 안에서 시작하는 span에 post_id/video_id 등 공통 속성을 붙임"""
+    previous = getattr(_trace_local, 'attrs', {})
+    _trace_local.attrs = {**previous, **{key: value for key, value in attrs.items() if value is not None}}
+    try:
+        yield
+    finally:
+        _trace_local.attrs = previous
+
+
+def traced(func):
+    """다른 스레드에서 실행할 함수가 현재 추적 속성과 상위 span을 이어받도록 감쌈"""
+    attrs = dict(getattr(_trace_local, 'attrs', {}))
+    parent = getattr(_trace_local, 'span_id', None)
+    
+    def wrapper(*args, **kwargs):
+        with trace_context(**attrs):
+            previous = getattr(_trace_local, 'span_id', None)
+            _trace_local.span_id = parent
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _trace_local.span_id = previous
+    return wrapper
+
+
+@contextlib.contextmanager
+def span(stage, **attrs):
+    """단계 실행 시간을 측정해서 추적 파일(JSONL)과 단계별 지표에 기록
+    
+    블록 안에서 받은 dict에 속성을 추가할 수 있고, 예외 없이 실패를 처리하는 코드는
+    record['status'] = 'error'로 실패를 표시한다.
+    """
+    record = {'stage': stage, **getattr(_trace_local, 'attrs', {}), **attrs}
+    record['span_id'] = uuid.uuid4().hex[:16]
+    record['parent_id'] = getattr(_trace_local, 'span_id', None)
+    _trace_local.span_id = record['span_id']
+    record['start'] = time.time()
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = str(e)[:300]
+        raise
+    finally:
+        _trace_local.span_id = record['parent_id']
+        record.setdefault('status', 'ok')
+        record_span(record, time.perf_counter() - started)
+
+
+def record_span(record, duration):
+    """끝난 span 하나를 단계별 지표에 반영하고 추적 파일에 한 줄로 추가"""
+    global _trace_file
+    record['duration_ms'] = round(duration * 1000, 1)
+    record['thread'] = threading.current_thread().name
+    
+    with _trace_lock:
+        metric = stage_metrics.setdefault(record['stage'], {
+            'count': 0, 'sum': 0.0, 'max': 0.0, 'errors': 0, 'buckets': [0] * len(METRICS_BUCKETS)
+        })
+        metric['count'] += 1
+        metric['sum'] += duration
+        metric['max'] = max(metric['max'], duration)
+        if record.get('status') == 'error':
+            metric['errors'] += 1
+        for index, bound in enumerate(METRICS_BUCKETS):
+            if duration <= bound:
+                metric['buckets'][index] += 1
+                
+        if not TRACE_FILE:
+            return
+        try:
+            if _trace_file is None:
+                os.makedirs(os.path.dirname(TRACE_FILE) or '.', exist_ok=True)
+                _trace_file = open(TRACE_FILE, 'a', encoding='utf-8')
+            _trace_file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            _trace_file.flush()
+        except Exception as e:
+            print(f"추적 기록 중 오류 발생: {str(e)}")
+
+
+def trace_post_done(post, success):
+    """여러 스레드를 거친 배치 포스트의 수집부터 발행까지 전체 소요 시간 기록"""
+    record_span({
+        'stage': 'post',
+        'post_id': post['post_id'],
+        'video_id': post['video_id'],
+        'query': post['query'],
+        'span_id': post['post_id'],
+        'parent_id': None,
+        'start': post['started_at'],
+        'status': 'ok' if success else 'error'
+    }, time.time() - post['started_at'])
+
+
+def write_metrics(path=METRICS_FILE):
+    """단계별 지표를 Prometheus 텍스트 형식으로 저장 (node_exporter textfile 수집기용)"""
+    if not path:
+        return
+        
+    with _trace_lock:
+        metrics = {stage: dict(metric, buckets=list(metric['buckets'])) for stage, metric in stage_metrics.items()}
+        
+    lines = [
+        '# HELP tistory_stage_duration_seconds 포스팅 단계별 소요 시간',
+        '# TYPE tistory_stage_duration_seconds histogram'
+    ]
+    for stage, metric in sorted(metrics.items()):
+        for bound, count in zip(METRICS_BUCKETS, metric['buckets']):
+            lines.append(f'tistory_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'tistory_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {metric["count"]}')
+        lines.append(f'tistory_stage_duration_seconds_sum{{stage="{stage}"}} {metric["sum"]:.6f}')
+        lines.append(f'tistory_stage_duration_seconds_count{{stage="{stage}"}} {metric["count"]}')
+    lines += [
+        '# HELP tistory_stage_errors_total 포스팅 단계별 실패 횟수',
+        '# TYPE tistory_stage_errors_total counter'
+    ]
+    for stage, metric in sorted(metrics.items()):
+        lines.append(f'tistory_stage_errors_total{{stage="{stage}"}} {metric["errors"]}')
+        
+    # 이번 실행에서 할당량을 사용했으면 오늘 사용량과 남은 양도 내보냄
+    if _quota_scheduler is not None:
+        headroom = _quota_scheduler.headroom()
+        lines += ['# HELP tistory_quota_used 오늘 사용한 할당량', '# TYPE tistory_quota_used gauge']
+        for budget, usage in headroom.items():
+            lines.append(f'tistory_quota_used{{budget="{budget}"}} {usage["used"]:g}')
+        lines += ['# HELP tistory_quota_remaining 오늘 남은 할당량 (한도를 둔 항목만)', '# TYPE tistory_quota_remaining gauge']
+        for budget, usage in headroom.items():
+            if usage['remaining'] is not None:
+                lines.append(f'tistory_quota_remaining{{budget="{budget}"}} {usage["remaining"]:g}')
+        
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        # 수집기가 쓰다 만 파일을 읽지 않도록 교체
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"지표 파일 저장 중 오류 발생: {str(e)}")
+
+
+def print_stage_stats():
+    """단계별 소요 시간 요약 출력"""
+    with _trace_lock:
+        items = sorted(stage_metrics.items(), key=lambda item: -item[1]['sum'])
+    for stage, metric in items:
+        print(f"  {stage}: {metric['count']}회, 평균 {metric['sum'] / metric['count']:.2f}초, "
+              f"최대 {metric['max']:.2f}초, 실패 {metric['errors']}회")
+
+
+wait_stats = {}
+_wait_stats_lock = threading.Lock()
+
+
+def dom_quiet(quiet_ms=300):
+    """DOM 변경이 quiet_ms 동안 멈출 때까지 기다리는 조건"""
+    def condition(_driver):
+        return _driver.execute_script(DOM_QUIET_SCRIPT, quiet_ms)
+    return condition
+
+
+def script_true(script):
+    """스크립트 결과가 참이 될 때까지 기다리는 조건"""
+    def condition(_driver):
+        return _driver.execute_script(script)
+    return condition
+
+
+def wait_for(_driver, step, condition, timeout=None):
+    """이름 있는 단계의 준비 조건을 예산 안에서 기다리고 실제 대기 시간을 기록"""
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    
+    budget = (timeout or WAIT_BUDGETS[step]) * WAIT_BUDGET_SCALE
+    started = time.monotonic()
+    try:
+        return WebDriverWait(_driver, budget, poll_frequency=WAIT_POLL_INTERVAL).until(condition)
+    except TimeoutException:
+        raise TimeoutException(f"'{step}' 단계 대기 시간 예산({budget:.1f}초)을 초과했습니다.")
+    finally:
+        elapsed = time.monotonic() - started
+        with _wait_stats_lock:
+            count, total = wait_stats.get(step, (0, 0.0))
+            wait_stats[step] = (count + 1, total + elapsed)
+        if WAIT_LOG:
+            print(f"[대기] {step}: {elapsed:.2f}초 / 예산 {budget:.1f}초")
+
+
+def print_wait_stats():
+    """단계별 누적 대기 시간 출력"""
+    with _wait_stats_lock:
+        items = sorted(wait_stats.items(), key=lambda item: -item[1][1])
+    for step, (count, total) in items:
+        print(f"  {step}: {count}회, 합계 {total:.1f}초, 평균 {total / count:.2f}초")
+
+
+def init_driver(user_data_dir=CHROME_PROFILE_DIR, lean=BROWSER_LEAN):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    
     try:
         # Chrome 설정
         options = webdriver.ChromeOptions()
-        options.add_argument("--start-maximized")
+        if lean:
+            # 경량 모드: 창 없이 실행하고 렌더러 메모리 상한 설정
+            options.add_argument("--headless=new")
+            options.add_argument("--window-size=1280,900")
+            options.add_argument(f"--js-flags=--max-old-space-size={BROWSER_RENDERER_MEMORY_MB}")
+            options.add_argument("--renderer-process-limit=2")
+            options.add_argument("--disable-background-networking")
+            options.add_argument("--disable-component-update")
+            options.add_argument("--mute-audio")
+            options.add_argument("--blink-settings=imagesEnabled=false")
+        else:
+            options.add_argument("--start-maximized")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         
@@ -84,18 +547,23 @@ def init_driver():
         options.add_argument("--disable-notifications")
         
         # ChromeProfile 디렉토리 설정 (기존 프로필 사용)
-        user_data_dir = os.path.join(os.getcwd(), "ChromeProfile")
         options.add_argument(f"--user-data-dir={user_data_dir}")
         
-        # 새 창으로 시작하기 위한 설정
-        options.add_argument("--new-window")
+        if not lean:
+            # 새 창으로 시작하기 위한 설정
+            options.add_argument("--new-window")
         
         # ChromeDriver 초기화
         service = ChromeService()
         driver = webdriver.Chrome(service=service, options=options)
         
-        driver.implicitly_wait(LOADING_WAIT_TIME)
-        print("Chrome WebDriver 초기화 성공")
+        if lean:
+            # DevTools 프로토콜로 불필요한 리소스 요청 차단
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+        
+        # 암묵적 대기는 사용하지 않음 (없는 요소를 찾을 때마다 막히지 않도록 wait_for로 단계별 대기)
+        print(f"Chrome WebDriver 초기화 성공{' (경량 모드)' if lean else ''}")
         return driver
         
     except Exception as e:
@@ -103,435 +571,3648 @@ def init_driver():
         return None
 
 
-def tistory_login(_driver):
+def get_browser_usage(_driver):
+    """chromedriver와 그 하위 크롬 프로세스 전체의 RSS 합계(MB), 열린 핸들 수, 프로세스 수
+    
+    핸들 수는 Windows에서는 핸들, 그 밖에서는 파일 디스크립터 수이며 읽을 수 없는 프로세스는 건너뛴다.
+    """
+    import psutil
+    
     try:
-        # 이미 로그인되어 있는지 확인 (프로필 아이콘 찾기)
+        root = psutil.Process(_driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except Exception:
+        return None
+        
+    rss = handles = 0
+    for process in processes:
         try:
-            profile = _driver.find_element(By.CLASS_NAME, 'link_profile')
+            rss += process.memory_info().rss
+            handles += process.num_handles() if hasattr(process, 'num_handles') else process.num_fds()
+        except psutil.Error:
+            pass
+    return {'rss_mb': round(rss / (1024 * 1024), 1), 'handles': handles, 'processes': len(processes)}
+
+
+def get_browser_rss_mb(_driver):
+    """chromedriver와 그 하위 크롬 프로세스 전체의 RSS 합계(MB)"""
+    usage = get_browser_usage(_driver)
+    return usage['rss_mb'] if usage else None
+
+
+browser_metrics = deque(maxlen=BROWSER_METRICS_MAX)
+_browser_metrics_lock = threading.Lock()
+
+
+def report_browser_metrics(_driver):
+    """포스트 한 건의 글쓰기 페이지 로딩 시간과 브라우저 메모리 기록/출력"""
+    page_load_ms = get_page_load_ms(_driver)
+    rss_mb = get_browser_rss_mb(_driver)
+    with _browser_metrics_lock:
+        browser_metrics.append({'page_load_ms': page_load_ms, 'rss_mb': rss_mb})
+    print(f"페이지 로딩 {page_load_ms if page_load_ms is not None else '-'}ms, "
+          f"브라우저 메모리 {rss_mb if rss_mb is not None else '-'}MB")
+
+
+def print_browser_metrics():
+    """포스트별 브라우저 지표 평균/최대값 출력"""
+    with _browser_metrics_lock:
+        loads = [m['page_load_ms'] for m in browser_metrics if m['page_load_ms'] is not None]
+        rss = [m['rss_mb'] for m in browser_metrics if m['rss_mb'] is not None]
+    if loads:
+        print(f"  페이지 로딩: 평균 {sum(loads) / len(loads):.0f}ms, 최대 {max(loads)}ms")
+    if rss:
+        print(f"  브라우저 메모리: 평균 {sum(rss) / len(rss):.1f}MB, 최대 {max(rss)}MB")
+
+
+def get_page_load_ms(_driver):
+    """현재 페이지의 내비게이션 시작부터 로딩 완료까지 걸린 시간(ms)"""
+    try:
+        return _driver.execute_script(NAVIGATION_TIMING_SCRIPT)
+    except Exception:
+        return None
+
+
+def export_session(_driver, path=TISTORY_SESSION_FILE):
+    """로그인된 브라우저의 쿠키(전체 도메인)와 현재 페이지 스토리지를 파일로 저장"""
+    try:
+        cookies = _driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        storage = _driver.execute_script(EXPORT_STORAGE_SCRIPT)
+        snapshot = {
+            'saved_at': time.time(),
+            'cookies': [{key: cookie[key] for key in SESSION_COOKIE_KEYS if key in cookie} for cookie in cookies],
+            'storage': storage if storage and storage.get('origin', '').startswith('http') else None
+        }
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # 여러 브라우저가 재시작하면서 동시에 저장해도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.chmod(temp_path, 0o600)
+        os.replace(temp_path, path)
+        print(f"로그인 세션을 저장했습니다: 쿠키 {len(snapshot['cookies'])}개")
+        return True
+    except Exception as e:
+        print(f"세션 저장 중 오류 발생: {str(e)}")
+        return False
+
+
+def load_session(path=TISTORY_SESSION_FILE):
+    """저장된 세션 스냅샷을 읽고 유효해 보이면 반환 (브라우저 없이 만료 시각만 확인)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except Exception as e:
+        print(f"세션 파일을 읽을 수 없습니다: {str(e)}")
+        return None
+        
+    now = time.time()
+    if now - snapshot.get('saved_at', 0) > TISTORY_SESSION_MAX_AGE:
+        return None
+        
+    for cookie in snapshot.get('cookies', []):
+        if cookie['name'] in TISTORY_AUTH_COOKIES:
+            # expires가 없거나 -1이면 브라우저 세션 쿠키 (저장 시각 기준 최대 보관 기간만 적용)
+            expires = cookie.get('expires', -1)
+            if expires is None or expires < 0 or expires > now:
+                return snapshot
+    return None
+
+
+def restore_session(_driver, path=TISTORY_SESSION_FILE):
+    """저장된 세션을 새 브라우저에 복원 (페이지 이동 없이 DevTools 명령만 사용)"""
+    snapshot = load_session(path)
+    if not snapshot:
+        return False
+        
+    try:
+        cookies = []
+        for cookie in snapshot['cookies']:
+            cookie = dict(cookie)
+            if cookie.get('expires', -1) is None or cookie.get('expires', -1) < 0:
+                cookie.pop('expires', None)
+            cookies.append(cookie)
+        _driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        
+        if snapshot.get('storage'):
+            _driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+                'source': RESTORE_STORAGE_SCRIPT % json.dumps(snapshot['storage'], ensure_ascii=False)
+            })
+        return True
+    except Exception as e:
+        print(f"세션 복원 중 오류 발생: {str(e)}")
+        return False
+
+
+def is_login_page(_driver):
+    """세션이 만료되어 로그인 페이지로 돌아왔는지 확인"""
+    return '/auth/login' in _driver.current_url or 'accounts.kakao.com' in _driver.current_url
+
+
+def tistory_login(_driver, use_session=True):
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.by import By
+    
+    try:
+        # 이미 로그인되어 있는지 확인 (프로필 아이콘 찾기, 없으면 기다리지 않고 바로 진행)
+        if _driver.find_elements(By.CLASS_NAME, 'link_profile'):
             print('이미 로그인 되어있습니다.')
             return
-        except:
-            # 로그인이 필요한 경우에만 아래 코드 실행
-            pass
             
-        _driver.get('https://www.tistory.com/auth/login')
-        _driver.implicitly_wait(LOADING_WAIT_TIME)
-        _driver.find_element(By.CLASS_NAME, 'link_kakao_id').click()
-        _driver.implicitly_wait(LOADING_WAIT_TIME)
-     
-        
+        # 저장된 세션이 유효하면 로그인 과정 없이 복원
+        # (실제로 만료된 경우 글쓰기 페이지가 로그인 페이지로 돌아가므로 그때 다시 로그인)
+        if use_session and restore_session(_driver):
+            print('저장된 로그인 세션을 복원했습니다.')
+            return
+            
         if not KAKAO_ID or not KAKAO_PW:
             raise Exception("카카오 로그인 정보가 .env 파일에 설정되지 않았습니다.")
             
+        _driver.get('https://www.tistory.com/auth/login')
+        wait_for(_driver, 'login_page',
+                 EC.element_to_be_clickable((By.CLASS_NAME, 'link_kakao_id'))).click()
+        
         # 카카오 아이디 입력
-        id_field = WebDriverWait(_driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[name='loginId']"))
-        )
+        id_field = wait_for(_driver, 'kakao_login_form',
+                            EC.presence_of_element_located((By.CSS_SELECTOR, "input[name='loginId']")))
         id_field.click()
         id_field.send_keys(KAKAO_ID)
         
         # 카카오 비밀번호 입력
-        pw_field = WebDriverWait(_driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[name='password']"))
-        )
+        pw_field = wait_for(_driver, 'kakao_login_form',
+                            EC.presence_of_element_located((By.CSS_SELECTOR, "input[name='password']")))
         pw_field.click()
         pw_field.send_keys(KAKAO_PW)
         
         # 로그인 버튼 클릭
-        login_button = WebDriverWait(_driver, 10).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit']"))
-        )
+        login_button = wait_for(_driver, 'kakao_login_form',
+                                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[type='submit']")))
         login_button.click()
     
-        print(f'\n{C_BOLD}{C_RED}{C_BGBLACK}주의: 로그인 진행 중... 60초 동안 대기합니다.{C_END}')
-        # 대기 시간 3분에서 1분으로 단축
-        WebDriverWait(_driver, 60).until(
-            EC.presence_of_element_located(
-                (By.CLASS_NAME, 'link_profile')
-            )
-        )
+        print(f'\n{C_BOLD}{C_RED}{C_BGBLACK}주의: 로그인 진행 중... 최대 {WAIT_BUDGETS["login_complete"]}초 동안 대기합니다.{C_END}')
+        wait_for(_driver, 'login_complete',
+                 EC.presence_of_element_located((By.CLASS_NAME, 'link_profile')))
         print("로그인 완료!")
+        
+        # 다음 브라우저부터는 로그인 과정 없이 복원할 수 있도록 세션 저장
+        export_session(_driver)
     except Exception as e:
         print(f'로그인 과정에서 오류 발생: {str(e)}')
     
 
-def search_youtube(query):
-    # URL이 직접 입력된 경우 처리
-    if 'youtube.com/watch?v=' in query or 'youtu.be/' in query:
-        try:
-            # URL에서 video_id 추출
-            if 'youtube.com/watch?v=' in query:
-                video_id = query.split('watch?v=')[1].split('&')[0]
-            elif 'youtu.be/' in query:
-                video_id = query.split('youtu.be/')[1].split('?')[0]
-            
-            print(f"YouTube URL이 감지되었습니다. Video ID: {video_id}")
+_youtube_discovery_doc = None
+_youtube_discovery_lock = threading.Lock()
+_youtube_local = threading.local()
+
+
+def load_youtube_discovery():
+    """YouTube Data API discovery 문서를 한 번만 읽어서 재사용
+    
+    라이브러리 내장 문서 → CACHE_DIR에 받아 둔 문서 → 네트워크 순서로 찾는다.
+    받아 둔 문서가 YOUTUBE_DISCOVERY_MAX_AGE보다 오래됐으면 네트워크에서 다시 받아 갱신하고,
+    다시 받지 못하면 오래된 문서라도 사용한다.
+    """
+    from googleapiclient.discovery import DISCOVERY_URI
+    from googleapiclient import discovery_cache
+    import httplib2
+    
+    global _youtube_discovery_doc
+    with _youtube_discovery_lock:
+        if _youtube_discovery_doc is not None:
+            return _youtube_discovery_doc
             
-            # API 키 유효성 확인
-            if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == '':
-                print("YouTube API 키가 설정되지 않았습니다. 기본 정보만으로 진행합니다.")
-                # API 키 없이 기본 데이터 생성
-                data = {
-                    'video_id': video_id,
-                    'title': f"YouTube 영상 ({video_id})",
-                    'description': "YouTube 영상에 대한 설명입니다.",
-                    'channel_title': "YouTube 채널",
-                    'upload_date': datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    'view_count': "0",
-                    'tags': [],
-                    'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                # YouTube 페이지 직접 스크래핑 제안 메시지
-                print("참고: API 키가 없어 상세 정보를 가져올 수 없습니다.")
-            else:
-                # API 키가 있는 경우 정보 가져오기 시도
+        content = discovery_cache.get_static_doc('youtube', 'v3')
+        if not content:
+            cache_file = os.path.join(CACHE_DIR, 'youtube_v3_discovery.json')
+            cached = None
+            if os.path.exists(cache_file):
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cached = f.read()
+                if time.time() - os.path.getmtime(cache_file) < YOUTUBE_DISCOVERY_MAX_AGE:
+                    content = cached
+                    
+            if not content:
                 try:
-                    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-                    video_response = youtube.videos().list(
-                        part='snippet,statistics',
-                        id=video_id
-                    ).execute()
+                    url = DISCOVERY_URI.replace('{api}', 'youtube').replace('{apiVersion}', 'v3')
+                    response, body = httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT).request(url)
+                    if response.status >= 400:
+                        raise Exception(f"discovery 문서를 가져올 수 없습니다: HTTP {response.status}")
+                    content = body.decode('utf-8')
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    with open(cache_file, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                except Exception as e:
+                    if not cached:
+                        raise
+                    print(f"{C_YELLOW}discovery 문서 갱신 실패, 받아 둔 문서를 사용합니다: {str(e)}{C_END}")
+                    content = cached
                     
-                    if not video_response['items']:
-                        raise Exception("비디오 정보를 찾을 수 없습니다.")
-                        
-                    video_info = video_response['items'][0]
-                    data = {
-                        'video_id': video_id,
-                        'title': video_info['snippet']['title'],
-                        'description': video_info['snippet']['description'],
-                        'channel_title': video_info['snippet']['channelTitle'],
-                        'upload_date': video_info['snippet']['publishedAt'],
-                        'view_count': video_info['statistics']['viewCount'],
-                        'tags': video_info['snippet'].get('tags', []),
-                        'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                except Exception as api_err:
-                    print(f"YouTube API 호출 실패: {str(api_err)}")
-                    # API 호출 실패 시 기본 데이터 사용
-                    data = {
-                        'video_id': video_id,
-                        'title': f"YouTube 영상 ({video_id})",
-                        'description': "YouTube API 호출 실패로 상세 정보를 가져올 수 없습니다.",
-                        'channel_title': "YouTube 채널",
-                        'upload_date': datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'view_count': "0",
-                        'tags': [],
-                        'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }
+        _youtube_discovery_doc = json.loads(content)
+        return _youtube_discovery_doc
+
+
+def get_youtube_client():
+    """스레드별로 한 번만 생성해 재사용하는 YouTube API 클라이언트
+    
+    httplib2.Http는 스레드 안전하지 않으므로 스레드마다 별도의 연결을 유지하고,
+    같은 스레드 안에서는 keep-alive 연결을 계속 재사용한다.
+    """
+    youtube = getattr(_youtube_local, 'client', None)
+    if youtube is None:
+        from googleapiclient.discovery import build_from_document
+        import httplib2
+        
+        youtube = build_from_document(
+            load_youtube_discovery(),
+            developerKey=YOUTUBE_API_KEY,
+            http=httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT),
+            client_options={'api_endpoint': YOUTUBE_API_ENDPOINT} if YOUTUBE_API_ENDPOINT else None
+        )
+        _youtube_local.client = youtube
+    return youtube
+
+
+def extract_video_id(query):
+    """YouTube URL에서 video_id 추출 (URL이 아니면 None)"""
+    if 'youtube.com/watch?v=' in query:
+        return query.split('watch?v=')[1].split('&')[0]
+    elif 'youtu.be/' in query:
+        return query.split('youtu.be/')[1].split('?')[0]
+    return None
+
+
+def video_item_to_data(video_info):
+    """videos().list 응답 항목을 저장용 데이터로 변환"""
+    return {
+        'video_id': video_info['id'],
+        'title': video_info['snippet']['title'],
+        'description': video_info['snippet']['description'],
+        'channel_title': video_info['snippet']['channelTitle'],
+        'upload_date': video_info['snippet']['publishedAt'],
+        'view_count': video_info['statistics'].get('viewCount', '0'),
+        'duration': video_info.get('contentDetails', {}).get('duration'),
+        'tags': video_info['snippet'].get('tags', []),
+        'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def parse_iso_duration(duration):
+    """ISO 8601 영상 길이(PT1H2M3S)를 초 단위로 변환 (형식이 다르면 None)"""
+    match = re.fullmatch(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?', duration or '')
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(value or 0) for value in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def fetch_videos_data(video_ids, youtube=None):
+    """여러 video_id를 영상 정보 저장소에서 먼저 찾고, 없거나 오래된 것만 50개 단위 videos().list 호출로 일괄 조회
+    
+    반환값은 {video_id: data} 이며, 찾지 못한 영상은 포함되지 않는다.
+    """
+    store = get_metadata_store()
+    results = {}
+    missing = []
+    
+    for video_id in dict.fromkeys(video_ids):
+        data = store.get_cached_video(video_id)
+        if data:
+            results[video_id] = data
+        else:
+            missing.append(video_id)
+            
+    if results:
+        print(f"캐시된 영상 정보를 사용합니다: {len(results)}건")
+        
+    if missing and youtube is None:
+        youtube = get_youtube_client()
+        
+    for start in range(0, len(missing), YOUTUBE_BATCH_SIZE):
+        chunk = missing[start:start + YOUTUBE_BATCH_SIZE]
+        with span('youtube_videos', video_ids=chunk):
+            video_response = execute_youtube('videos', youtube.videos().list(
+                part='snippet,statistics,contentDetails',
+                id=','.join(chunk),
+                fields=YOUTUBE_VIDEO_FIELDS,
+                maxResults=YOUTUBE_BATCH_SIZE
+            ))
+        
+        for video_info in video_response.get('items', []):
+            data = video_item_to_data(video_info)
+            store.cache_video(data)
+            results[data['video_id']] = data
+            
+    return results
+
+
+def fetch_video_data(video_id, youtube=None):
+    """캐시를 먼저 확인하고, 없으면 YouTube Data API로 영상 정보 조회"""
+    return fetch_videos_data([video_id], youtube).get(video_id)
+
+
+def execute_youtube(kind, request):
+    """남은 할당량을 확인하고 YouTube API 요청 실행 (실패한 요청도 할당량을 쓰므로 항상 기록)"""
+    scheduler = get_quota_scheduler()
+    scheduler.require('youtube', YOUTUBE_QUOTA_COSTS[kind])
+    try:
+        return request.execute()
+    finally:
+        scheduler.record('youtube', YOUTUBE_QUOTA_COSTS[kind])
+
+
+def search_video_id(query, youtube):
+    """검색어로 첫 번째 영상의 video_id 조회 (결과가 없으면 None)"""
+    with span('youtube_search', query=query):
+        search_response = execute_youtube('search', youtube.search().list(
+            q=query,
+            part='id',
+            maxResults=5,
+            type='video',
+            fields=YOUTUBE_SEARCH_FIELDS
+        ))
+    
+    items = search_response.get('items', [])
+    if not items:
+        return None
+    return items[0]['id']['videoId']
+
+
+def search_video_ids(query, youtube, pages=1, page_size=SEARCH_PAGE_SIZE):
+    """검색어로 pages쪽까지 video_id 후보를 모음 (검색 순서 유지, 중복 제외)"""
+    video_ids = []
+    page_token = None
+    for page in range(pages):
+        with span('youtube_search', query=query, page=page):
+            search_response = execute_youtube('search', youtube.search().list(
+                q=query,
+                part='id',
+                maxResults=min(page_size, YOUTUBE_BATCH_SIZE),
+                type='video',
+                pageToken=page_token,
+                fields=YOUTUBE_SEARCH_PAGE_FIELDS
+            ))
+        video_ids += [item['id']['videoId'] for item in search_response.get('items', [])]
+        page_token = search_response.get('nextPageToken')
+        if not page_token:
+            break
+    return list(dict.fromkeys(video_ids))
+
+
+class SearchRanker:
+    """검색 결과 후보 전체를 점수로 비교해서 상위 영상을 고르는 순위 계산기
+    
+    검색어마다 search().list로 후보 ID를 pages쪽까지 모은 뒤, 모든 검색어의 후보 통계를 videos().list 일괄 조회로
+    한꺼번에 받아서 조회수, 최신성, 길이, 채널 허용 목록 점수를 weights로 가중합한다.
+    이미 발행한 영상은 후보에서 제외한다.
+    """
+    
+    def __init__(self, enabled=SEARCH_RANK, per_query=SEARCH_PER_QUERY, pages=SEARCH_PAGES, weights=None,
+                 channels=None, duration_minutes=RANK_DURATION_MINUTES, half_life_days=RANK_RECENCY_HALF_LIFE_DAYS):
+        self.enabled = enabled or per_query > 1
+        self.per_query = per_query
+        self.pages = pages
+        self.weights = dict(RANK_WEIGHTS if weights is None else weights)
+        self.channels = {name.lower() for name in (RANK_CHANNELS if channels is None else channels)}
+        low, _, high = duration_minutes.partition('-')
+        self.duration_range = (float(low or 0) * 60, float(high or low or 0) * 60)
+        self.half_life_days = half_life_days
+        
+    def criteria(self, data, now):
+        """항목별 점수 (0~1)"""
+        views = int(data.get('view_count') or 0)
+        scores = {'views': min(1.0, math.log10(views + 1) / 7)}  # 조회수 1000만이면 1
+        
+        try:
+            uploaded = datetime.strptime(data['upload_date'][:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+            age_days = max(0.0, (now - uploaded).total_seconds() / 86400)
+            scores['recency'] = 0.5 ** (age_days / self.half_life_days)
+        except (KeyError, TypeError, ValueError):
+            scores['recency'] = 0.0
+            
+        seconds = parse_iso_duration(data.get('duration'))
+        low, high = self.duration_range
+        if seconds is None:
+            scores['duration'] = 0.5  # 길이를 모르는 캐시 항목
+        elif seconds < low:
+            scores['duration'] = seconds / low
+        elif high and seconds > high:
+            scores['duration'] = high / seconds
+        else:
+            scores['duration'] = 1.0
             
-            # JSON 파일 저장
-            os.makedirs('json', exist_ok=True)
-            filename = f"json/youtube_video_{video_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        if self.channels:
+            scores['channel'] = 1.0 if (data.get('channel_title') or '').lower() in self.channels else 0.0
+        return scores
+        
+    def score(self, data, now=None):
+        """가중합 점수"""
+        scores = self.criteria(data, now or datetime.now(timezone.utc))
+        return sum(self.weights.get(name, 0) * value for name, value in scores.items())
+        
+    def rank(self, videos):
+        """이미 발행한 영상을 빼고 점수가 높은 순서로 정렬한 영상 정보 목록"""
+        store = get_metadata_store()
+        now = datetime.now(timezone.utc)
+        candidates = [data for data in videos if not store.is_published(data['video_id'])]
+        return sorted(candidates, key=lambda data: self.score(data, now), reverse=True)
+        
+    def search(self, queries, top_n=1, youtube=None):
+        """검색어별 상위 top_n개 영상 정보 ({query: [data, ...]}, 모든 후보 통계는 한 번에 일괄 조회)"""
+        if youtube is None:
+            youtube = get_youtube_client()
+        candidate_ids = {}
+        for query in queries:
+            try:
+                candidate_ids[query] = search_video_ids(query, youtube, self.pages)
+            except Exception as e:
+                print(f"YouTube 검색 중 오류 발생 ({query}): {str(e)}")
+                candidate_ids[query] = []
                 
-            return filename
+        videos = fetch_videos_data([video_id for ids in candidate_ids.values() for video_id in ids], youtube)
+        
+        results = {}
+        for query, ids in candidate_ids.items():
+            ranked = self.rank([videos[video_id] for video_id in ids if video_id in videos])
+            results[query] = ranked[:top_n]
+            print(f"검색 후보 {len(ids)}건 중 상위 {len(results[query])}건 선택: {query}")
+            for data in results[query]:
+                print(f"  {self.score(data):.2f}  {data['title']} ({data['video_id']}, 조회수 {data['view_count']})")
+        return results
+        
+    def expand(self, queries, youtube=None, budgets=None):
+        """검색어를 상위 per_query개 영상의 URL 입력으로 바꿈 (URL 입력은 그대로, 결과가 없으면 검색어 유지)
+        
+        한 번 펼친 검색어는 작업 저장소에 기록한 URL 목록을 그대로 써서 다시 검색하지 않는다.
+        새로 검색할 검색어는 검색 비용까지 포함해서 남은 할당량(budgets 항목) 안에 드는 것만 검색하고,
+        나머지는 검색어 그대로 남겨서 호출한 쪽의 plan()이 미루게 한다.
+        """
+        search_queries = [query for query in queries if not extract_video_id(query)]
+        if self.per_query <= 1 or not search_queries or not YOUTUBE_API_KEY:
+            return queries
             
+        store = get_job_store()
+        saved = {}
+        if store:
+            for query in search_queries:
+                urls = store.get_expansion(query)
+                if urls:
+                    saved[query] = urls
+        pending = [query for query in search_queries if query not in saved]
+        if pending:
+            pending, _ = get_quota_scheduler().plan(pending, budgets=budgets or QuotaScheduler.BUDGETS)
+        ranked = self.search(pending, self.per_query, youtube) if pending else {}
+        
+        expanded = []
+        for query in queries:
+            urls = saved.get(query)
+            if urls is None:
+                videos = ranked.get(query)
+                if not videos:
+                    expanded.append(query)
+                    continue
+                urls = [f"https://youtu.be/{data['video_id']}" for data in videos]
+                if store:
+                    store.save_expansion(query, urls)
+            for url in urls:
+                # 시트에서 읽은 검색어이면 영상 URL의 진행 상태도 원래 행에 기록
+                alias_sheet_query(url, query)
+                expanded.append(url)
+        return list(dict.fromkeys(expanded))
+
+
+_search_ranker = None
+_search_ranker_lock = threading.Lock()
+
+
+def get_search_ranker():
+    """프로세스 전체에서 공유하는 검색 결과 순위 계산기"""
+    global _search_ranker
+    with _search_ranker_lock:
+        if _search_ranker is None:
+            _search_ranker = SearchRanker()
+        return _search_ranker
+
+
+def resolve_videos(queries, youtube=None):
+    """여러 URL/검색어를 한꺼번에 영상 정보로 변환
+    
+    URL은 video_id를 바로 추출하고, 검색어는 search().list로 video_id만 받은 뒤
+    모든 ID를 fetch_videos_data로 묶어서 조회한다. 반환값은 {query: data 또는 None}.
+    """
+    if not YOUTUBE_API_KEY:
+        print("YouTube API 키가 설정되지 않았습니다. 일괄 조회를 건너뜁니다.")
+        return {query: None for query in queries}
+        
+    # 순위 모드이면 검색어마다 후보 전체에서 가장 점수가 높은 영상을 고름
+    ranker = get_search_ranker()
+    ranked = {}
+    search_queries = [query for query in queries if not extract_video_id(query)]
+    if ranker.enabled and search_queries:
+        try:
+            ranked = {query: videos[0] for query, videos in ranker.search(search_queries, 1, youtube).items() if videos}
         except Exception as e:
-            print(f"YouTube URL 처리 중 오류 발생: {str(e)}")
-            return None
+            print(f"YouTube 검색 결과 순위 계산 중 오류 발생: {str(e)}")
+            
+    query_ids = {}
+    for query in queries:
+        video_id = extract_video_id(query)
+        if query in ranked:
+            video_id = ranked[query]['video_id']
+        elif not video_id:
+            try:
+                if youtube is None:
+                    youtube = get_youtube_client()
+                video_id = search_video_id(query, youtube)
+                if not video_id:
+                    print(f"검색 결과가 없습니다: {query}")
+            except Exception as e:
+                print(f"YouTube 검색 중 오류 발생 ({query}): {str(e)}")
+        query_ids[query] = video_id
+        
+    try:
+        videos = {data['video_id']: data for data in ranked.values()}
+        videos.update(fetch_videos_data([v for v in query_ids.values() if v and v not in videos], youtube))
+    except Exception as e:
+        print(f"YouTube 일괄 조회 중 오류 발생: {str(e)}")
+        videos = {}
+        
+    print(f"영상 정보 일괄 조회 완료: {len(videos)}/{len(queries)}건")
+    return {query: videos.get(video_id) if video_id else None for query, video_id in query_ids.items()}
+
+
+class MetadataStore:
+    """영상 정보와 생성된 글(마크다운, 제목, HTML)을 video_id 기준으로 보관하는 SQLite 저장소
+    
+    영상마다 JSON 파일을 만들던 방식을 대신하며, video_id와 수집/업로드 날짜로 조회할 수 있다.
+    YouTube API 응답 캐시도 겸해서 fetched_at이 YOUTUBE_CACHE_TTL 안이면 API를 다시 호출하지 않고,
+    작업 저장소는 결과물을 따로 복사하지 않고 video_id로 이 레코드를 가리킨다.
+    캐시로만 남은 레코드(선택/생성/발행되지 않은 검색 후보)는 evict_cache()가 만료와 LRU 기준으로 정리한다.
+    """
+    
+    # 수집 날짜, 생성된 글, 발행 기록이 모두 없는 레코드는 API 응답 캐시일 뿐이라 지워도 됨
+    CACHE_ONLY = 'search_date IS NULL AND markdown IS NULL AND published_at IS NULL'
+    
+    COLUMNS = ['video_id', 'data', 'search_date', 'upload_date', 'markdown', 'title', 'html_content', 'generated_at',
+               'published_at', 'post_url']
+    
+    def __init__(self, path=None):
+        self.path = path or METADATA_DB
+        self.lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS videos ('
+            'video_id TEXT PRIMARY KEY, data TEXT NOT NULL, search_date TEXT, upload_date TEXT, '
+            'markdown TEXT, title TEXT, html_content TEXT, generated_at REAL, updated_at REAL NOT NULL, '
+            'published_at REAL, post_url TEXT)'
+        )
+        # 발행 기록 컬럼이 없던 저장소에 컬럼 추가
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(videos)')}
+        for column, column_type in (('published_at', 'REAL'), ('post_url', 'TEXT'), ('fetched_at', 'REAL'),
+                                    ('accessed_at', 'REAL')):
+            if column not in existing:
+                self.conn.execute(f'ALTER TABLE videos ADD COLUMN {column} {column_type}')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_videos_search_date ON videos (search_date)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_videos_upload_date ON videos (upload_date)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_videos_fetched_at ON videos (fetched_at)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_videos_accessed_at ON videos (accessed_at)')
+        # 유사 영상 검색용 MinHash 서명과 LSH 밴드 버킷
+        self.conn.execute('CREATE TABLE IF NOT EXISTS signatures (video_id TEXT PRIMARY KEY, signature TEXT NOT NULL)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS signature_bands ('
+            'band INTEGER NOT NULL, bucket TEXT NOT NULL, video_id TEXT NOT NULL, PRIMARY KEY (band, bucket, video_id))'
+        )
+        self.conn.commit()
+        
+    def _to_record(self, row):
+        record = dict(zip(self.COLUMNS, row))
+        record['data'] = json.loads(record['data'])
+        return record
+        
+    def put_video(self, data):
+        """영상 정보 저장 (이미 있으면 영상 정보만 갱신하고 생성된 글은 유지)"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT INTO videos (video_id, data, search_date, upload_date, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(video_id) DO UPDATE SET data = excluded.data, search_date = excluded.search_date, '
+                'upload_date = excluded.upload_date, updated_at = excluded.updated_at',
+                (data['video_id'], json.dumps(data, ensure_ascii=False),
+                 data.get('search_date'), data.get('upload_date'), time.time())
+            )
+            self.conn.commit()
+            
+    def cache_video(self, data, ttl=YOUTUBE_CACHE_TTL):
+        """API에서 받은 영상 정보를 캐시로 저장 (수집 날짜는 건드리지 않아서 검색 후보는 --videos 목록에 나오지 않음)"""
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT INTO videos (video_id, data, upload_date, fetched_at, accessed_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(video_id) DO UPDATE SET data = excluded.data, fetched_at = excluded.fetched_at, '
+                'accessed_at = excluded.accessed_at, updated_at = excluded.updated_at',
+                (data['video_id'], json.dumps(data, ensure_ascii=False), data.get('upload_date'), now, now, now)
+            )
+            self.conn.commit()
+            
+    def get_cached_video(self, video_id, ttl=YOUTUBE_CACHE_TTL):
+        """API에서 받은 지 ttl초가 지나지 않은 영상 정보 (없으면 None, 찾으면 사용 시각 갱신)"""
+        if ttl <= 0:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT data FROM videos WHERE video_id = ? AND fetched_at > ?', (video_id, now - ttl)
+            ).fetchone()
+            if row:
+                self.conn.execute('UPDATE videos SET accessed_at = ? WHERE video_id = ?', (now, video_id))
+                self.conn.commit()
+        return json.loads(row[0]) if row else None
+        
+    def evict_cache(self, max_entries=YOUTUBE_CACHE_MAX_ENTRIES, ttl=YOUTUBE_CACHE_TTL):
+        """캐시로만 남은 레코드 중 만료된 것을 지우고, max_entries를 넘으면 오래 사용하지 않은 것부터 제거
+        
+        배치나 fetch 단계가 끝날 때 한 번 호출한다. 지운 레코드 수를 반환한다.
+        """
+        with self.lock:
+            removed = self.conn.execute(
+                f'DELETE FROM videos WHERE {self.CACHE_ONLY} AND (fetched_at IS NULL OR fetched_at <= ?)',
+                (time.time() - max(ttl, 0),)
+            ).rowcount
+            if max_entries > 0:
+                count = self.conn.execute(f'SELECT COUNT(*) FROM videos WHERE {self.CACHE_ONLY}').fetchone()[0]
+                if count > max_entries:
+                    removed += self.conn.execute(
+                        f'DELETE FROM videos WHERE video_id IN (SELECT video_id FROM videos WHERE {self.CACHE_ONLY} '
+                        'ORDER BY accessed_at LIMIT ?)', (count - max_entries,)
+                    ).rowcount
+            self.conn.commit()
+        return removed
+        
+    def put_markdown(self, video_id, markdown_content):
+        """영상으로 생성한 마크다운 저장 (이전에 변환한 제목/HTML은 지움)"""
+        self.put_content(video_id, markdown_content, None, None)
+        
+    def put_content(self, video_id, markdown_content, title, html_content):
+        """영상으로 생성한 마크다운과 변환된 제목/HTML 저장"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'UPDATE videos SET markdown = ?, title = ?, html_content = ?, generated_at = ?, updated_at = ? '
+                'WHERE video_id = ?',
+                (markdown_content, title, html_content, now, now, video_id)
+            )
+            self.conn.commit()
+            
+    def mark_published(self, video_id, url=None):
+        """영상으로 만든 글이 발행되었음을 기록"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'UPDATE videos SET published_at = ?, post_url = COALESCE(?, post_url), updated_at = ? WHERE video_id = ?',
+                (now, url, now, video_id)
+            )
+            self.conn.commit()
+            
+    def is_published(self, video_id):
+        """영상으로 만든 글이 발행된 적이 있는지 여부"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM videos WHERE video_id = ? AND published_at IS NOT NULL', (video_id,)
+            ).fetchone()
+        return row is not None
+        
+    def put_signature(self, video_id, signature, buckets):
+        """영상의 MinHash 서명과 밴드별 버킷 저장 (이전 버킷은 교체)"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO signatures (video_id, signature) VALUES (?, ?)',
+                (video_id, json.dumps(signature))
+            )
+            self.conn.execute('DELETE FROM signature_bands WHERE video_id = ?', (video_id,))
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO signature_bands (band, bucket, video_id) VALUES (?, ?, ?)',
+                [(band, bucket, video_id) for band, bucket in enumerate(buckets)]
+            )
+            self.conn.commit()
+            
+    def similar_candidates(self, buckets):
+        """밴드 버킷이 하나라도 같은 영상의 {video_id: 서명}"""
+        with self.lock:
+            video_ids = set()
+            for band, bucket in enumerate(buckets):
+                video_ids.update(row[0] for row in self.conn.execute(
+                    'SELECT video_id FROM signature_bands WHERE band = ? AND bucket = ?', (band, bucket)
+                ))
+            return {
+                video_id: json.loads(signature)
+                for video_id in video_ids
+                for (signature,) in self.conn.execute(
+                    'SELECT signature FROM signatures WHERE video_id = ?', (video_id,)
+                )
+            }
+            
+    def get(self, video_id):
+        """video_id로 레코드 조회 (없으면 None)"""
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return self._to_record(row) if row else None
+        
+    def find_by_date(self, date, field='search_date'):
+        """수집 날짜(search_date) 또는 업로드 날짜(upload_date)가 date(YYYY-MM-DD)인 레코드 목록"""
+        if field not in ('search_date', 'upload_date'):
+            raise ValueError(f"지원하지 않는 날짜 필드입니다: {field}")
+        # 날짜 문자열 범위로 비교해서 인덱스를 사용 (search_date는 공백, upload_date는 T로 시각과 구분)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM videos WHERE {field} >= ? AND {field} < ? ORDER BY {field}",
+                (date, date + '~')
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+
+_metadata_store = None
+_metadata_store_lock = threading.Lock()
+
+
+def get_metadata_store():
+    """프로세스 전체에서 공유하는 영상 정보 저장소"""
+    global _metadata_store
+    with _metadata_store_lock:
+        if _metadata_store is None:
+            _metadata_store = MetadataStore()
+        return _metadata_store
+
+
+def save_video_record(data):
+    """영상 정보를 저장소에 기록하고 그대로 반환 (다음 단계에는 파일 경로 대신 이 레코드를 넘김)"""
+    get_metadata_store().put_video(data)
+    return data
+
+
+class DuplicateVideoError(Exception):
+    """이미 발행했거나 처리 중인 영상과 같거나 비슷해서 생성을 건너뛸 때 발생"""
+
+
+class DuplicateIndex:
+    """이미 발행한 영상과 이번 실행에서 처리 중인 영상을 기준으로 중복/유사 영상을 찾는 색인
+    
+    제목, 태그, 설명 앞부분의 문자 n-gram(shingle)으로 MinHash 서명을 만들어 MetadataStore에 저장하고,
+    LSH 밴드 버킷이 겹치는 후보 중 추정 자카드 유사도가 threshold 이상인 영상을 중복으로 본다.
+    """
+    
+    def __init__(self, store=None, threshold=DUPLICATE_THRESHOLD, enabled=DUPLICATE_CHECK):
+        self.store = store or get_metadata_store()
+        self.threshold = threshold
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.claimed = set()  # 이번 실행에서 생성을 시작한 video_id
+        self.stats = {'checked': 0, 'exact': 0, 'similar': 0}
+        # 저장된 서명과 비교해야 하므로 해시 계수는 고정 시드로 만든다
+        rng = random.Random(20240601)
+        self.coefficients = [
+            (rng.randrange(1, MINHASH_PRIME), rng.randrange(0, MINHASH_PRIME)) for _ in range(MINHASH_PERMUTATIONS)
+        ]
+        
+    @staticmethod
+    def shingles(video_data):
+        """제목, 태그, 설명 앞부분을 정규화한 문자 n-gram 집합"""
+        text = ' '.join([
+            video_data.get('title') or '',
+            ' '.join(video_data.get('tags') or []),
+            (video_data.get('description') or '')[:DUPLICATE_DESCRIPTION_CHARS]
+        ])
+        text = ' '.join(re.findall(r'\w+', text.lower()))
+        if len(text) <= SHINGLE_SIZE:
+            return {text}
+        return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+        
+    def signature(self, video_data):
+        """shingle 집합의 MinHash 서명 (해시 함수별 최솟값 목록)"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for shingle in self.shingles(video_data)
+        ]
+        return [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in self.coefficients]
+        
+    @staticmethod
+    def buckets(signature):
+        """서명을 밴드로 나눈 버킷 키 목록"""
+        rows = len(signature) // MINHASH_BANDS
+        return [
+            hashlib.md5(','.join(map(str, signature[band * rows:(band + 1) * rows])).encode()).hexdigest()[:16]
+            for band in range(MINHASH_BANDS)
+        ]
+        
+    @staticmethod
+    def similarity(first, second):
+        """두 서명에서 추정한 자카드 유사도"""
+        return sum(1 for a, b in zip(first, second) if a == b) / len(first)
+        
+    def check(self, video_data):
+        """중복이면 DuplicateVideoError, 아니면 영상을 처리 중으로 등록
+        
+        같은 영상이 이미 발행됐거나 이번 실행에서 처리 중이면 완전 중복, 서명이 비슷한 영상이
+        발행됐거나 처리 중이면 유사 중복으로 본다. (API 정보 없이 만든 기본 레코드는 유사도 검사 제외)
+        """
+        if not self.enabled:
+            return
+        video_id = video_data['video_id']
+        with self.lock:
+            self.stats['checked'] += 1
+            if video_id in self.claimed or self.store.is_published(video_id):
+                self.stats['exact'] += 1
+                raise DuplicateVideoError(f"이미 발행했거나 처리 중인 영상입니다: {video_id}")
+                
+            if not video_data.get('placeholder'):
+                signature = self.signature(video_data)
+                buckets = self.buckets(signature)
+                for other_id, other_signature in self.store.similar_candidates(buckets).items():
+                    if other_id == video_id:
+                        continue
+                    score = self.similarity(signature, other_signature)
+                    if score >= self.threshold and (other_id in self.claimed or self.store.is_published(other_id)):
+                        self.stats['similar'] += 1
+                        raise DuplicateVideoError(f"{other_id} 영상과 내용이 비슷합니다 (유사도 {score:.2f})")
+                self.store.put_signature(video_id, signature, buckets)
+                
+            self.claimed.add(video_id)
+            
+    def release(self, video_id):
+        """생성/발행에 실패한 영상을 처리 중 목록에서 제거 (같은 실행에서 다시 시도할 수 있도록)"""
+        with self.lock:
+            self.claimed.discard(video_id)
+
+
+_duplicate_index = None
+_duplicate_index_lock = threading.Lock()
+
+
+def get_duplicate_index():
+    """프로세스 전체에서 공유하는 중복 영상 색인"""
+    global _duplicate_index
+    with _duplicate_index_lock:
+        if _duplicate_index is None:
+            _duplicate_index = DuplicateIndex()
+        return _duplicate_index
+
+
+def mark_video_published(video_id, url=None):
+    """발행 성공을 영상 저장소에 기록 (이후 같은/비슷한 영상은 생성 전에 건너뜀)"""
+    if video_id:
+        get_metadata_store().mark_published(video_id, url)
+
+
+def search_youtube(query):
+    # URL이 직접 입력된 경우 처리
+    video_id = extract_video_id(query)
+    if video_id:
+        try:
+            print(f"YouTube URL이 감지되었습니다. Video ID: {video_id}")
+            
+            # API 키 유효성 확인
+            if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == '':
+                print("YouTube API 키가 설정되지 않았습니다. 기본 정보만으로 진행합니다.")
+                # API 키 없이 기본 데이터 생성
+                data = {
+                    'video_id': video_id,
+                    'title': f"YouTube 영상 ({video_id})",
+                    'description': "YouTube 영상에 대한 설명입니다.",
+                    'channel_title': "YouTube 채널",
+                    'upload_date': datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'view_count': "0",
+                    'tags': [],
+                    'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'placeholder': True  # API 정보 없이 만든 기본 레코드
+                }
+                
+                # YouTube 페이지 직접 스크래핑 제안 메시지
+                print("참고: API 키가 없어 상세 정보를 가져올 수 없습니다.")
+            else:
+                # API 키가 있는 경우 정보 가져오기 시도
+                try:
+                    data = fetch_video_data(video_id)
+                    
+                    if not data:
+                        raise Exception("비디오 정보를 찾을 수 없습니다.")
+                except Exception as api_err:
+                    print(f"YouTube API 호출 실패: {str(api_err)}")
+                    # API 호출 실패 시 기본 데이터 사용
+                    data = {
+                        'video_id': video_id,
+                        'title': f"YouTube 영상 ({video_id})",
+                        'description': "YouTube API 호출 실패로 상세 정보를 가져올 수 없습니다.",
+                        'channel_title': "YouTube 채널",
+                        'upload_date': datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        'view_count': "0",
+                        'tags': [],
+                        'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'placeholder': True  # API 정보 없이 만든 기본 레코드
+                    }
+            
+            # 저장소에 기록 후 영상 정보 반환
+            return save_video_record(data)
+            
+        except Exception as e:
+            print(f"YouTube URL 처리 중 오류 발생: {str(e)}")
+            return None
+    
+    # 일반 검색어인 경우 기존 API 검색 로직 실행
+    try:
+        # API 키 확인
+        if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == '':
+            print("YouTube API 키가 설정되지 않았습니다. API 검색을 진행할 수 없습니다.")
+            return None
+            
+        youtube = get_youtube_client()
+        ranker = get_search_ranker()
+        if ranker.enabled:
+            # 후보 전체를 비교해서 점수가 가장 높은 영상 선택
+            videos = ranker.search([query], 1, youtube)[query]
+            if not videos:
+                print("검색 결과가 없습니다.")
+                return None
+            return save_video_record(videos[0])
+            
+        # API를 통한 검색 (첫 번째 결과 선택)
+        video_id = search_video_id(query, youtube)
+        
+        if not video_id:
+            print("검색 결과가 없습니다.")
+            return None
+        
+        # 비디오 상세 정보 가져오기 (캐시 우선)
+        data = fetch_video_data(video_id, youtube)
+        
+        if not data:
+            print("비디오 정보를 찾을 수 없습니다.")
+            return None
+        
+        # 저장소에 기록 후 영상 정보 반환
+        return save_video_record(data)
+    
+    except Exception as e:
+        print(f"YouTube 검색 중 오류 발생: {str(e)}")
+        return None
+
+
+class GeminiCache:
+    """(모델, 프롬프트, 생성 설정) 해시를 키로 하는 Gemini 응답 디스크 캐시
+    
+    파일 수정 시각을 마지막 사용 시각으로 사용해서, 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용하지 않은 응답부터 지운다.
+    """
+    
+    def __init__(self, cache_dir=None, max_bytes=GEMINI_CACHE_MAX_BYTES, bypass=GEMINI_CACHE_BYPASS):
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'gemini')
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+    @staticmethod
+    def make_key(model_name, prompt, generation_config):
+        payload = json.dumps(
+            {'model': model_name, 'prompt': prompt, 'generation_config': generation_config},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.md")
+        
+    def get(self, key):
+        """캐시된 응답 반환 (없거나 bypass 상태이면 None)"""
+        path = self._path(key)
+        with self.lock:
+            if self.bypass or not os.path.exists(path):
+                self.stats['misses'] += 1
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            os.utime(path)  # LRU 기준 시각 갱신
+            self.stats['hits'] += 1
+        return text
+        
+    def put(self, key, text):
+        """응답 저장 후 크기 제한 초과분 정리"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self.lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            self.stats['writes'] += 1
+            self._evict()
+            
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.md'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+            
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            self.stats['evictions'] += 1
+
+
+_gemini_cache = None
+_gemini_cache_lock = threading.Lock()
+
+
+def get_gemini_cache():
+    """프로세스 전체에서 공유하는 Gemini 응답 캐시"""
+    global _gemini_cache
+    with _gemini_cache_lock:
+        if _gemini_cache is None:
+            _gemini_cache = GeminiCache()
+        return _gemini_cache
+
+
+_bytes_per_token = None
+_bytes_per_token_lock = threading.Lock()
+
+
+def calibrate_token_estimate():
+    """estimate_tokens가 쓰는 바이트당 토큰 비율을 실제 토크나이저에 맞춤 (프로세스당 한 번)
+    
+    저장된 비율이 있으면 그대로 쓰고, 없으면 모델의 count_tokens로 고정 프롬프트 문구(한국어)를 재서
+    GEMINI_TOKEN_RATIO_FILE에 저장한다. 같은 비율을 계속 써야 같은 영상의 프롬프트와 캐시 키가 바뀌지 않는다.
+    재지 못하면(대역 모델, 네트워크 오류) 기본 비율을 쓰고 다음 실행에서 다시 잰다.
+    """
+    global _bytes_per_token
+    with _bytes_per_token_lock:
+        if _bytes_per_token is not None:
+            return _bytes_per_token
+        _bytes_per_token = DEFAULT_BYTES_PER_TOKEN
+        try:
+            if os.path.exists(GEMINI_TOKEN_RATIO_FILE):
+                with open(GEMINI_TOKEN_RATIO_FILE, 'r', encoding='utf-8') as f:
+                    _bytes_per_token = float(json.load(f)['bytes_per_token'])
+                return _bytes_per_token
+                
+            current_model = get_model()
+            if not hasattr(current_model, 'count_tokens'):
+                return _bytes_per_token
+            sample = '\n\n'.join([GEMINI_PROMPT_HEADER, GEMINI_PROMPT_REQUIREMENTS, GEMINI_POST_FORMAT])
+            tokens = current_model.count_tokens(sample).total_tokens
+            if tokens > 0:
+                # 터무니없는 값으로 프롬프트가 지나치게 잘리거나 길어지지 않도록 범위 제한
+                _bytes_per_token = min(8.0, max(1.0, len(sample.encode('utf-8')) / tokens))
+                os.makedirs(os.path.dirname(GEMINI_TOKEN_RATIO_FILE) or '.', exist_ok=True)
+                with open(GEMINI_TOKEN_RATIO_FILE, 'w', encoding='utf-8') as f:
+                    json.dump({'bytes_per_token': _bytes_per_token}, f)
+        except Exception as e:
+            print(f"{C_YELLOW}토큰 비율을 잴 수 없어 기본값(4바이트당 1토큰)으로 추정합니다: {str(e)}{C_END}")
+        return _bytes_per_token
+
+
+def estimate_tokens(text):
+    """토큰 수 추정 (UTF-8 바이트 수 / 바이트당 토큰 비율, 비율은 calibrate_token_estimate로 맞춤)"""
+    return max(1, int(len(text.encode('utf-8')) / (_bytes_per_token or DEFAULT_BYTES_PER_TOKEN)))
+
+
+def is_retryable_gemini_error(error):
+    """429/5xx/타임아웃처럼 잠시 후 다시 시도하면 되는 오류인지 확인"""
+    from google.api_core import exceptions as google_exceptions
+    
+    if isinstance(error, (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted,
+                          google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError,
+                          google_exceptions.DeadlineExceeded)):
+        return True
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, 'code', None) in (429, 500, 502, 503, 504)
+
+
+class RateWindow:
+    """asyncio용 이동 윈도 사용량 제한 (최근 period초 동안의 사용량 합계가 limit을 넘지 않게 함)
+    
+    처음 시작할 때나 한동안 쉬고 난 뒤에도 한도를 넘는 몰림이 생기지 않아서 어느 60초 구간도 분당 한도를 넘지 않는다.
+    """
+    
+    def __init__(self, limit, period=60.0):
+        self.limit = limit
+        self.period = period
+        self.entries = deque()  # [기록 시각, 사용량]
+        self.used = 0
+        self.lock = asyncio.Lock()
+        
+    def _expire(self, now):
+        while self.entries and self.entries[0][0] <= now - self.period:
+            self.used -= self.entries.popleft()[1]
+            
+    async def acquire(self, amount=1):
+        """최근 사용량에 amount를 더해도 limit 이하가 될 때까지 기다렸다가 기록 (settle에 넘길 기록 항목 반환)"""
+        amount = min(amount, self.limit)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self.used + amount <= self.limit:
+                    entry = [now, amount]
+                    self.entries.append(entry)
+                    self.used += amount
+                    return entry
+                    
+                # 오래된 기록부터 만료되어 amount가 들어갈 자리가 생기는 시각까지 대기
+                excess = self.used + amount - self.limit
+                for recorded_at, used in self.entries:
+                    excess -= used
+                    if excess <= 0:
+                        break
+                await asyncio.sleep(max(0.0, recorded_at + self.period - now) + 0.001)
+                
+    def settle(self, entry, amount):
+        """미리 잡아둔 사용량을 실제 사용량으로 고침 (이미 윈도를 벗어난 기록은 무시)"""
+        self._expire(time.monotonic())
+        if any(recorded is entry for recorded in self.entries):
+            self.used += amount - entry[1]
+            entry[1] = amount
+
+
+class AsyncGeminiClient:
+    """분당 요청/토큰 제한, 동시 요청 수 제한, 지수 백오프 재시도를 적용한 Gemini 호출 계층
+    
+    model은 generate_content_async 또는 generate_content를 가진 객체면 되므로
+    로컬 가짜 모델로도 테스트할 수 있다.
+    """
+    
+    def __init__(self, model, rpm=GEMINI_RPM, tpm=GEMINI_TPM, concurrency=GEMINI_CONCURRENCY,
+                 max_retries=GEMINI_MAX_RETRIES, timeout=GEMINI_TIMEOUT):
+        self.model = model
+        self.request_window = RateWindow(rpm)
+        self.token_window = RateWindow(tpm)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+        
+    async def _call(self, prompt, generation_config):
+        if hasattr(self.model, 'generate_content_async'):
+            response = await self.model.generate_content_async(
+                contents=[prompt], generation_config=generation_config
+            )
+        else:
+            response = await asyncio.to_thread(
+                self.model.generate_content, contents=[prompt], generation_config=generation_config
+            )
+        return response.text
+        
+    async def _reserve(self, prompt_tokens, generation_config):
+        """요청 수와 토큰 수 한도 안에서 요청 하나를 예약
+        
+        출력 토큰도 분당 토큰 한도에 포함되므로 최대 출력량까지 미리 잡아두고, 끝나면 settle로 실제 양으로 고친다.
+        """
+        max_output = (generation_config or {}).get('max_output_tokens') or GEMINI_OUTPUT_TOKEN_LIMIT
+        await self.request_window.acquire(1)
+        reserved = await self.token_window.acquire(prompt_tokens + max_output)
+        self.stats['requests'] += 1
+        get_quota_scheduler().record('gemini')
+        return reserved
+        
+    async def generate(self, prompt, generation_config=None):
+        """프롬프트로 텍스트 생성 (재시도 불가능한 오류나 재시도 소진 시 예외 발생)"""
+        prompt_tokens = estimate_tokens(prompt)
+        
+        for attempt in range(self.max_retries + 1):
+            reserved = await self._reserve(prompt_tokens, generation_config)
+            try:
+                async with self.semaphore:
+                    text = await asyncio.wait_for(self._call(prompt, generation_config), self.timeout)
+                self.token_window.settle(reserved, prompt_tokens + estimate_tokens(text or ''))
+                return text
+            except Exception as e:
+                self.token_window.settle(reserved, prompt_tokens)
+                if not is_retryable_gemini_error(e) or attempt == self.max_retries:
+                    self.stats['failures'] += 1
+                    raise
+                delay = min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt))
+                delay = random.uniform(delay / 2, delay)
+                self.stats['retries'] += 1
+                print(f"{C_YELLOW}Gemini 일시 오류, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {str(e)}{C_END}")
+                await asyncio.sleep(delay)
+                
+    async def _stream(self, prompt, generation_config, stall_timeout):
+        """모델 스트리밍 응답을 청크 텍스트 단위로 전달 (청크 간격이 stall_timeout을 넘으면 TimeoutError)"""
+        if hasattr(self.model, 'generate_content_async'):
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(
+                    contents=[prompt], generation_config=generation_config, stream=True
+                ),
+                stall_timeout
+            )
+            next_chunk = response.__aiter__().__anext__
+        else:
+            response = await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.model.generate_content,
+                    contents=[prompt], generation_config=generation_config, stream=True
+                ),
+                stall_timeout
+            )
+            iterator = iter(response)
+            
+            async def next_chunk():
+                chunk = await asyncio.to_thread(next, iterator, None)
+                if chunk is None:
+                    raise StopAsyncIteration
+                return chunk
+                
+        while True:
+            try:
+                chunk = await asyncio.wait_for(next_chunk(), stall_timeout)
+            except StopAsyncIteration:
+                return
+            try:
+                text = chunk.text
+            except Exception:
+                # 안전 필터 등으로 텍스트가 없는 청크는 건너뜀
+                continue
+            if text:
+                yield text
+                
+    async def generate_stream(self, prompt, generation_config=None, on_chunk=None,
+                              stall_timeout=GEMINI_STREAM_STALL_TIMEOUT):
+        """스트리밍 생성: 청크가 올 때마다 on_chunk를 호출하고 전체 텍스트 반환
+        
+        첫 청크를 받기 전의 일시 오류만 재시도하고, 도중에 멈춘 스트림은 바로 중단한다.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        
+        for attempt in range(self.max_retries + 1):
+            reserved = await self._reserve(prompt_tokens, generation_config)
+            parts = []
+            try:
+                async with self.semaphore:
+                    async for text in self._stream(prompt, generation_config, stall_timeout):
+                        parts.append(text)
+                        if on_chunk:
+                            on_chunk(text)
+                text = ''.join(parts)
+                self.token_window.settle(reserved, prompt_tokens + estimate_tokens(text))
+                return text
+            except Exception as e:
+                self.token_window.settle(reserved, prompt_tokens + estimate_tokens(''.join(parts)))
+                if parts or not is_retryable_gemini_error(e) or attempt == self.max_retries:
+                    self.stats['failures'] += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise TimeoutError(f"Gemini 스트림이 {stall_timeout}초 동안 응답이 없어 중단했습니다.") from e
+                    raise
+                delay = min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt))
+                delay = random.uniform(delay / 2, delay)
+                self.stats['retries'] += 1
+                print(f"{C_YELLOW}Gemini 일시 오류, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {str(e)}{C_END}")
+                await asyncio.sleep(delay)
+
+
+_gemini_loop = None
+_gemini_client = None
+_gemini_client_lock = threading.Lock()
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Gemini 모델을 처음 사용할 때 한 번만 설정/생성 (model에 대역 객체를 넣어두면 그대로 사용)"""
+    global model
+    with _model_lock:
+        if model is None:
+            import google.generativeai as genai
+            
+            genai.configure(api_key=GEMINI_API_KEY)
+            model = genai.GenerativeModel('gemini-2.0-pro-exp-02-05')
+        return model
+
+
+async def _create_async_gemini_client(model):
+    """이벤트 루프 스레드 안에서 클라이언트 생성
+    
+    Python 3.10 미만에서는 asyncio.Lock/Semaphore가 생성될 때의 스레드 이벤트 루프에 묶이므로
+    클라이언트를 사용할 루프 위에서 만들어야 한다.
+    """
+    return AsyncGeminiClient(model)
+
+
+def get_async_gemini_client():
+    """백그라운드 이벤트 루프와 그 위에서 동작하는 공용 AsyncGeminiClient 반환
+    
+    배치 작업 스레드들이 모두 같은 클라이언트를 거치므로 속도 제한이 프로세스 전체에 적용된다.
+    """
+    global _gemini_loop, _gemini_client
+    with _gemini_client_lock:
+        if _gemini_client is None:
+            model = get_model()
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='gemini-loop', daemon=True).start()
+            _gemini_client = asyncio.run_coroutine_threadsafe(_create_async_gemini_client(model), loop).result()
+            _gemini_loop = loop
+        return _gemini_loop, _gemini_client
+
+
+def generate_text_with_limits(prompt, generation_config=None):
+    """동기 코드에서 속도 제한/재시도가 적용된 Gemini 호출"""
+    loop, client = get_async_gemini_client()
+    future = asyncio.run_coroutine_threadsafe(client.generate(prompt, generation_config), loop)
+    return future.result()
+
+
+def stream_text_with_limits(prompt, generation_config=None, on_chunk=None):
+    """동기 코드에서 속도 제한이 적용된 Gemini 스트리밍 호출 (on_chunk는 이벤트 루프 스레드에서 호출됨)"""
+    loop, client = get_async_gemini_client()
+    future = asyncio.run_coroutine_threadsafe(
+        client.generate_stream(prompt, generation_config, on_chunk), loop
+    )
+    return future.result()
+
+
+class MarkdownStreamAssembler:
+    """스트리밍 청크를 스풀 파일에 기록하면서 '# ' 제목 줄이 완성되는 즉시 on_title 호출"""
+    
+    def __init__(self, spool_path, on_title=None):
+        self.spool_path = spool_path
+        self.on_title = on_title
+        self.title = None
+        self.pending = ''
+        os.makedirs(os.path.dirname(spool_path) or '.', exist_ok=True)
+        self.spool = open(spool_path, 'w', encoding='utf-8')
+        
+    def feed(self, text):
+        self.spool.write(text)
+        self.spool.flush()
+        if self.title is not None:
+            return
+            
+        # 줄 단위로 완성된 부분만 검사
+        self.pending += text
+        *lines, self.pending = self.pending.split('\n')
+        for line in lines:
+            if line.startswith('# '):
+                self.title = line.replace('# ', '')
+                if self.on_title:
+                    self.on_title(self.title)
+                break
+                
+    def close(self, keep=False):
+        """스풀 파일 닫기 (정상 완료 시 삭제, 실패 시 디버깅용으로 보존)"""
+        self.spool.close()
+        if not keep and os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+
+
+def extract_markdown_title(markdown_content):
+    """마크다운에서 첫 번째 '# ' 제목 추출 (없으면 빈 문자열)"""
+    for line in markdown_content.strip().split('\n'):
+        if line.startswith('# '):
+            return line.replace('# ', '')
+    return ""
+
+
+GEMINI_PROMPT_HEADER = "유튜브 영상 정보를 기반으로 티스토리 블로그 포스팅용 콘텐츠를 작성해주세요."
+GEMINI_PROMPT_REQUIREMENTS = """# 요구사항
+1. 한국어로 작성해주세요.
+2. 블로그 제목은 SEO에 최적화되게 영상 제목을 수정해주세요.
+3. 서론, 본론, 결론 구조로 작성해주세요.
+4. 본론은 주요 내용을 3-5개의 소제목으로 나누어 작성해주세요.
+5. 마크다운 형식으로 작성해주세요.
+6. 소제목은 ## 헤더로 작성해주세요.
+7. 글자 수는 2000자 이상으로 작성해주세요.
+8. 적절한 곳에 이미지 삽입 및 표를 활용하면 좋습니다.
+9. 전문적이고 교육적인 내용으로 작성해주세요."""
+GEMINI_POST_FORMAT = """# [블로그 제목]
+
+원본 영상: https://youtu.be/{video_id}
+
+[서론]
+
+## [소제목 1]
+[내용]
+
+## [소제목 2]
+[내용]
+
+## [소제목 3]
+[내용]
+
+[결론]"""
+
+
+def truncate_to_tokens(text, max_tokens):
+    """estimate_tokens 기준으로 max_tokens를 넘지 않게 자름 (잘렸으면 끝에 ... 추가)"""
+    if not text or max_tokens <= 0:
+        return ''
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # estimate_tokens가 UTF-8 바이트 수 기준이므로 바이트 단위로 자르고 잘린 글자는 버림
+    limit = int(max_tokens * (_bytes_per_token or DEFAULT_BYTES_PER_TOKEN)) - 3
+    return text.encode('utf-8')[:limit].decode('utf-8', 'ignore').rstrip() + '...'
+
+
+def fit_prompt_fields(video_data, budget):
+    """영상 정보 필드를 우선순위(GEMINI_FIELD_TOKEN_LIMITS 순서)대로 토큰 예산 안에 맞춤
+    
+    앞 필드가 먼저 예산을 가져가므로 예산이 부족하면 설명부터 줄어든다.
+    태그는 중간에서 자르지 않고 들어가는 개수만큼만 넣는다.
+    """
+    values = {
+        'title': video_data.get('title') or '',
+        'channel': video_data.get('channel_title') or '',
+        'tags': (video_data.get('tags') or [])[:10],
+        'description': video_data.get('description') or ''
+    }
+    fields = {}
+    remaining = budget
+    for name, limit in GEMINI_FIELD_TOKEN_LIMITS.items():
+        allowed = min(limit, remaining)
+        if name == 'tags':
+            tags = []
+            for tag in values['tags']:
+                if estimate_tokens(', '.join(tags + [tag])) > allowed:
+                    break
+                tags.append(tag)
+            text = ', '.join(tags)
+        else:
+            text = truncate_to_tokens(values[name], allowed)
+        fields[name] = text
+        remaining -= estimate_tokens(text) if text else 0
+    return fields
+
+
+def format_video_block(heading, fields):
+    """프롬프트의 영상 정보 블록"""
+    return (f"{heading}\n- 제목: {fields['title']}\n- 채널: {fields['channel']}\n"
+            f"- 태그: {fields['tags']}\n- 설명: {fields['description']}")
+
+
+def build_gemini_prompt(video_data, budget=GEMINI_PROMPT_TOKEN_BUDGET):
+    """영상 정보로 블로그 작성용 Gemini 프롬프트 구성
+    
+    요구사항과 출력 형식은 그대로 두고, 남은 토큰 예산 안에서만 영상 정보 필드를 채운다.
+    """
+    video_id = video_data.get('video_id', '')
+    
+    def render(fields):
+        return '\n\n'.join([
+            GEMINI_PROMPT_HEADER,
+            format_video_block('# 영상 정보', fields),
+            f"{GEMINI_PROMPT_REQUIREMENTS}\n10. 블로그 글의 첫 부분에 원본 영상 링크를 포함해주세요: https://youtu.be/{video_id}",
+            f"# 최종 출력 형식\n```\n{GEMINI_POST_FORMAT.format(video_id=video_id)}\n```"
+        ])
+    
+    fixed_tokens = estimate_tokens(render(dict.fromkeys(GEMINI_FIELD_TOKEN_LIMITS, '')))
+    return render(fit_prompt_fields(video_data, budget - fixed_tokens))
+
+
+def build_digest_prompt(videos, budget=None):
+    """여러 영상의 포스트를 한 번에 요청하는 다이제스트 프롬프트
+    
+    영상마다 DIGEST_MARKER 구분 줄로 시작하는 별도의 글을 쓰게 하고,
+    고정 문구를 뺀 토큰 예산은 영상마다 같은 몫으로 나눈다.
+    """
+    budget = budget or min(GEMINI_INPUT_TOKEN_LIMIT, GEMINI_PROMPT_TOKEN_BUDGET * len(videos))
+    first_id = videos[0].get('video_id', '')
+    
+    def render(field_sets):
+        blocks = [
+            format_video_block(f"## 영상 {index} (video_id: {video.get('video_id', '')})", fields)
+            for index, (video, fields) in enumerate(zip(videos, field_sets), 1)
+        ]
+        others = '\n\n'.join(
+            f"{DIGEST_MARKER.format(video_id=video.get('video_id', ''))}\n# [블로그 제목]\n\n"
+            f"원본 영상: https://youtu.be/{video.get('video_id', '')}\n..."
+            for video in videos[1:]
+        )
+        return '\n\n'.join([
+            f"아래 유튜브 영상 {len(videos)}개 각각에 대해 티스토리 블로그 포스팅용 콘텐츠를 따로 작성해주세요.",
+            '# 영상 정보\n\n' + '\n\n'.join(blocks),
+            f"{GEMINI_PROMPT_REQUIREMENTS}\n10. 각 글의 첫 부분에 해당 원본 영상 링크를 포함해주세요.\n"
+            f"11. 영상마다 별도의 완성된 글을 작성하고, 각 글은 {DIGEST_MARKER} 구분 줄로 시작해주세요.",
+            f"# 최종 출력 형식 (영상 순서대로 반복)\n```\n{DIGEST_MARKER.format(video_id=first_id)}\n"
+            f"{GEMINI_POST_FORMAT.format(video_id=first_id)}\n\n{others}\n```"
+        ])
+    
+    fixed_tokens = estimate_tokens(render([dict.fromkeys(GEMINI_FIELD_TOKEN_LIMITS, '')] * len(videos)))
+    share = (budget - fixed_tokens) // len(videos)
+    return render([fit_prompt_fields(video, share) for video in videos])
+
+
+def split_digest_response(text, video_ids):
+    """다이제스트 응답을 구분 줄 기준으로 {video_id: 마크다운}으로 나눔 (제목이 없는 글과 모르는 video_id는 버림)"""
+    parts = re.split(r'^[ \t]*<!--\s*POST\s+([\w-]+)\s*-->[ \t]*$', text or '', flags=re.M)
+    posts = {}
+    for video_id, body in zip(parts[1::2], parts[2::2]):
+        # 응답 전체를 코드 블록으로 감싼 경우 울타리 줄 제거
+        lines = [line for line in body.strip().split('\n') if not line.strip().startswith('```')]
+        body = '\n'.join(lines).strip()
+        if video_id in video_ids and video_id not in posts and extract_markdown_title(body):
+            posts[video_id] = body
+    return posts
+
+
+class DigestBatcher:
+    """동시에 들어온 영상별 생성 요청을 모아서 한 번의 Gemini 요청(다이제스트)으로 처리
+    
+    요청이 size개 모이거나 첫 요청 후 wait초가 지나면 묶어서 보내고, 응답을 영상별 글로 나눠 돌려준다.
+    혼자 들어온 요청이나 응답에서 빠진 영상은 None을 돌려주므로 호출한 쪽에서 개별 요청으로 생성한다.
+    """
+    
+    def __init__(self, size=GEMINI_DIGEST_SIZE, wait=GEMINI_DIGEST_WAIT):
+        self.size = size
+        self.wait = wait
+        self.lock = threading.Lock()
+        self.pending = []  # (video_data, Future)
+        self.timer = None
+        self.stats = {'digests': 0, 'videos': 0, 'missing': 0}
+    
+    @staticmethod
+    def max_size():
+        """출력 토큰 한도 안에 들어가는 최대 묶음 크기"""
+        return max(1, GEMINI_OUTPUT_TOKEN_LIMIT // GEMINI_POST_OUTPUT_TOKENS)
+    
+    def submit(self, video_data):
+        """묶음에 넣고 이 영상의 마크다운을 기다림 (개별 생성이 필요하면 None)"""
+        future = Future()
+        batch = None
+        with self.lock:
+            self.pending.append((video_data, future))
+            if len(self.pending) >= self.size:
+                batch = self._take()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.wait, self._flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if batch:
+            # 묶음을 채운 요청 스레드가 다이제스트 요청을 보냄
+            self._run(batch)
+        return future.result()
+    
+    def _take(self):
+        batch, self.pending = self.pending, []
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+    
+    def _flush(self):
+        with self.lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+    
+    def _run(self, batch):
+        if len(batch) == 1:
+            batch[0][1].set_result(None)
+            return
+        
+        videos = [video_data for video_data, _ in batch]
+        video_ids = [video_data.get('video_id') for video_data in videos]
+        posts = {}
+        try:
+            with span('gemini_digest', videos=len(videos)) as record:
+                calibrate_token_estimate()
+                prompt = build_digest_prompt(videos)
+                record['prompt_tokens'] = estimate_tokens(prompt)
+                text = generate_text_with_limits(prompt, GEMINI_GENERATION_CONFIG or None)
+                posts = split_digest_response(text, video_ids)
+                record['posts'] = len(posts)
+        except Exception as e:
+            print(f"{C_YELLOW}다이제스트 생성 실패, 영상별로 다시 생성합니다: {str(e)}{C_END}")
+        
+        self.stats['digests'] += 1
+        self.stats['videos'] += len(posts)
+        self.stats['missing'] += len(batch) - len(posts)
+        print(f"다이제스트 생성: 영상 {len(batch)}개를 한 번에 요청, 글 {len(posts)}개 분리")
+        for video_data, future in batch:
+            future.set_result(posts.get(video_data.get('video_id')))
+
+
+_digest_batcher = None
+_digest_batcher_lock = threading.Lock()
+
+
+def get_digest_batcher():
+    """프로세스 전체에서 공유하는 다이제스트 묶음 처리기"""
+    global _digest_batcher
+    with _digest_batcher_lock:
+        if _digest_batcher is None:
+            _digest_batcher = DigestBatcher()
+        return _digest_batcher
+
+
+def set_digest_size(size):
+    """다이제스트 묶음 크기 설정 (출력 토큰 한도를 넘지 않게 제한)"""
+    batcher = get_digest_batcher()
+    batcher.size = max(1, min(size, DigestBatcher.max_size()))
+    if batcher.size < size:
+        print(f"{C_YELLOW}출력 토큰 한도({GEMINI_OUTPUT_TOKEN_LIMIT})로 다이제스트 묶음을 {batcher.size}개로 줄입니다.{C_END}")
+
+
+def generate_content_with_gemini(video_data, stream=False, on_title=None):
+    """Gemini API를 사용하여 블로그 콘텐츠 생성
+    
+    stream=True이면 청크를 받는 대로 스풀 파일에 기록하고, 제목 줄이 나오는 즉시
+    on_title(제목)을 호출한다. 청크 사이가 GEMINI_STREAM_STALL_TIMEOUT을 넘으면 중단한다.
+    """
+    
+    if not GEMINI_API_KEY:
+        print("Gemini API 키가 설정되지 않았습니다.")
+        return None
+        
+    try:
+        with span('prompt_build', video_id=video_data.get('video_id')) as record:
+            calibrate_token_estimate()
+            prompt = build_gemini_prompt(video_data)
+            record['prompt_tokens'] = estimate_tokens(prompt)
+        
+        with span('gemini_generate', video_id=video_data.get('video_id'), stream=stream) as record:
+            # 같은 모델/프롬프트/설정으로 생성한 결과가 있으면 재사용
+            cache = get_gemini_cache()
+            cache_key = GeminiCache.make_key(get_model().model_name, prompt, GEMINI_GENERATION_CONFIG)
+            cached = cache.get(cache_key)
+            record['cache_hit'] = bool(cached)
+            if cached:
+                print(f"캐시된 Gemini 응답을 사용합니다. Video ID: {video_data.get('video_id', '')}")
+                if on_title:
+                    on_title(extract_markdown_title(cached))
+                return cached
+                
+            # Gemini API 호출 (하루 요청 한도 확인, 속도 제한 및 재시도 적용)
+            get_quota_scheduler().require('gemini')
+            if stream:
+                spool_path = os.path.join(
+                    CACHE_DIR, 'spool',
+                    f"{video_data.get('video_id', 'unknown')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md.part"
+                )
+                assembler = MarkdownStreamAssembler(spool_path, on_title)
+                try:
+                    text = stream_text_with_limits(prompt, GEMINI_GENERATION_CONFIG or None, assembler.feed)
+                except Exception:
+                    assembler.close(keep=True)
+                    raise
+                assembler.close()
+            else:
+                text = None
+                if get_digest_batcher().size > 1:
+                    # 같은 시기에 생성 중인 다른 영상과 묶어서 한 번에 요청 (빠진 영상은 개별 요청)
+                    text = get_digest_batcher().submit(video_data)
+                    record['digest'] = bool(text)
+                if not text:
+                    text = generate_text_with_limits(prompt, GEMINI_GENERATION_CONFIG or None)
+            
+            # 결과 텍스트 저장 후 반환 (다이제스트로 만든 글도 영상별 프롬프트 키로 저장)
+            if text:
+                cache.put(cache_key, text)
+            else:
+                record['status'] = 'error'
+            return text
+        
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        print(f"Gemini API 호출 중 오류 발생: {str(e)}")
+        return None
+
+
+def print_gemini_cache_stats():
+    """Gemini 캐시 적중/미적중 횟수 출력"""
+    stats = get_gemini_cache().stats
+    print(f"Gemini 캐시: 적중 {stats['hits']}회, 미적중 {stats['misses']}회, "
+          f"저장 {stats['writes']}회, 제거 {stats['evictions']}회")
+    digest_stats = get_digest_batcher().stats
+    if digest_stats['digests']:
+        print(f"Gemini 다이제스트: 요청 {digest_stats['digests']}회로 글 {digest_stats['videos']}개 생성, "
+              f"개별 생성으로 넘긴 영상 {digest_stats['missing']}개")
+
+
+def generate_post(video_data, stream=False, on_title=None):
+    """영상 정보로 Gemini 콘텐츠를 생성하고 (제목, HTML)로 변환"""
+    
+    # Gemini로 콘텐츠 생성
+    markdown_content = generate_content_with_gemini(video_data, stream, on_title)
+    
+    if not markdown_content:
+        print("콘텐츠 생성에 실패했습니다.")
+        return None, None
+        
+    return render_markdown(markdown_content, video_data)
+
+
+def render_markdown(markdown_content, video_data):
+    """생성된 마크다운을 (제목, HTML)로 변환"""
+    import markdown2
+    
+    with span('markdown_render', video_id=video_data.get('video_id')):
+        # 마크다운을 HTML로 변환
+        html_content = markdown2.markdown(markdown_content)
+        
+        # 첫 번째 줄을 제목으로 추출
+        title = extract_markdown_title(markdown_content)
+            
+    if not title:
+        title = f"{video_data['title']} - 리뷰 및 분석"
+        
+    if video_data.get('video_id'):
+        get_metadata_store().put_content(video_data['video_id'], markdown_content, title, html_content)
+    return title, html_content
+
+
+def tistory_write(_driver, video_data, stream=False):
+    """티스토리에 글 작성"""
+    
+    try:
+        if stream:
+            return tistory_write_streaming(_driver, video_data)
+            
+        # 타이틀과 HTML 콘텐츠 생성
+        title, html_content = generate_post(video_data)
+        
+        if not title or not html_content:
+            print("콘텐츠를 생성할 수 없습니다.")
+            return False
+            
+        return publish_post(_driver, title, html_content, video_data.get('tags', []))
+        
+    except PublishUncertainError:
+        raise
+    except Exception as e:
+        print(f"티스토리 글 작성 중 오류 발생: {str(e)}")
+        return False
+
+
+def tistory_write_streaming(_driver, video_data):
+    """스트리밍 생성과 브라우저 작업을 겹쳐서 글 작성
+    
+    생성이 진행되는 동안 글쓰기 페이지를 미리 열고, 제목 줄이 도착하면 바로 입력한다.
+    """
+    title_ready = threading.Event()
+    early = {}
+    
+    def on_title(title):
+        if title:
+            early['title'] = title
+            title_ready.set()
+            
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(traced(generate_post), video_data, True, on_title)
+        
+        # 생성이 끝나기를 기다리지 않고 글쓰기 페이지부터 연다
+        open_write_page(_driver)
+        while not title_ready.wait(0.2) and not future.done():
+            pass
+            
+        if title_ready.is_set():
+            input_title(_driver, early['title'])
+            print(f"제목을 먼저 입력했습니다: {early['title']}")
+            
+        title, html_content = future.result()
+        
+    if not title or not html_content:
+        print("콘텐츠를 생성할 수 없습니다.")
+        return False
+        
+    if title != early.get('title'):
+        input_title(_driver, title)
+        
+    return publish_post(_driver, title, html_content, video_data.get('tags', []), prefilled=True)
+
+
+def open_write_page(_driver):
+    """티스토리 글쓰기 페이지로 이동 후 에디터 로딩 대기"""
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import TimeoutException
+    
+    with span('page_load') as record:
+        _driver.get(f"{tistory_blog_name}/manage/write/")
+        
+        # 복원한 세션이 만료된 경우에만 다시 로그인
+        if is_login_page(_driver):
+            print("로그인 세션이 만료되어 다시 로그인합니다.")
+            record['relogin'] = True
+            tistory_login(_driver, use_session=False)
+            _driver.get(f"{tistory_blog_name}/manage/write/")
+            
+        # 에디터와 제목 입력창이 준비되는 즉시 진행
+        wait_for(_driver, 'write_page', EC.all_of(
+            EC.presence_of_element_located((By.ID, "editor")),
+            EC.presence_of_element_located((By.CLASS_NAME, "textarea_tit"))
+        ))
+        # 에디터 스크립트가 초기화를 끝내기 전에 입력하면 값이 덮어써지므로 DOM이 잠잠해질 때까지 대기
+        # (광고나 자동 저장 표시처럼 DOM이 계속 바뀌는 페이지도 있으므로 예산을 넘기면 그냥 진행하고,
+        #  입력이 덮어써졌는지는 제목/본문 입력 후 다시 읽어서 확인함)
+        settle_started = time.monotonic()
+        try:
+            wait_for(_driver, 'editor_settle', dom_quiet(200))
+        except TimeoutException:
+            print(f"{C_YELLOW}에디터 DOM 변경이 {time.monotonic() - settle_started:.1f}초 동안 멈추지 않아 그대로 진행합니다.{C_END}")
+
+
+def input_title(_driver, title):
+    """글 제목을 스크립트로 직접 입력하고 적용됐는지 확인"""
+    with span('paste_title'):
+        applied = _driver.execute_script(SET_TITLE_SCRIPT, title)
+        if applied != title:
+            raise Exception("제목 입력이 적용되지 않았습니다.")
+
+
+def input_html(_driver, html_content):
+    """CodeMirror 문서를 스크립트로 직접 설정하고 적용됐는지 확인"""
+    applied = _driver.execute_script(SET_HTML_SCRIPT, html_content)
+    if applied is None:
+        raise Exception("HTML 에디터(CodeMirror)를 찾을 수 없습니다.")
+    if applied != html_content.replace('\r\n', '\n'):
+        raise Exception("HTML 내용이 에디터에 적용되지 않았습니다.")
+
+
+def input_tags(_driver, tags):
+    """태그 목록을 스크립트로 한 번에 입력하고 등록된 태그 요소의 텍스트와 하나씩 정확히 비교해서 확인"""
+    applied = _driver.execute_script(ADD_TAGS_SCRIPT, tags)
+    if applied is None:
+        raise Exception("태그 입력 필드를 찾을 수 없습니다.")
+    applied = set(applied)
+    missing = [tag for tag in tags if tag.strip().lstrip('#') not in applied]
+    if missing:
+        raise Exception(f"등록되지 않은 태그: {', '.join(missing)}")
+
+
+class PublishUncertainError(Exception):
+    """발행 확인 버튼을 누른 뒤 실패해서 글이 저장됐는지 알 수 없을 때 발생 (자동으로 다시 발행하면 안 됨)"""
+
+
+def publish_post(_driver, title, html_content, tags, prefilled=False, category=tistory_category_name):
+    """이미 생성된 제목/HTML/태그로 티스토리에 글 작성
+    
+    prefilled=True이면 글쓰기 페이지가 이미 열려 있고 제목이 입력된 상태로 본다.
+    확인 버튼을 누르기 전에 실패하면 False(다시 시도해도 안전), 누른 뒤에 실패하면 PublishUncertainError.
+    """
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.by import By
+    
+    try:
+        if not prefilled:
+            # 티스토리 글 작성 페이지로 이동
+            open_write_page(_driver)
+            
+            # 제목 입력
+            input_title(_driver, title)
+        
+        with span('paste_html', html_bytes=len(html_content.encode('utf-8'))):
+            # HTML 모드로 전환
+            wait_for(_driver, 'html_button',
+                     EC.element_to_be_clickable((By.CLASS_NAME, "btn_html"))).click()
+            wait_for(_driver, 'html_editor', script_true(CODEMIRROR_READY_SCRIPT))
+            
+            # HTML 내용 입력 (클립보드를 쓰지 않으므로 여러 브라우저가 동시에 작성해도 안전)
+            input_html(_driver, html_content)
+        
+        # 카테고리 선택
+        try:
+            with span('category', category=category) as record:
+                # 카테고리 드롭다운 메뉴 클릭
+                category_element = wait_for(_driver, 'category_button',
+                                            EC.element_to_be_clickable((By.CLASS_NAME, "btn_category")))
+                category_element.click()
+                
+                # 카테고리 목록에서 원하는 카테고리 찾기
+                category_list = wait_for(_driver, 'category_list',
+                                         EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".list_category li")))
+                
+                target_category = None
+                for item in category_list:
+                    if category in item.text:
+                        target_category = item
+                        break
+                        
+                if target_category:
+                    target_category.click()
+                    print(f"카테고리 '{category}'로 설정됨")
+                else:
+                    record['status'] = 'error'
+                    print(f"카테고리 '{category}'를 찾을 수 없음. 기본 카테고리 사용")
+        except Exception as e:
+            print(f"카테고리 설정 중 오류: {str(e)}")
+            
+        # 태그 설정
+        try:
+            # 태그가 있는 경우에만 처리 (최대 5개)
+            tags = [tag.strip() for tag in tags[:5] if tag.strip()]
+            if tags:
+                with span('tags', tag_count=len(tags)):
+                    input_tags(_driver, tags)
+        except Exception as e:
+            print(f"태그 설정 중 오류: {str(e)}")
+            
+        # 콘텐츠 저장
+        submitted = False
+        try:
+            with span('save_confirm'):
+                wait_for(_driver, 'save_button',
+                         EC.element_to_be_clickable((By.CLASS_NAME, "btn_save"))).click()
+                
+                # 저장 확인 대화상자 처리 (이 버튼을 누른 뒤부터는 글이 저장됐을 수 있음)
+                confirm_button = wait_for(_driver, 'save_confirm',
+                                          EC.element_to_be_clickable((By.CSS_SELECTOR, ".btn_g.btn_confirm")))
+                submitted = True
+                confirm_button.click()
+                
+                # 저장 완료 상태 확인 (성공 메시지 대기)
+                wait_for(_driver, 'save_complete',
+                         EC.visibility_of_element_located((By.CLASS_NAME, "layer_complete")))
+            
+            print(f"\n{C_BOLD}{C_GREEN}게시물이 성공적으로 저장되었습니다!{C_END}")
+            report_browser_metrics(_driver)
+            return True
+                
+        except Exception as e:
+            print(f"게시물 저장 중 오류: {str(e)}")
+            if submitted:
+                raise PublishUncertainError(f"확인 버튼을 누른 뒤 저장 완료를 확인하지 못했습니다: {str(e)}")
+            return False
+            
+    except PublishUncertainError:
+        raise
+    except Exception as e:
+        print(f"티스토리 글 작성 중 오류 발생: {str(e)}")
+        return False
+
+
+def make_publish_result(backend, success, url=None, error=None, uncertain=False):
+    """발행 결과 (백엔드 공통 형식, uncertain이면 발행 여부를 알 수 없어 다시 보내면 안 됨)"""
+    return {'backend': backend, 'success': success, 'url': url, 'error': error, 'uncertain': uncertain}
+
+
+class Publisher(abc.ABC):
+    """포스트 발행 백엔드 공통 인터페이스 (제목, HTML, 카테고리, 태그 → 발행 결과)
+    
+    publish를 구현하지 않은 백엔드는 생성할 때 TypeError가 난다.
+    """
+    
+    name = 'base'
+    
+    @abc.abstractmethod
+    def publish(self, title, html_content, category=tistory_category_name, tags=()):
+        """포스트 발행 후 make_publish_result 형식의 결과 반환"""
+        
+    def close(self):
+        pass
+
+
+class SeleniumPublisher(Publisher):
+    """브라우저로 글쓰기 페이지를 조작해서 발행하는 기존 방식"""
+    
+    name = 'selenium'
+    
+    def __init__(self, driver, user_data_dir=CHROME_PROFILE_DIR, lean=BROWSER_LEAN):
+        self.driver = driver
+        self.user_data_dir = user_data_dir
+        self.lean = lean
+        self.watchdog = BrowserWatchdog()
+        
+    def recycle_if_needed(self):
+        """발행 사이에 브라우저 상태를 확인하고, 응답이 없거나 감시 기준을 넘었으면 로그인 세션을 유지한 채 재시작
+        
+        드라이버를 쓸 수 있으면 True (재시작에 실패하면 False)
+        """
+        reason = self.watchdog.recycle_reason(self.driver) if self.driver else '브라우저 없음'
+        if reason:
+            self.watchdog.reset()
+            print(f"{C_YELLOW}브라우저를 재시작합니다: {reason} (재시작 {self.watchdog.recycles}회){C_END}")
+            self.driver = recycle_driver(self.driver, self.user_data_dir, self.lean)
+        return self.driver is not None
+        
+    def begin_post(self):
+        """포스트 하나를 발행하기 전에 호출 (필요하면 브라우저를 재시작하고 발행 수를 셈)"""
+        if not self.recycle_if_needed():
+            return False
+        self.watchdog.posts += 1
+        return True
+        
+    def publish(self, title, html_content, category=tistory_category_name, tags=()):
+        success = False
+        # 확인 버튼을 누르기 전에 브라우저가 죽었으면 재시작한 브라우저로 같은 포스트를 한 번 더 시도
+        for attempt in range(2):
+            if not self.begin_post():
+                break
+            try:
+                success = publish_post(self.driver, title, html_content, list(tags), category=category)
+            except PublishUncertainError as e:
+                return make_publish_result(self.name, False, error=str(e), uncertain=True)
+            if success or is_driver_alive(self.driver):
+                break
+        return make_publish_result(self.name, success, error=None if success else '브라우저 발행 실패')
+        
+    def close(self):
+        if self.driver:
+            self.driver.quit()
+
+
+class HttpPublisher(Publisher):
+    """저장된 로그인 세션 쿠키로 글쓰기 API에 직접 요청해서 발행 (브라우저 없음)
+    
+    blog_url을 바꾸면 로컬 대역 서버를 상대로도 그대로 동작한다.
+    """
+    
+    name = 'http'
+    
+    def __init__(self, blog_url=None, session_path=TISTORY_SESSION_FILE, category_ids=None, pool_size=HTTP_POOL_SIZE):
+        import requests
+        
+        self.blog_url = (blog_url or tistory_blog_name).rstrip('/')
+        self.category_ids = TISTORY_CATEGORY_IDS if category_ids is None else category_ids
+        
+        # 연결을 재사용하는 세션 (keep-alive 연결 풀)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json, text/plain, */*',
+            'Origin': self.blog_url,
+            'Referer': f"{self.blog_url}/manage/newpost/",
+            'X-Requested-With': 'XMLHttpRequest'
+        })
+        
+        snapshot = load_session(session_path)
+        self.ready = snapshot is not None
+        if snapshot:
+            for cookie in snapshot['cookies']:
+                self.session.cookies.set(
+                    cookie['name'], cookie['value'],
+                    domain=cookie.get('domain', ''), path=cookie.get('path', '/')
+                )
+                
+    def publish(self, title, html_content, category=tistory_category_name, tags=()):
+        if not self.ready:
+            return make_publish_result(
+                self.name, False,
+                error='저장된 로그인 세션이 없습니다. 먼저 브라우저(selenium)로 로그인해서 세션을 저장하세요.'
+            )
+            
+        category_id = self.category_ids.get(category, 0)
+        if category and not category_id:
+            print(f"카테고리 '{category}'의 ID가 TISTORY_CATEGORY_IDS에 없음. 기본 카테고리 사용")
+            
+        payload = {
+            'id': '0',
+            'title': title,
+            'content': html_content,
+            'visibility': TISTORY_VISIBILITY,
+            'category': category_id,
+            'tag': ','.join(tag.strip() for tag in list(tags)[:5] if tag.strip()),
+            'published': 1,
+            'password': '',
+            'type': 'post',
+            'attachments': []
+        }
+        
+        try:
+            with span('http_publish') as record:
+                response = self.session.post(
+                    f"{self.blog_url}/manage/post.json", json=payload, timeout=HTTP_PUBLISH_TIMEOUT
+                )
+                record['http_status'] = response.status_code
+                if response.status_code in (401, 403) or '/auth/login' in response.url:
+                    record['status'] = 'error'
+                    return make_publish_result(self.name, False, error='로그인 세션이 만료되었습니다.')
+                response.raise_for_status()
+            
+            url = response.json().get('entryUrl')
+            print(f"\n{C_BOLD}{C_GREEN}게시물이 성공적으로 저장되었습니다! {url or ''}{C_END}")
+            return make_publish_result(self.name, True, url=url)
+        except Exception as e:
+            import requests
+            
+            print(f"HTTP 발행 중 오류: {str(e)}")
+            # 요청을 보낸 뒤 응답을 받지 못했으면 이미 발행됐을 수 있음
+            uncertain = isinstance(e, requests.exceptions.ReadTimeout)
+            return make_publish_result(self.name, False, error=str(e), uncertain=uncertain)
+            
+    def close(self):
+        self.session.close()
+
+
+def write_post(publisher, video_data, stream=False):
+    """선택한 발행 백엔드로 영상 정보 레코드를 포스팅 (이미 발행한 영상과 같거나 비슷하면 생성하지 않음)"""
+    duplicates = get_duplicate_index()
+    try:
+        duplicates.check(video_data)
+    except DuplicateVideoError as e:
+        print(f"{C_YELLOW}중복 영상이라 포스팅을 건너뜁니다: {str(e)} (--allow-duplicates로 무시){C_END}")
+        return False
+        
+    # 발행 한도가 남아 있을 때만 Gemini 생성부터 진행
+    scheduler = get_quota_scheduler()
+    if not scheduler.acquire_publish_slot():
+        duplicates.release(video_data.get('video_id'))
+        print(f"{C_YELLOW}오늘 발행 한도를 모두 사용했거나 발행 시간대가 아닙니다. (--quota로 확인){C_END}")
+        return False
+        
+    uncertain = False
+    with trace_context(post_id=new_post_id(), video_id=video_data.get('video_id')), span('post') as record:
+        try:
+            success = _write_post(publisher, video_data, stream)
+        except PublishUncertainError as e:
+            print(f"{C_YELLOW}발행 여부를 알 수 없습니다. 블로그를 확인하세요: {str(e)}{C_END}")
+            success, uncertain = False, True
+        if not success:
+            record['status'] = 'error'
+    # 발행됐을 수 있는 글은 발행 수에 넣고 중복 확인 대상에서도 빼지 않음
+    scheduler.finish_publish(success or uncertain)
+    if success:
+        mark_video_published(video_data.get('video_id'))
+    elif not uncertain:
+        duplicates.release(video_data.get('video_id'))
+    write_metrics()
+    return success
+
+
+def _write_post(publisher, video_data, stream):
+    if isinstance(publisher, SeleniumPublisher):
+        # 브라우저 백엔드는 생성과 페이지 준비를 겹칠 수 있는 기존 흐름 사용
+        if not publisher.begin_post():
+            print(f"{C_RED}브라우저를 다시 시작할 수 없습니다.{C_END}")
+            return False
+        return tistory_write(publisher.driver, video_data, stream=stream)
+        
+    try:
+        title, html_content = generate_post(video_data)
+    except Exception as e:
+        print(f"HTML 콘텐츠 생성 중 오류 발생: {str(e)}")
+        return False
+    if not title or not html_content:
+        print("콘텐츠를 생성할 수 없습니다.")
+        return False
+        
+    result = publisher.publish(title, html_content, tistory_category_name, video_data.get('tags', []))
+    if result['uncertain']:
+        raise PublishUncertainError(result['error'])
+    return result['success']
+
+
+def clone_chrome_profile(index):
+    """작업자별 크롬 프로필 디렉토리 준비
+    
+    세션 스냅샷이 없으면 기본 ChromeProfile을 복사해서 로그인 세션을 이어받는다. 이미 복제된 프로필은
+    다음 실행에서도 그대로 재사용한다. (잠금 파일과 캐시는 복사하지 않음)
+    """
+    profile_dir = os.path.join(CHROME_WORKER_PROFILES_DIR, f"worker_{index}")
+    if os.path.exists(profile_dir):
+        return profile_dir
+        
+    # 저장된 로그인 세션이 있으면 프로필을 복사하지 않고 빈 프로필에 세션만 복원
+    if os.path.exists(CHROME_PROFILE_DIR) and not load_session():
+        shutil.copytree(
+            CHROME_PROFILE_DIR, profile_dir,
+            ignore=shutil.ignore_patterns('Singleton*', 'lockfile', 'Cache', 'Code Cache', 'GPUCache', 'Crashpad')
+        )
+    else:
+        os.makedirs(profile_dir, exist_ok=True)
+    return profile_dir
+
+
+def is_driver_alive(_driver):
+    """브라우저가 아직 응답하는지 확인"""
+    try:
+        return _driver.execute_script('return 1') == 1
+    except Exception:
+        return False
+
+
+class BrowserWatchdog:
+    """브라우저 하나의 발행 수, 메모리(RSS), 열린 핸들 수를 보고 재시작할 때인지 판단
+    
+    오래 실행하면 렌더러 메모리와 핸들이 계속 늘어나다가 발행 도중 죽으므로,
+    기준을 넘으면 포스트 사이에서 미리 재시작하도록 이유를 알려준다.
+    """
+    
+    def __init__(self, max_posts=BROWSER_RECYCLE_POSTS, max_rss_mb=BROWSER_RECYCLE_RSS_MB,
+                 max_handles=BROWSER_RECYCLE_HANDLES):
+        self.max_posts = max_posts
+        self.max_rss_mb = max_rss_mb
+        self.max_handles = max_handles
+        self.posts = 0  # 마지막 재시작 이후 발행 시도 수
+        self.recycles = 0
+        
+    def recycle_reason(self, _driver):
+        """재시작해야 하면 이유, 아니면 None"""
+        if not is_driver_alive(_driver):
+            return '응답 없음'
+        if self.max_posts and self.posts >= self.max_posts:
+            return f"발행 {self.posts}건"
+        usage = get_browser_usage(_driver)
+        if usage:
+            if self.max_rss_mb and usage['rss_mb'] > self.max_rss_mb:
+                return f"메모리 {usage['rss_mb']}MB > {self.max_rss_mb}MB"
+            if self.max_handles and usage['handles'] > self.max_handles:
+                return f"핸들 {usage['handles']}개 > {self.max_handles}개"
+        return None
+        
+    def reset(self):
+        """재시작할 때 호출 (발행 수를 다시 셈)"""
+        self.posts = 0
+        self.recycles += 1
+
+
+def recycle_driver(_driver, user_data_dir=CHROME_PROFILE_DIR, lean=BROWSER_LEAN):
+    """현재 로그인 세션을 저장하고 브라우저를 종료한 뒤 새로 띄워서 세션 복원 (새 드라이버, 실패 시 None)"""
+    if _driver:
+        # 살아 있는 브라우저의 최신 쿠키/스토리지를 저장해두면 새 브라우저에서 다시 로그인하지 않음
+        if is_driver_alive(_driver):
+            export_session(_driver)
+        try:
+            _driver.quit()
+        except Exception:
+            pass
+    driver = init_driver(user_data_dir, lean)
+    if driver:
+        tistory_login(driver)
+    return driver
+
+
+class BrowserWorker(threading.Thread):
+    """자신만의 프로필과 로그인 세션을 가진 크롬으로 큐의 포스트를 발행하는 작업자"""
+    
+    def __init__(self, index, post_queue, results, results_lock, lean=BROWSER_LEAN):
+        super().__init__(name=f'browser-{index}', daemon=True)
+        self.index = index
+        self.lean = lean
+        self.post_queue = post_queue
+        self.results = results
+        self.results_lock = results_lock
+        self.profile_dir = clone_chrome_profile(index)
+        self.driver = None
+        self.restarts = 0
+        self.watchdog = BrowserWatchdog()
+        
+    def start_browser(self):
+        """브라우저를 (재)시작하고 로그인 (살아 있는 브라우저는 세션을 저장한 뒤 종료)"""
+        self.driver = recycle_driver(self.driver, self.profile_dir, self.lean)
+        return self.driver is not None
+        
+    def ensure_healthy(self):
+        """작업 전 상태 확인, 응답이 없거나 감시 기준을 넘었으면 브라우저 재시작"""
+        reason = self.watchdog.recycle_reason(self.driver) if self.driver else '브라우저 없음'
+        if not reason:
+            return True
+        self.restarts += 1
+        self.watchdog.reset()
+        print(f"{C_YELLOW}[브라우저 {self.index}] 재시작합니다: {reason} (재시작 {self.restarts}회){C_END}")
+        return self.start_browser()
+        
+    def record(self, key):
+        with self.results_lock:
+            self.results[key] += 1
+            
+    def run(self):
+        self.start_browser()
+        try:
+            while True:
+                post = self.post_queue.get()
+                if post is None:
+                    break
+                    
+                if not get_quota_scheduler().acquire_publish_slot():
+                    defer_post(post)
+                    self.record('skipped')
+                    continue
+                    
+                print(f"\n{C_BOLD}[브라우저 {self.index}] 포스팅 시작: {post['title']}{C_END}")
+                success = False
+                error = '브라우저 발행 실패'
+                uncertain = False
+                # 확인 버튼을 누르기 전에 브라우저가 죽어서 실패한 경우에만 재시작 후 한 번 더 시도
+                start_job_publish(post)
+                with trace_context(post_id=post['post_id'], video_id=post['video_id']):
+                    for attempt in range(2):
+                        if not self.ensure_healthy():
+                            break
+                        self.watchdog.posts += 1
+                        try:
+                            success = publish_post(self.driver, post['title'], post['html_content'], post['tags'])
+                        except PublishUncertainError as e:
+                            error, uncertain = str(e), True
+                            break
+                        if success or is_driver_alive(self.driver):
+                            break
+                finish_job_publish(post, success, error=None if success else error, uncertain=uncertain)
+                trace_post_done(post, success)
+                        
+                if success:
+                    self.record('success')
+                elif uncertain:
+                    print(f"{C_YELLOW}[브라우저 {self.index}] 발행 여부를 알 수 없어 다시 보내지 않습니다: {post['query']}{C_END}")
+                    self.record('failed')
+                else:
+                    print(f"{C_RED}[브라우저 {self.index}] 포스팅 중 오류가 발생했습니다: {post['query']}{C_END}")
+                    self.record('failed')
+        finally:
+            if self.driver:
+                self.driver.quit()
+
+
+class BrowserPool:
+    """N개의 BrowserWorker가 하나의 발행 큐를 나눠서 처리하는 브라우저 풀"""
+    
+    def __init__(self, size=PUBLISH_BROWSERS, lean=BROWSER_LEAN):
+        self.size = size
+        self.lean = lean
+        self.post_queue = queue.Queue()
+        self.results = {'success': 0, 'failed': 0, 'skipped': 0}
+        self.results_lock = threading.Lock()
+        self.workers = []
+        
+    def start(self):
+        for index in range(self.size):
+            worker = BrowserWorker(index, self.post_queue, self.results, self.results_lock, self.lean)
+            worker.start()
+            self.workers.append(worker)
+            
+    def submit(self, post):
+        self.post_queue.put(post)
+        
+    def close(self):
+        """남은 포스트를 모두 발행할 때까지 기다린 뒤 브라우저 종료"""
+        for _ in self.workers:
+            self.post_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        return self.results
+
+
+class JobStore:
+    """배치 입력(URL/검색어)별 진행 단계를 기록하는 SQLite 작업 저장소
+    
+    단계가 끝날 때마다 단계와 video_id를 기록하고, 영상 정보와 생성된 마크다운, 변환된 제목/HTML은
+    MetadataStore의 영상 레코드에만 저장한다. 작업을 읽을 때 끝난 단계까지의 결과물을 레코드에서 붙여주므로
+    중단된 뒤 다시 실행하면 마지막으로 끝난 단계 다음부터 이어서 진행한다.
+    """
+    
+    COLUMNS = ['job_id', 'query', 'video_id', 'stage', 'url', 'error', 'attempts', 'created_at', 'updated_at']
+    # 결과물을 작업 행에도 복사해 두던 예전 형식의 컬럼
+    LEGACY_COLUMNS = ['video_data', 'markdown', 'title', 'html_content']
+    GENERATED_STAGES = ('generated', 'rendered', 'publishing', 'published')
+    RENDERED_STAGES = ('rendered', 'publishing', 'published')
+    
+    def __init__(self, path=None):
+        self.path = path or JOB_DB
+        self.lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'job_id TEXT PRIMARY KEY, query TEXT NOT NULL UNIQUE, video_id TEXT, stage TEXT NOT NULL, '
+            'url TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, '
+            'created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_stage ON jobs (stage)')
+        # 여러 포스트로 펼친 검색어와 그때 고른 영상 URL 목록
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS searches ('
+            'query TEXT PRIMARY KEY, urls TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+        self.conn.commit()
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(jobs)')}
+        if existing.intersection(self.LEGACY_COLUMNS):
+            self._migrate_legacy_columns(existing)
+            
+    def _migrate_legacy_columns(self, existing):
+        """예전 형식의 작업 행에 복사돼 있던 결과물 중 영상 정보 저장소에 없는 것만 옮기고 컬럼 제거"""
+        metadata = get_metadata_store()
+        columns = [column for column in self.LEGACY_COLUMNS if column in existing]
+        rows = self.conn.execute(
+            f"SELECT video_id, {', '.join(columns)} FROM jobs WHERE video_id IS NOT NULL"
+        ).fetchall()
+        for video_id, *values in rows:
+            legacy = dict(zip(columns, values))
+            record = metadata.get(video_id)
+            if not record and legacy.get('video_data'):
+                metadata.put_video(json.loads(legacy['video_data']))
+            if legacy.get('markdown') and not (record and record['markdown']):
+                metadata.put_content(video_id, legacy['markdown'], legacy.get('title'), legacy.get('html_content'))
+                
+        for column in columns:
+            try:
+                self.conn.execute(f'ALTER TABLE jobs DROP COLUMN {column}')
+            except sqlite3.OperationalError:
+                # DROP COLUMN을 지원하지 않는 SQLite(3.35 미만)이면 값만 비움
+                self.conn.execute(f'UPDATE jobs SET {column} = NULL WHERE {column} IS NOT NULL')
+        self.conn.commit()
+        
+    def _to_job(self, row):
+        """작업 행에 끝난 단계까지의 결과물(영상 정보, 마크다운, 제목/HTML)을 영상 레코드에서 붙여서 반환"""
+        job = dict(zip(self.COLUMNS, row))
+        record = get_metadata_store().get(job['video_id']) if job['video_id'] else None
+        generated = record is not None and job['stage'] in self.GENERATED_STAGES
+        rendered = record is not None and job['stage'] in self.RENDERED_STAGES
+        job['video_data'] = record['data'] if record else None
+        job['markdown'] = record['markdown'] if generated else None
+        job['title'] = record['title'] if rendered else None
+        job['html_content'] = record['html_content'] if rendered else None
+        return job
+        
+    def get_or_create(self, query):
+        """입력에 해당하는 작업을 반환 (없으면 pending 상태로 새로 만듦)"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO jobs (job_id, query, stage, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (new_post_id(), query, 'pending', now, now)
+            )
+            self.conn.commit()
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE query = ?", (query,)
+            ).fetchone()
+        return self._to_job(row)
+        
+    def update(self, job_id, **fields):
+        """작업 단계 저장 (바로 커밋해서 중단되어도 남도록 함)"""
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+            self.conn.commit()
+            
+    def stage_counts(self):
+        """단계별 작업 수"""
+        with self.lock:
+            rows = self.conn.execute('SELECT stage, COUNT(*) FROM jobs GROUP BY stage').fetchall()
+        return dict(rows)
+        
+    def jobs_at(self, *stages):
+        """지정한 단계에 있는 작업 전체 (오래된 순)"""
+        placeholders = ', '.join('?' for _ in stages)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE stage IN ({placeholders}) ORDER BY created_at",
+                stages
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+        
+    def list_jobs(self, stage):
+        """특정 단계에 있는 작업 목록 (query, 오류, 시도 횟수)"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT query, error, attempts FROM jobs WHERE stage = ? ORDER BY updated_at', (stage,)
+            ).fetchall()
+            
+    def get_expansion(self, query):
+        """검색어를 펼쳐서 고른 영상 URL 목록 (아직 펼치지 않았으면 None)"""
+        with self.lock:
+            row = self.conn.execute('SELECT urls FROM searches WHERE query = ?', (query,)).fetchone()
+        return json.loads(row[0]) if row else None
+        
+    def save_expansion(self, query, urls):
+        """검색어를 펼친 결과 기록 (다음 실행에서 같은 검색어를 다시 검색하지 않음)"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO searches (query, urls, created_at) VALUES (?, ?, ?)',
+                (query, json.dumps(urls), time.time())
+            )
+            self.conn.commit()
+
+
+_job_store = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """프로세스 전체에서 공유하는 작업 저장소 (JOB_DB가 빈 값이면 None)"""
+    global _job_store
+    if not JOB_DB:
+        return None
+    with _job_store_lock:
+        if _job_store is None:
+            _job_store = JobStore()
+        return _job_store
+
+
+def start_job_publish(post):
+    """발행 요청 직전에 표시 (이 상태로 중단되면 다음 실행에서 자동으로 다시 발행하지 않음)"""
+    store = get_job_store()
+    if store and post.get('job_id'):
+        store.update(post['job_id'], stage='publishing')
+
+
+def finish_job_publish(post, success, url=None, error=None, uncertain=False):
+    """발행 결과 기록 (실패하면 rendered 단계로 되돌려서 다음 실행에서 발행만 다시 시도)
+    
+    uncertain이면 이미 발행됐을 수 있으므로 publishing 단계로 남겨서 자동으로 다시 발행하지 않는다.
+    """
+    get_quota_scheduler().finish_publish(success or uncertain)
+    if success:
+        mark_video_published(post.get('video_id'), url)
+        report_sheet_status(post.get('query'), 'posted', url=url)
+    elif uncertain:
+        report_sheet_status(post.get('query'), 'uncertain', error=error)
+    else:
+        get_duplicate_index().release(post.get('video_id'))
+        report_sheet_status(post.get('query'), 'error', error=error)
+    store = get_job_store()
+    if not store or not post.get('job_id'):
+        return
+    if success:
+        store.update(post['job_id'], stage='published', url=url, error=None)
+    elif uncertain:
+        store.update(post['job_id'], error=error, attempts=post.get('attempts', 0) + 1)
+    else:
+        store.update(post['job_id'], stage='rendered', error=error,
+                     attempts=post.get('attempts', 0) + 1)
+
+
+def print_job_status():
+    """작업 저장소의 단계별 작업 수와 확인이 필요한 작업 출력"""
+    store = get_job_store()
+    if not store:
+        print("작업 저장소가 비활성화되어 있습니다. (JOB_DB)")
+        return
+    counts = store.stage_counts()
+    print(f"{C_BOLD}=== 작업 상태 ({store.path}) ==={C_END}")
+    for stage in JOB_STAGES:
+        print(f"  {stage}: {counts.get(stage, 0)}건")
+    for query, error, attempts in store.list_jobs('publishing'):
+        print(f"{C_YELLOW}  발행 여부 확인 필요: {query}{C_END}")
+    for query, error, attempts in store.list_jobs('rendered'):
+        if error:
+            print(f"{C_RED}  발행 실패 ({attempts}회): {query} - {error}{C_END}")
+
+
+class QuotaExceededError(Exception):
+    """남은 할당량이 부족해서 작업을 다음 실행으로 미룰 때 발생"""
+
+
+def quota_reset_timezone():
+    """YouTube/Gemini 하루 할당량이 초기화되는 시간대 (zoneinfo 데이터가 없으면 UTC-8로 근사)"""
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(QUOTA_RESET_TIMEZONE)
+    except Exception:
+        return timezone(timedelta(hours=-8))
+
+
+def parse_hour_window(window):
+    """'9-23' 형식의 발행 시간대를 (시작 시, 끝 시)로 변환 (빈 값이면 None)"""
+    if not window:
+        return None
+    start, _, end = window.partition('-')
+    return int(start), int(end or 24)
+
+
+class QuotaScheduler:
+    """YouTube 할당량 단위, Gemini 하루 요청 수, 티스토리 하루 발행 수를 기록하고 작업 순서와 발행 시각을 정하는 스케줄러
+    
+    사용량은 할당량이 초기화되는 날짜별로 SQLite에 누적해서 다시 실행해도 이어서 센다.
+    plan()은 남은 할당량 안에서 발행까지 비용이 적은 작업부터 골라 같은 할당량으로 최대한 많이 발행하고,
+    acquire_publish_slot()은 발행 사이 최소 간격과 발행 시간대를 지켜서 발행 시각을 나눠준다.
+    """
+    
+    BUDGETS = ('youtube', 'gemini', 'tistory')
+    LABELS = {'youtube': ('YouTube', '단위'), 'gemini': ('Gemini', '회'), 'tistory': ('티스토리 발행', '건')}
+    
+    def __init__(self, path=None, limits=None, interval=TISTORY_PUBLISH_INTERVAL, window=TISTORY_PUBLISH_WINDOW):
+        self.path = QUOTA_DB if path is None else path
+        self.limits = dict(limits or {
+            'youtube': YOUTUBE_DAILY_QUOTA, 'gemini': GEMINI_DAILY_REQUESTS, 'tistory': TISTORY_DAILY_POSTS
+        })
+        self.interval = interval
+        self.window = parse_hour_window(window)
+        self.lock = threading.Lock()
+        self.in_flight = 0  # 발행 시각을 받았지만 아직 결과가 기록되지 않은 발행 수
+        self.next_publish_at = 0.0
+        
+        # 경로가 빈 값이면 파일에 남기지 않고 이번 실행 동안만 기록
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path or ':memory:', check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS usage ('
+            'budget TEXT NOT NULL, period TEXT NOT NULL, amount REAL NOT NULL, updated_at REAL NOT NULL, '
+            'PRIMARY KEY (budget, period))'
+        )
+        self.conn.commit()
+    
+    @staticmethod
+    def period(budget, now=None):
+        """사용량을 누적하는 날짜 (티스토리는 현지 날짜, YouTube/Gemini는 태평양 시간 날짜)"""
+        now = now or datetime.now(timezone.utc)
+        if budget == 'tistory':
+            return now.astimezone().strftime('%Y-%m-%d')
+        return now.astimezone(quota_reset_timezone()).strftime('%Y-%m-%d')
+    
+    def _used(self, budget):
+        row = self.conn.execute(
+            'SELECT amount FROM usage WHERE budget = ? AND period = ?', (budget, self.period(budget))
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def _record(self, budget, amount):
+        self.conn.execute(
+            'INSERT INTO usage (budget, period, amount, updated_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(budget, period) DO UPDATE SET amount = amount + excluded.amount, updated_at = excluded.updated_at',
+            (budget, self.period(budget), amount, time.time())
+        )
+        self.conn.commit()
     
-    # 일반 검색어인 경우 기존 API 검색 로직 실행
-    try:
-        # API 키 확인
-        if not YOUTUBE_API_KEY or YOUTUBE_API_KEY == '':
-            print("YouTube API 키가 설정되지 않았습니다. API 검색을 진행할 수 없습니다.")
+    def record(self, budget, amount=1):
+        """사용량 기록"""
+        with self.lock:
+            self._record(budget, amount)
+    
+    def used(self, budget):
+        """오늘(초기화 기준 날짜) 사용량"""
+        with self.lock:
+            return self._used(budget)
+    
+    def remaining(self, budget):
+        """남은 할당량 (한도를 두지 않은 항목은 None)"""
+        limit = self.limits.get(budget, 0)
+        if limit <= 0:
             return None
-            
-        # API를 통한 검색
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        search_response = youtube.search().list(
-            q=query,
-            part='id,snippet',
-            maxResults=5,
-            type='video'
-        ).execute()
+        return max(0, limit - self.used(budget))
+    
+    def require(self, budget, amount=1):
+        """amount만큼 남아 있지 않으면 QuotaExceededError (호출 전에 확인해서 API 오류를 미리 막음)"""
+        remaining = self.remaining(budget)
+        if remaining is not None and remaining < amount:
+            label, unit = self.LABELS[budget]
+            raise QuotaExceededError(f"{label} 할당량 부족 (남은 {remaining:g}{unit}, 필요 {amount:g}{unit})")
+    
+    def job_cost(self, query, job=None):
+        """작업을 발행까지 끝내는 데 필요한 할당량 추정치 (이미 끝난 단계는 비용 없음)"""
+        stage = (job or {}).get('stage') or 'pending'
+        posts = 1
+        cost = {'youtube': 0, 'gemini': 0, 'tistory': 1}
+        if stage == 'pending':
+            if extract_video_id(query):
+                cost['youtube'] = YOUTUBE_QUOTA_COSTS['videos']
+            else:
+                ranker = get_search_ranker()
+                pages = ranker.pages if ranker.enabled else 1
+                cost['youtube'] = YOUTUBE_QUOTA_COSTS['search'] * pages + YOUTUBE_QUOTA_COSTS['videos']
+                # 아직 펼치지 않은 검색어는 상위 per_query개 영상의 글이 됨
+                posts = ranker.per_query if ranker.enabled else 1
+        cost['tistory'] = posts
+        if stage in ('pending', 'fetched', 'duplicate'):
+            cost['gemini'] = posts
+        return cost
+    
+    def plan(self, queries, jobs=None, budgets=BUDGETS):
+        """남은 할당량 안에서 처리할 입력을 골라 순서를 정함 (처리할 목록, 미룬 목록)
         
-        if not search_response['items']:
-            print("검색 결과가 없습니다.")
-            return None
-            
-        # 첫 번째 결과 선택
-        video_id = search_response['items'][0]['id']['videoId']
+        남은 양 대비 사용 비율의 합이 작은 작업(이미 생성/변환된 작업, URL 입력)부터 넣고,
+        할당량이 모자란 작업은 다음 실행으로 미룬다. budgets로 확인할 항목을 고를 수 있다.
+        발행 시간대가 있으면 티스토리 발행 수는 이번 시간대에 발행할 수 있는 수까지만 잡아서,
+        시간대 밖에서는 영상 조회와 글 생성까지 해 놓고 발행만 미루는 일이 없게 한다.
+        """
+        jobs = jobs or {}
+        costs = {query: self.job_cost(query, jobs.get(query)) for query in queries}
+        remaining = {budget: self.remaining(budget) for budget in budgets}
+        if 'tistory' in budgets:
+            capacity = self.window_capacity()
+            if capacity is not None:
+                remaining['tistory'] = capacity if remaining['tistory'] is None else min(remaining['tistory'], capacity)
+        limited = [budget for budget in budgets if remaining[budget] is not None]
         
-        # 비디오 상세 정보 가져오기
-        video_response = youtube.videos().list(
-            part='snippet,statistics',
-            id=video_id
-        ).execute()
+        def share(query):
+            return sum(costs[query][budget] / remaining[budget] if remaining[budget]
+                       else (math.inf if costs[query][budget] else 0) for budget in limited)
         
-        if not video_response['items']:
-            print("비디오 정보를 찾을 수 없습니다.")
+        planned, deferred = [], []
+        for query in sorted(queries, key=share):
+            if all(costs[query][budget] <= remaining[budget] for budget in limited):
+                for budget in limited:
+                    remaining[budget] -= costs[query][budget]
+                planned.append(query)
+            else:
+                deferred.append(query)
+        return planned, deferred
+    
+    def _last_publish_at(self):
+        row = self.conn.execute("SELECT MAX(updated_at) FROM usage WHERE budget = 'tistory'").fetchone()
+        return row[0] or 0
+    
+    def window_bounds(self, ts):
+        """ts가 속한(또는 속할) 발행 시간대의 (시작, 끝) 타임스탬프 (자정을 넘는 시간대도 지원)"""
+        start_hour, end_hour = self.window
+        moment = datetime.fromtimestamp(ts)
+        day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        if start_hour < end_hour:
+            start, end = day + timedelta(hours=start_hour), day + timedelta(hours=end_hour)
+        elif moment.hour >= start_hour:
+            start, end = day + timedelta(hours=start_hour), day + timedelta(days=1, hours=end_hour)
+        else:
+            start, end = day - timedelta(days=1) + timedelta(hours=start_hour), day + timedelta(hours=end_hour)
+        return start.timestamp(), end.timestamp()
+    
+    def window_capacity(self):
+        """지금 발행 시간대가 끝날 때까지 최소 간격을 지켜서 발행할 수 있는 수
+        
+        발행 시간대가 없거나 간격이 0이면 None, 다음 발행 시각이 시간대 밖이면 0
+        """
+        if not self.window:
             return None
-            
-        video_info = video_response['items'][0]
-        
-        # 데이터 구성
-        data = {
-            'video_id': video_id,
-            'title': video_info['snippet']['title'],
-            'description': video_info['snippet']['description'],
-            'channel_title': video_info['snippet']['channelTitle'],
-            'upload_date': video_info['snippet']['publishedAt'],
-            'view_count': video_info['statistics']['viewCount'],
-            'tags': video_info['snippet'].get('tags', []),
-            'search_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        at = self.next_publish_time()
+        start, end = self.window_bounds(at)
+        if not start <= at < end:
+            return 0
+        if self.interval <= 0:
+            return None
+        return math.ceil((end - at) / self.interval)
+    
+    def acquire_publish_slot(self):
+        """다음 발행 시각까지 기다렸다가 True 반환 (오늘 발행 한도를 다 썼거나 발행 시간대가 아니면 False)
+        
+        발행 시간대가 있으면 남은 발행 수를 시간대 끝까지 고르게 나눠서 한꺼번에 몰리지 않게 한다.
+        True를 받은 쪽은 발행 후 finish_publish()를 호출해야 한다.
+        """
+        with self.lock:
+            limit = self.limits['tistory']
+            left = limit - self._used('tistory') - self.in_flight if limit > 0 else None
+            if left is not None and left <= 0:
+                return False
+            now = time.time()
+            at = max(now, self.next_publish_at, self._last_publish_at() + self.interval)
+            gap = self.interval
+            if self.window:
+                start, end = self.window_bounds(at)
+                if not start <= at < end:
+                    return False
+                if left:
+                    gap = max(gap, (end - at) / left)
+            self.next_publish_at = at + gap
+            self.in_flight += 1
         
-        # JSON 파일 저장
-        os.makedirs('json', exist_ok=True)
-        filename = f"json/youtube_video_{video_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if at > now:
+            print(f"발행 간격을 지키기 위해 {at - now:.0f}초 후에 발행합니다.")
+            time.sleep(at - now)
+        return True
+    
+    def finish_publish(self, success):
+        """acquire_publish_slot으로 받은 발행의 결과 기록 (성공한 발행만 하루 발행 수에 포함)"""
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if success:
+                self._record('tistory', 1)
+    
+    def next_publish_time(self):
+        """최소 간격 기준으로 다음 발행이 가능한 시각"""
+        with self.lock:
+            return max(time.time(), self.next_publish_at, self._last_publish_at() + self.interval)
             
-        return filename
+    def headroom(self):
+        """항목별 {'used', 'limit', 'remaining'}"""
+        return {
+            budget: {'used': self.used(budget), 'limit': self.limits[budget], 'remaining': self.remaining(budget)}
+            for budget in self.BUDGETS
+        }
+
+
+_quota_scheduler = None
+_quota_scheduler_lock = threading.Lock()
+
+
+def get_quota_scheduler():
+    """프로세스 전체에서 공유하는 할당량 스케줄러"""
+    global _quota_scheduler
+    with _quota_scheduler_lock:
+        if _quota_scheduler is None:
+            _quota_scheduler = QuotaScheduler()
+        return _quota_scheduler
+
+
+def print_quota_status():
+    """할당량별 오늘 사용량과 남은 양, 다음 발행 가능 시각 출력"""
+    scheduler = get_quota_scheduler()
+    print(f"{C_BOLD}=== 할당량 ({scheduler.path or '기록 안 함'}) ==={C_END}")
+    for budget, usage in scheduler.headroom().items():
+        label, unit = QuotaScheduler.LABELS[budget]
+        if usage['limit'] > 0:
+            color = C_RED if not usage['remaining'] else ''
+            print(f"  {label}: {usage['used']:g}/{usage['limit']}{unit} 사용, {color}남은 {usage['remaining']:g}{unit}{C_END}")
+        else:
+            print(f"  {label}: {usage['used']:g}{unit} 사용 (제한 없음)")
+    next_at = scheduler.next_publish_time()
+    window = f", 발행 시간대 {scheduler.window[0]}-{scheduler.window[1]}시" if scheduler.window else ''
+    print(f"  다음 발행 가능 시각: {datetime.fromtimestamp(next_at).strftime('%H:%M:%S')}"
+          f" (최소 간격 {scheduler.interval}초{window})")
+
+
+def defer_post(post):
+    """발행 한도/시간대 때문에 발행하지 못한 포스트 안내 (작업은 rendered 단계로 남아 다음 실행에서 발행)"""
+    print(f"{C_YELLOW}오늘 발행 한도를 모두 사용했거나 발행 시간대가 아니라 발행을 미룹니다: {post['query']}{C_END}")
+    get_duplicate_index().release(post.get('video_id'))
+    report_sheet_status(post['query'], 'deferred', error='발행 한도')
+
+
+def defer_queries(queries, publishing=False):
+    """할당량이 모자라거나 발행 시간대가 아니어서 이번에 처리하지 않는 입력 안내 (시트 입력이면 상태 기록, 다음 실행에서 다시 읽음)
     
-    except Exception as e:
-        print(f"YouTube 검색 중 오류 발생: {str(e)}")
-        return None
+    publishing은 발행 수까지 따져서 미룬 경우 (발행 시간대 밖이면 그 이유로 안내)
+    """
+    if not queries:
+        return
+    outside_window = publishing and get_quota_scheduler().window_capacity() == 0
+    reason = '발행 시간대 아님' if outside_window else '할당량 부족'
+    for query in queries:
+        report_sheet_status(query, 'deferred', error=reason)
+    if outside_window:
+        print(f"{C_YELLOW}발행 시간대({TISTORY_PUBLISH_WINDOW}시)가 아니어서 {len(queries)}건은 다음 실행으로 미룹니다.{C_END}")
+    else:
+        print(f"{C_YELLOW}할당량이 모자라 {len(queries)}건은 다음 실행으로 미룹니다. (--quota로 확인){C_END}")
 
 
-def generate_content_with_gemini(video_data):
-    """Gemini API를 사용하여 블로그 콘텐츠 생성"""
+def run_job_stage(stage, jobs, handler, workers=1):
+    """작업마다 단계 처리 함수를 실행하고 성공/실패/건너뜀 건수 반환
     
-    if not GEMINI_API_KEY:
-        print("Gemini API 키가 설정되지 않았습니다.")
-        return None
-        
-    try:
-        # 영상 정보 추출
-        title = video_data.get('title', '')
-        description = video_data.get('description', '')
-        channel = video_data.get('channel_title', '')
-        tags = video_data.get('tags', [])
-        
-        # 태그 문자열 생성
-        tags_str = ', '.join(tags[:10]) if tags else ""
-        
-        # 프롬프트 구성 - 블로그 작성용
-        prompt = f"""
-        유튜브 영상 정보를 기반으로 티스토리 블로그 포스팅용 콘텐츠를 작성해주세요.
-        
-        # 영상 정보
-        - 제목: {title}
-        - 채널: {channel}
-        - 태그: {tags_str}
-        - 설명: {description[:500]}...
-        
-        # 요구사항
-        1. 한국어로 작성해주세요.
-        2. 블로그 제목은 SEO에 최적화되게 영상 제목을 수정해주세요.
-        3. 서론, 본론, 결론 구조로 작성해주세요.
-        4. 본론은 주요 내용을 3-5개의 소제목으로 나누어 작성해주세요.
-        5. 마크다운 형식으로 작성해주세요.
-        6. 소제목은 ## 헤더로 작성해주세요.
-        7. 글자 수는 2000자 이상으로 작성해주세요.
-        8. 적절한 곳에 이미지 삽입 및 표를 활용하면 좋습니다.
-        9. 전문적이고 교육적인 내용으로 작성해주세요.
-        10. 블로그 글의 첫 부분에 원본 영상 링크를 포함해주세요: https://youtu.be/{video_data.get('video_id', '')}
-        
-        # 최종 출력 형식
-        ```
-        # [블로그 제목]
-        
-        원본 영상: https://youtu.be/{video_data.get('video_id', '')}
-        
-        [서론]
-        
-        ## [소제목 1]
-        [내용]
-        
-        ## [소제목 2]
-        [내용]
-        
-        ## [소제목 3]
-        [내용]
-        
-        [결론]
-        ```
-        """
-        
-        # 프롬프트가 너무 길면 잘라내기
-        if len(prompt) > 15000:
-            prompt = prompt[:15000]
+    처리 함수가 DuplicateVideoError/QuotaExceededError를 내면 건너뜀, 다른 예외를 내면 실패로 센다.
+    """
+    results = {'success': 0, 'failed': 0, 'skipped': 0}
+    print(f"\n{C_BOLD}{stage} 단계 시작: {len(jobs)}건 (작업자 {workers}명){C_END}")
+    
+    def handle(job):
+        with trace_context(post_id=job['job_id'], video_id=job['video_id'], query=job['query']):
+            handler(job)
             
-        # Gemini API 호출
-        result = model.generate_content(
-            contents=[prompt]
-        )
-        
-        # 결과 텍스트 반환
-        return result.text
-        
-    except Exception as e:
-        print(f"Gemini API 호출 중 오류 발생: {str(e)}")
-        return None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(executor.submit(handle, job), job) for job in jobs]
+        for future, job in futures:
+            try:
+                future.result()
+                results['success'] += 1
+            except DuplicateVideoError as e:
+                print(f"{C_YELLOW}{stage} 건너뜀 ({job['query']}): {str(e)}{C_END}")
+                report_sheet_status(job['query'], 'duplicate', error=str(e))
+                results['skipped'] += 1
+            except QuotaExceededError as e:
+                print(f"{C_YELLOW}{stage} 다음 실행으로 미룸 ({job['query']}): {str(e)}{C_END}")
+                report_sheet_status(job['query'], 'deferred', error=str(e))
+                results['skipped'] += 1
+            except Exception as e:
+                print(f"{C_RED}{stage} 실패 ({job['query']}): {str(e)}{C_END}")
+                # 발행 실패는 finish_job_publish가 이미 기록함
+                if stage != 'publish':
+                    report_sheet_status(job['query'], 'error', error=f"{stage}: {str(e)}")
+                results['failed'] += 1
+                
+    print(f"{C_BOLD}{stage} 단계 완료: 성공 {results['success']}건, 실패 {results['failed']}건, "
+          f"건너뜀 {results['skipped']}건{C_END}")
+    return results
 
 
-def create_html_content(json_file):
-    """JSON 파일에서 데이터를 로드하고 HTML 콘텐츠 생성"""
+def fetch_stage(queries):
+    """fetch: 영상 정보만 일괄 조회해서 작업 저장소에 기록 (YouTube API 라이브러리만 사용)"""
+    store = get_job_store()
+    queries = get_search_ranker().expand(list(dict.fromkeys(queries)), budgets=('youtube',))
+    jobs = [store.get_or_create(query) for query in queries]
+    pending = [job for job in jobs if job['stage'] == 'pending']
+    print(f"이미 수집된 항목 {len(jobs) - len(pending)}건은 건너뜁니다.")
+    # 남은 YouTube 할당량으로 조회할 수 있는 만큼만 수집
+    planned, deferred = get_quota_scheduler().plan([job['query'] for job in pending], budgets=('youtube',))
+    defer_queries(deferred)
+    pending = [job for job in pending if job['query'] in planned]
+    resolved = resolve_videos([job['query'] for job in pending]) if pending else {}
     
-    try:
-        # JSON 파일 로드
-        with open(json_file, 'r', encoding='utf-8') as f:
-            video_data = json.load(f)
-            
-        # Gemini로 콘텐츠 생성
-        markdown_content = generate_content_with_gemini(video_data)
+    def fetch(job):
+        video_data = resolved.get(job['query'])
+        if not video_data:
+            raise Exception("YouTube 정보를 가져오는 데 실패했습니다.")
+        save_video_record(video_data)
+        store.update(job['job_id'], stage='fetched', video_id=video_data['video_id'])
+        report_sheet_status(job['query'], 'fetched')
         
+    results = run_job_stage('fetch', pending, fetch)
+    get_metadata_store().evict_cache()
+    return results
+
+
+def require_video_data(job):
+    """단계 처리 전에 작업이 가리키는 영상 레코드가 있는지 확인하고 영상 정보 반환
+    
+    레코드가 없으면(영상 정보 저장소를 지우거나 옮긴 경우) 작업을 pending으로 되돌려서
+    다음 fetch나 배치 실행에서 다시 수집하게 하고, 이 작업만 실패로 처리되도록 예외를 낸다.
+    """
+    if job.get('video_data'):
+        return job['video_data']
+    error = f"영상 레코드({job.get('video_id')})가 없어 작업을 수집 전 단계로 되돌립니다."
+    get_job_store().update(job['job_id'], stage='pending', error=error)
+    raise Exception(error)
+
+
+def generate_stage(workers=BATCH_WORKERS, stream=False):
+    """generate: 수집된 작업의 Gemini 콘텐츠 생성 (google.generativeai만 사용)"""
+    store = get_job_store()
+    duplicates = get_duplicate_index()
+    # 중복 검사를 끄면 이전에 중복으로 건너뛴 작업도 생성
+    stages = ('fetched',) if duplicates.enabled else ('fetched', 'duplicate')
+    
+    def generate(job):
+        video_data = require_video_data(job)
+        check_duplicate_job(job['job_id'], video_data)
+        try:
+            markdown_content = generate_content_with_gemini(video_data, stream)
+        except Exception:
+            duplicates.release(job['video_id'])
+            raise
         if not markdown_content:
-            print("콘텐츠 생성에 실패했습니다.")
-            return None, None
-            
-        # 마크다운을 HTML로 변환
-        html_content = markdown2.markdown(markdown_content)
+            duplicates.release(job['video_id'])
+            raise Exception("콘텐츠를 생성할 수 없습니다.")
+        get_metadata_store().put_markdown(job['video_id'], markdown_content)
+        store.update(job['job_id'], stage='generated')
+        report_sheet_status(job['query'], 'generated')
         
-        # 첫 번째 줄을 제목으로 추출
-        lines = markdown_content.strip().split('\n')
-        title = ""
-        
-        for line in lines:
-            if line.startswith('# '):
-                title = line.replace('# ', '')
-                break
-                
-        if not title:
-            title = f"{video_data['title']} - 리뷰 및 분석"
-            
-        return title, html_content
-            
-    except Exception as e:
-        print(f"HTML 콘텐츠 생성 중 오류 발생: {str(e)}")
-        return None, None
+    jobs = {job['query']: job for job in store.jobs_at(*stages)}
+    planned, deferred = get_quota_scheduler().plan(list(jobs), jobs, budgets=('gemini',))
+    defer_queries(deferred)
+    return run_job_stage('generate', [jobs[query] for query in planned], generate, workers)
 
 
-def tistory_write(_driver, json_file):
-    """티스토리에 글 작성"""
+def render_stage():
+    """render: 생성된 마크다운을 제목/HTML로 변환 (markdown2만 사용)"""
+    store = get_job_store()
     
-    try:
-        # 타이틀과 HTML 콘텐츠 생성
-        title, html_content = create_html_content(json_file)
+    def render(job):
+        # 변환 결과는 render_markdown이 영상 레코드에 저장
+        render_markdown(job['markdown'], require_video_data(job))
+        store.update(job['job_id'], stage='rendered')
         
-        if not title or not html_content:
-            print("콘텐츠를 생성할 수 없습니다.")
-            return False
+    return run_job_stage('render', store.jobs_at('generated'), render)
+
+
+def publish_stage(publisher, retry_uncertain=False):
+    """publish: 변환까지 끝난 작업을 발행 백엔드로 순서대로 발행"""
+    store = get_job_store()
+    stages = ('rendered', 'publishing') if retry_uncertain else ('rendered',)
+    
+    def publish(job):
+        video_data = require_video_data(job)
+        post = {
+            'post_id': job['job_id'],
+            'job_id': job['job_id'],
+            'attempts': job['attempts'],
+            'video_id': job['video_id'],
+            'query': job['query'],
+            'title': job['title'],
+            'html_content': job['html_content'],
+            'tags': video_data.get('tags', [])
+        }
+        if not get_quota_scheduler().acquire_publish_slot():
+            raise QuotaExceededError('오늘 발행 한도를 모두 사용했거나 발행 시간대가 아닙니다.')
+        print(f"\n{C_BOLD}포스팅 시작: {post['title']}{C_END}")
+        start_job_publish(post)
+        result = publisher.publish(post['title'], post['html_content'], tistory_category_name, post['tags'])
+        finish_job_publish(post, result['success'], url=result['url'], error=result['error'],
+                           uncertain=result['uncertain'])
+        if not result['success']:
+            raise Exception(result['error'])
             
-        # 티스토리 글 작성 페이지로 이동
-        _driver.get(f"{tistory_blog_name}/manage/write/")
-        
-        # 대기 시간
-        WebDriverWait(_driver, LOADING_WAIT_TIME*2).until(
-            EC.presence_of_element_located((By.ID, "editor"))
-        )
-        
-        # 제목 입력
-        title_input = _driver.find_element(By.CLASS_NAME, "textarea_tit")
-        title_input.clear()
-        title_input.send_keys(title)
-        
-        # HTML 모드로 전환
-        _driver.find_element(By.CLASS_NAME, "btn_html").click()
-        sleep(PAUSE_TIME)
+    # 브라우저 드라이버는 스레드 안전하지 않으므로 한 건씩 발행
+    return run_job_stage('publish', store.jobs_at(*stages), publish)
+
+
+def print_video_records(date):
+    """해당 날짜에 수집한 영상 레코드 목록 출력"""
+    records = get_metadata_store().find_by_date(date)
+    print(f"{C_BOLD}=== {date} 수집 영상 {len(records)}건 ==={C_END}")
+    for record in records:
+        status = f"{C_GREEN}글 생성됨{C_END}" if record['html_content'] else "글 없음"
+        print(f"  {record['video_id']}  {record['data']['title']}  [{status}]")
+
+
+def make_sheets_session():
+    """Sheets API용 HTTP 세션 (서비스 계정 키가 없으면 인증 없는 세션 - 로컬 대역 서버용)"""
+    if not SHEETS_CREDENTIALS_FILE:
+        import requests
+        return requests.Session()
         
-        # HTML 입력 필드
-        html_frame = _driver.find_element(By.CLASS_NAME, "CodeMirror-scroll")
-        html_frame.click()
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import AuthorizedSession
+    credentials = service_account.Credentials.from_service_account_file(SHEETS_CREDENTIALS_FILE, scopes=SHEETS_SCOPES)
+    return AuthorizedSession(credentials)
+
+
+class SheetJobSource:
+    """구글 시트를 배치 입력으로 쓰는 작업 원본
+    
+    처리할 행은 values.batchGet 한 번으로 읽고, 행별 진행 상태(fetched/generated/posted/duplicate/error)는
+    메모리에 모아 두었다가 flush_interval초마다(또는 flush_rows행이 쌓이면) values.batchUpdate 한 번으로 기록한다.
+    endpoint를 바꾸면 로컬 대역 서버를 상대로도 그대로 동작한다.
+    """
+    
+    def __init__(self, spreadsheet_id, sheet_name=SHEET_NAME, endpoint=SHEETS_API_ENDPOINT, session=None,
+                 flush_interval=SHEET_FLUSH_INTERVAL, flush_rows=SHEET_FLUSH_ROWS):
+        self.url = f"{endpoint.rstrip('/')}/{spreadsheet_id}"
+        self.sheet_name = sheet_name
+        self.session = session or make_sheets_session()
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.rows = {}  # 입력 -> 행 번호 목록 (같은 입력이 여러 행에 있을 수 있음)
+        self.pending = {}  # 행 번호 -> 기록할 상태 열 값
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {'batch_get': 0, 'batch_update': 0, 'rows_written': 0, 'retries': 0}
         
-        # 클립보드를 통해 HTML 내용 붙여넣기
-        pyperclip.copy(html_content)
+    def cell_range(self, columns, first_row, last_row=''):
+        return f"'{self.sheet_name}'!{columns[0]}{first_row}:{columns[1]}{last_row}"
         
-        # 운영 체제에 맞는 붙여넣기 단축키 사용
-        actions = ActionChains(_driver)
-        if osName == "Darwin":  # Mac OS
-            actions.key_down(Keys.COMMAND).send_keys('v').key_up(Keys.COMMAND)
-        else:  # Windows
-            actions.key_down(Keys.CONTROL).send_keys('v').key_up(Keys.CONTROL)
-        actions.perform()
+    def request(self, method, path, **kwargs):
+        """Sheets API 요청 (429/5xx는 지터가 적용된 지수 백오프로 재시도)"""
+        for attempt in range(SHEETS_MAX_RETRIES + 1):
+            response = self.session.request(method, self.url + path, timeout=SHEETS_HTTP_TIMEOUT, **kwargs)
+            if response.status_code not in (429, 500, 502, 503, 504) or attempt == SHEETS_MAX_RETRIES:
+                response.raise_for_status()
+                return response.json()
+            self.stats['retries'] += 1
+            time.sleep(min(60, 2 ** attempt) * random.uniform(0.5, 1.0))
+            
+    def load_pending(self):
+        """상태가 완료(posted/duplicate)가 아닌 행의 입력 목록을 시트 순서대로 반환"""
+        with span('sheet_read'):
+            response = self.request('GET', '/values:batchGet', params={
+                'ranges': [
+                    self.cell_range(SHEET_INPUT_COLUMNS, SHEET_FIRST_ROW),
+                    self.cell_range((SHEET_STATUS_COLUMNS[0], SHEET_STATUS_COLUMNS[0]), SHEET_FIRST_ROW)
+                ],
+                'majorDimension': 'ROWS'
+            })
+        self.stats['batch_get'] += 1
         
-        sleep(PAUSE_TIME)
+        value_ranges = response.get('valueRanges', [])
+        inputs = value_ranges[0].get('values', []) if value_ranges else []
+        statuses = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
         
-        # 카테고리 선택
-        try:
-            # 카테고리 드롭다운 메뉴 클릭
-            category_element = WebDriverWait(_driver, 5).until(
-                EC.element_to_be_clickable((By.CLASS_NAME, "btn_category"))
-            )
-            category_element.click()
+        queries = []
+        for offset, cells in enumerate(inputs):
+            status = statuses[offset][0] if offset < len(statuses) and statuses[offset] else ''
+            query = make_sheet_query(cells)
+            if not query or status in SHEET_DONE_STATUSES:
+                continue
+            self.rows.setdefault(query, []).append(SHEET_FIRST_ROW + offset)
+            queries.append(query)
             
-            # 카테고리 목록에서 원하는 카테고리 찾기
-            category_list = WebDriverWait(_driver, 5).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".list_category li"))
-            )
+        print(f"시트에서 처리할 행 {len(queries)}건을 읽었습니다. (전체 {len(inputs)}행)")
+        self.start()
+        return queries
+        
+    def alias(self, query, original):
+        """다른 입력의 상태를 original과 같은 행에 기록하도록 연결"""
+        with self.lock:
+            rows = self.rows.setdefault(query, [])
+            rows += [row for row in self.rows.get(original, []) if row not in rows]
             
-            target_category = None
-            for category in category_list:
-                if tistory_category_name in category.text:
-                    target_category = category
-                    break
-                    
-            if target_category:
-                target_category.click()
-                print(f"카테고리 '{tistory_category_name}'로 설정됨")
-            else:
-                print(f"카테고리 '{tistory_category_name}'를 찾을 수 없음. 기본 카테고리 사용")
-        except Exception as e:
-            print(f"카테고리 설정 중 오류: {str(e)}")
+    def update(self, query, status, url=None, error=None):
+        """입력에 해당하는 행의 상태를 기록 대기열에 추가 (같은 행은 마지막 상태만 기록)"""
+        values = [status, url or '', (error or '')[:500], datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+        with self.lock:
+            for row in self.rows.get(query, []):
+                self.pending[row] = values
+            full = len(self.pending) >= self.flush_rows
+        if full:
+            self.flush()
             
-        # 태그 설정
-        try:
-            # JSON 파일 로드
-            with open(json_file, 'r', encoding='utf-8') as f:
-                video_data = json.load(f)
+    def flush(self):
+        """대기 중인 상태를 values.batchUpdate 한 번으로 기록 (실패하면 다음 기록 때 다시 시도)"""
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return True
+                batch, self.pending = self.pending, {}
                 
-            # 태그가 있는 경우에만 처리
-            tags = video_data.get('tags', [])
-            if tags:
-                # 태그 입력 필드
-                tag_input = _driver.find_element(By.CLASS_NAME, "wrap_tag")
-                tag_input.click()
+            data = [
+                {'range': self.cell_range(SHEET_STATUS_COLUMNS, row, row), 'values': [values]}
+                for row, values in sorted(batch.items())
+            ]
+            try:
+                with span('sheet_write', rows=len(data)):
+                    self.request('POST', '/values:batchUpdate', json={'valueInputOption': 'RAW', 'data': data})
+            except Exception as e:
+                print(f"{C_YELLOW}시트 상태 기록 실패 ({len(data)}행, 다음에 다시 시도): {str(e)}{C_END}")
+                with self.lock:
+                    # 그 사이에 새 상태가 들어온 행은 새 상태를 유지
+                    for row, values in batch.items():
+                        self.pending.setdefault(row, values)
+                return False
                 
-                # 태그 입력 (최대 5개)
-                for tag in tags[:5]:
-                    if tag.strip():
-                        actions = ActionChains(_driver)
-                        actions.send_keys(tag)
-                        actions.send_keys(Keys.ENTER)
-                        actions.perform()
-                        sleep(0.3)  # 태그 입력 사이에 잠시 대기
-        except Exception as e:
-            print(f"태그 설정 중 오류: {str(e)}")
+            self.stats['batch_update'] += 1
+            self.stats['rows_written'] += len(data)
+            return True
             
-        # 콘텐츠 저장
-        try:
-            _driver.find_element(By.CLASS_NAME, "btn_save").click()
+    def start(self):
+        """주기적으로 상태를 기록하는 백그라운드 스레드 시작"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._flush_loop, name='sheet-flush', daemon=True)
+            self.thread.start()
             
-            # 저장 확인 대화상자 처리
-            WebDriverWait(_driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, ".btn_g.btn_confirm"))
-            ).click()
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
             
-            # 저장 완료 상태 확인 (성공 메시지 대기)
-            WebDriverWait(_driver, 30).until(
-                EC.visibility_of_element_located((By.CLASS_NAME, "layer_complete"))
-            )
+    def close(self):
+        """남은 상태를 모두 기록하고 종료"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        for attempt in range(3):
+            if self.flush():
+                break
+            time.sleep(2 ** attempt)
+        print(f"시트 API 호출: batchGet {self.stats['batch_get']}회, batchUpdate {self.stats['batch_update']}회 "
+              f"({self.stats['rows_written']}행 기록, 재시도 {self.stats['retries']}회)")
+        self.session.close()
+
+
+def make_sheet_query(cells):
+    """시트 행의 입력 열로 검색어 구성 (URL이 아니면 채널 제목을 붙여서 검색 정확도를 높임)"""
+    title = cells[0].strip() if cells else ''
+    channel = cells[1].strip() if len(cells) > 1 else ''
+    if not title:
+        return None
+    if channel and not extract_video_id(title):
+        return f"{title} {channel}"
+    return title
+
+
+_sheet_source = None
+
+
+def open_sheet_source(spreadsheet_id, **kwargs):
+    """이번 실행의 시트 작업 원본을 열고 처리할 입력 목록 반환"""
+    global _sheet_source
+    _sheet_source = SheetJobSource(spreadsheet_id, **kwargs)
+    return _sheet_source.load_pending()
+
+
+def alias_sheet_query(query, original):
+    """original 입력에서 파생된 입력(예: 검색어에서 고른 영상 URL)의 상태를 원래 행에 기록하도록 연결"""
+    if _sheet_source:
+        _sheet_source.alias(query, original)
+
+
+def report_sheet_status(query, status, url=None, error=None):
+    """시트에서 읽은 입력이면 행 상태 갱신을 예약 (시트를 쓰지 않으면 아무것도 안 함)"""
+    if _sheet_source and query:
+        _sheet_source.update(query, status, url, error)
+
+
+def close_sheet_source():
+    """모아둔 시트 상태를 기록하고 작업 원본 닫기"""
+    global _sheet_source
+    if _sheet_source:
+        _sheet_source.close()
+        _sheet_source = None
+
+
+def read_batch_file(batch_file):
+    """배치 입력 파일에서 URL/검색어 목록 읽기 (빈 줄과 # 주석 제외)"""
+    with open(batch_file, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def check_duplicate_job(job_id, video_data):
+    """생성 전 중복 검사 (중복이면 작업을 duplicate 단계로 기록하고 DuplicateVideoError를 다시 발생)"""
+    try:
+        get_duplicate_index().check(video_data)
+    except DuplicateVideoError as e:
+        store = get_job_store()
+        if store and job_id:
+            store.update(job_id, stage='duplicate', error=str(e))
+        raise
+
+
+def prepare_post(query, video_data=None, stream=False, job=None):
+    """배치 수집/생성 단계: 영상 정보 수집 후 Gemini 콘텐츠 생성
+    
+    video_data가 미리 일괄 조회되어 있으면 그대로 사용하고,
+    없으면 search_youtube로 개별 조회한다. job이 주어지면 단계가 끝날 때마다 작업 저장소에 단계를 기록하고
+    (결과물은 영상 정보 저장소에 저장), 이미 끝난 단계는 저장된 결과를 그대로 사용한다.
+    """
+    job = job or {}
+    store = get_job_store() if job else None
+    post_id = job.get('job_id') or new_post_id()
+    started_at = time.time()
+    
+    with trace_context(post_id=post_id, query=query):
+        if job.get('stage', 'pending') != 'pending' and not job.get('video_data'):
+            # 영상 레코드가 없어진 작업은 수집부터 다시 진행
+            print(f"{C_YELLOW}영상 레코드({job.get('video_id')})가 없어 처음부터 다시 진행합니다: {query}{C_END}")
+        if job.get('video_data'):
+            video_data = job['video_data']
+        elif video_data:
+            save_video_record(video_data)
+        else:
+            video_data = search_youtube(query)
+            if not video_data:
+                raise Exception("YouTube 정보를 가져오는 데 실패했습니다.")
+        if not job.get('video_data'):
+            if store:
+                store.update(post_id, stage='fetched', video_id=video_data.get('video_id'))
+            report_sheet_status(query, 'fetched')
             
-            print(f"\n{C_BOLD}{C_GREEN}게시물이 성공적으로 저장되었습니다!{C_END}")
-            return True
+        with trace_context(video_id=video_data.get('video_id')):
+            # 생성된 마크다운이 저장되어 있으면 Gemini를 다시 호출하지 않음
+            markdown_content = job.get('markdown')
+            if not markdown_content:
+                check_duplicate_job(job.get('job_id'), video_data)
+                try:
+                    markdown_content = generate_content_with_gemini(video_data, stream)
+                except Exception:
+                    get_duplicate_index().release(video_data.get('video_id'))
+                    raise
+                if not markdown_content:
+                    get_duplicate_index().release(video_data.get('video_id'))
+                    raise Exception("콘텐츠를 생성할 수 없습니다.")
+                if store:
+                    get_metadata_store().put_markdown(video_data.get('video_id'), markdown_content)
+                    store.update(post_id, stage='generated')
+                report_sheet_status(query, 'generated')
+                    
+            title, html_content = job.get('title'), job.get('html_content')
+            if not title or not html_content:
+                title, html_content = render_markdown(markdown_content, video_data)
+                if store:
+                    store.update(post_id, stage='rendered')
+        
+    return {
+        'post_id': post_id,
+        'job_id': job.get('job_id'),
+        'attempts': job.get('attempts', 0),
+        'video_id': video_data.get('video_id'),
+        'started_at': started_at,
+        'query': query,
+        'title': title,
+        'html_content': html_content,
+        'tags': video_data.get('tags', [])
+    }
+
+
+def load_batch_jobs(queries, retry_uncertain=False):
+    """배치 입력별 작업을 불러와서 이번에 처리할 작업만 반환 ({query: job})
+    
+    이미 발행된 작업과, 발행 요청 중에 중단되어 발행 여부를 알 수 없는 작업은 건너뛴다.
+    (retry_uncertain=True이면 후자도 다시 발행)
+    """
+    store = get_job_store()
+    if not store:
+        return {query: None for query in queries}, 0
+        
+    jobs = {}
+    skipped = 0
+    for query in queries:
+        job = store.get_or_create(query)
+        if job['stage'] == 'published':
+            print(f"이미 발행된 항목을 건너뜁니다: {query} ({job['url'] or '-'})")
+            report_sheet_status(query, 'posted', url=job['url'])
+            skipped += 1
+            continue
+        if job['stage'] == 'duplicate' and get_duplicate_index().enabled:
+            print(f"중복 영상으로 건너뛴 항목입니다 ({job['error']}): {query}")
+            report_sheet_status(query, 'duplicate', error=job['error'])
+            skipped += 1
+            continue
+        if job['stage'] == 'publishing' and not retry_uncertain:
+            print(f"{C_YELLOW}발행 도중 중단된 항목입니다. 블로그를 확인한 뒤 --retry-uncertain으로 다시 시도하세요: {query}{C_END}")
+            skipped += 1
+            continue
+        if job['stage'] != 'pending':
+            print(f"이전 실행에서 이어서 진행합니다 ({job['stage']} 단계까지 완료): {query}")
+        jobs[query] = job
+    return jobs, skipped
+
+
+def run_batch(publisher, queries, workers=BATCH_WORKERS, stream=False, browsers=1, lean=BROWSER_LEAN,
+              retry_uncertain=False):
+    """배치 파이프라인 실행
+    
+    수집/생성 단계는 작업 스레드 풀에서 동시에 처리하고,
+    완성된 포스트는 큐를 통해 하나의 발행 백엔드(publisher)가 순서대로 발행한다.
+    browsers가 2 이상이면 publisher 대신 BrowserPool이 병렬로 발행한다.
+    각 단계의 결과는 작업 저장소에 기록되어, 중단 후 같은 입력으로 다시 실행하면 이어서 진행한다.
+    """
+    
+    post_queue = queue.Queue()
+    results = {'success': 0, 'failed': 0, 'skipped': 0}
+    started = time.time()
+    
+    # 같은 입력이 여러 번 있으면 한 번만 처리 (검색어 하나로 여러 포스트를 만들면 영상 URL 입력으로 펼침)
+    queries = get_search_ranker().expand(list(dict.fromkeys(queries)))
+    jobs, results['skipped'] = load_batch_jobs(queries, retry_uncertain)
+    queries = [query for query in queries if query in jobs]
+    # 남은 할당량으로 끝낼 수 있는 작업만, 발행까지 비용이 적은 작업부터 처리
+    queries, deferred = get_quota_scheduler().plan(queries, jobs)
+    defer_queries(deferred, publishing=True)
+    results['skipped'] += len(deferred)
+    
+    pool = None
+    if browsers > 1 and queries:
+        pool = BrowserPool(browsers, lean)
+        pool.start()
+    
+    print(f"\n{C_BOLD}배치 작업 시작: {len(queries)}건 (작업자 {workers}명, 브라우저 {browsers}개){C_END}")
+    
+    # 영상 정보는 한꺼번에 조회해서 API 왕복 횟수를 줄인다 (이전 실행에서 받아둔 항목 제외)
+    resolved = resolve_videos([query for query in queries if not (jobs[query] or {}).get('video_data')]) if queries else {}
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for query in queries:
+            future = executor.submit(prepare_post, query, resolved.get(query), stream, jobs[query])
+            future.query = query
+            # 생성이 끝나는 순서대로 발행 큐에 넣는다
+            future.add_done_callback(post_queue.put)
+            
+        # 발행 단계: Selenium 드라이버는 스레드 안전하지 않으므로 메인 스레드에서만 사용
+        for index in range(1, len(queries) + 1):
+            future = post_queue.get()
+            try:
+                post = future.result()
+            except DuplicateVideoError as e:
+                print(f"{C_YELLOW}[{index}/{len(queries)}] 중복 영상이라 건너뜁니다 ({future.query}): {str(e)}{C_END}")
+                report_sheet_status(future.query, 'duplicate', error=str(e))
+                results['skipped'] += 1
+                continue
+            except QuotaExceededError as e:
+                print(f"{C_YELLOW}[{index}/{len(queries)}] 다음 실행으로 미룹니다 ({future.query}): {str(e)}{C_END}")
+                report_sheet_status(future.query, 'deferred', error=str(e))
+                results['skipped'] += 1
+                continue
+            except Exception as e:
+                print(f"{C_RED}[{index}/{len(queries)}] 준비 실패 ({future.query}): {str(e)}{C_END}")
+                report_sheet_status(future.query, 'error', error=str(e))
+                results['failed'] += 1
+                continue
                 
-        except Exception as e:
-            print(f"게시물 저장 중 오류: {str(e)}")
-            return False
+            if pool:
+                pool.submit(post)
+                continue
+                
+            if not get_quota_scheduler().acquire_publish_slot():
+                defer_post(post)
+                results['skipped'] += 1
+                continue
+                
+            print(f"\n{C_BOLD}[{index}/{len(queries)}] 포스팅 시작: {post['title']}{C_END}")
+            start_job_publish(post)
+            with trace_context(post_id=post['post_id'], video_id=post['video_id']):
+                result = publisher.publish(post['title'], post['html_content'], tistory_category_name, post['tags'])
+            finish_job_publish(post, result['success'], url=result['url'], error=result['error'],
+                               uncertain=result['uncertain'])
+            trace_post_done(post, result['success'])
+            if result['success']:
+                results['success'] += 1
+            elif result['uncertain']:
+                print(f"{C_YELLOW}발행 여부를 알 수 없어 다시 보내지 않습니다. 블로그를 확인하세요: {post['query']}{C_END}")
+                results['failed'] += 1
+            else:
+                print(f"{C_RED}포스팅 중 오류가 발생했습니다: {post['query']} ({result['error']}){C_END}")
+                results['failed'] += 1
+                
+    if pool:
+        pool_results = pool.close()
+        results['success'] += pool_results['success']
+        results['failed'] += pool_results['failed']
+        results['skipped'] += pool_results['skipped']
+        
+    elapsed = time.time() - started
+    print(f"\n{C_BOLD}배치 작업 완료: 성공 {results['success']}건, 실패 {results['failed']}건, "
+          f"건너뜀 {results['skipped']}건 ({elapsed:.1f}초){C_END}")
+    get_metadata_store().evict_cache()
+    print_gemini_cache_stats()
+    print_quota_status()
+    if stage_metrics:
+        print("단계별 소요 시간:")
+        print_stage_stats()
+    if wait_stats:
+        print("브라우저 단계별 대기 시간:")
+        print_wait_stats()
+    if browser_metrics:
+        print("브라우저 지표:")
+        print_browser_metrics()
+    write_metrics()
+    return results
+
+
+def run_daemon(publisher, args):
+    """작업 원본(--batch 파일, --sheet 시트)을 주기적으로 다시 읽어 새 작업을 처리하는 상주 모드
+    
+    주기마다 run_batch로 처리하고, 작업이 없을 때도 브라우저 메모리/핸들을 확인해서 기준을 넘었으면 재시작한다.
+    이미 발행한 입력은 작업 저장소 기준으로 건너뛰고, 할당량 때문에 미룬 입력은 다음 주기에 다시 시도한다.
+    publisher가 None이면 주기마다 BrowserPool이 브라우저를 새로 띄운다. Ctrl+C로 종료한다.
+    """
+    interval = max(1, args.poll_interval)
+    totals = {'success': 0, 'failed': 0, 'skipped': 0}
+    cycle = 0
+    started = time.time()
+    print(f"\n{C_BOLD}상주 모드 시작: {interval}초마다 작업 원본 확인 (Ctrl+C로 종료){C_END}")
+    
+    try:
+        while True:
+            cycle += 1
+            print(f"\n{C_BOLD}=== 상주 모드 {cycle}번째 확인 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) ==={C_END}")
+            # 시트는 이전 주기의 상태를 기록한 뒤 처리할 행을 다시 읽음
+            close_sheet_source()
+            queries = collect_queries(args)
+            if queries:
+                results = run_batch(publisher, queries, workers=max(1, args.workers), stream=args.stream,
+                                    browsers=1 if publisher else args.browsers, lean=args.lean,
+                                    retry_uncertain=args.retry_uncertain)
+                for key in totals:
+                    totals[key] += results[key]
+            elif queries is not None:
+                print("처리할 새 작업이 없습니다.")
+                
+            if isinstance(publisher, SeleniumPublisher):
+                # 발행이 없던 주기에도 기준을 넘은 브라우저는 다음 작업 전에 미리 재시작
+                publisher.recycle_if_needed()
+                usage = get_browser_usage(publisher.driver) if publisher.driver else None
+                if usage:
+                    print(f"브라우저: 메모리 {usage['rss_mb']}MB, 핸들 {usage['handles']}개, "
+                          f"프로세스 {usage['processes']}개 (재시작 {publisher.watchdog.recycles}회)")
+                    
+            hours = (time.time() - started) / 3600
+            print(f"누적: 성공 {totals['success']}건, 실패 {totals['failed']}건, 건너뜀 {totals['skipped']}건 "
+                  f"({hours:.1f}시간, 시간당 {totals['success'] / max(hours, 1 / 60):.1f}건)")
+            print(f"다음 확인까지 {interval}초 대기합니다.")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print(f"\n{C_BOLD}상주 모드를 종료합니다. ({cycle}번 확인){C_END}")
+    return totals
+
+
+def add_common_args(parser, suppress=False, options=None):
+    """공통 옵션 추가
+    
+    suppress=True이면 하위 명령에서 생략한 옵션이 상위 값을 덮어쓰지 않도록 기본값을 두지 않는다.
+    options를 주면 그 옵션만 추가한다. (단계별 하위 명령이 쓰지 않는 옵션을 받아서 조용히 무시하지 않도록)
+    """
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+        
+    def add(*flags, **kwargs):
+        if options is None or flags[0] in options:
+            parser.add_argument(*flags, **kwargs)
             
-    except Exception as e:
-        print(f"티스토리 글 작성 중 오류 발생: {str(e)}")
-        return False
+    add('--batch', metavar='FILE', default=default(None), help='URL/검색어 목록 파일 (한 줄에 하나씩)로 비대화형 배치 실행')
+    add('--sheet', nargs='?', const=SHEET_ID or '', default=default(None), metavar='SPREADSHEET_ID',
+        help='구글 시트의 처리할 행으로 배치 실행하고 진행 상태를 시트에 기록 (ID 생략 시 SHEET_ID)')
+    add('--workers', type=int, default=default(BATCH_WORKERS), help=f'수집/생성 동시 작업 수 (기본값: {BATCH_WORKERS})')
+    add('--browsers', type=int, default=default(PUBLISH_BROWSERS), help=f'배치 모드에서 동시에 발행할 브라우저 수 (기본값: {PUBLISH_BROWSERS})')
+    add('--publisher', choices=['selenium', 'http'], default=default(PUBLISHER), help=f'발행 백엔드 (기본값: {PUBLISHER}, http는 저장된 로그인 세션 필요)')
+    add('--lean', action='store_true', default=default(BROWSER_LEAN), help='헤드리스 경량 브라우저 사용 (이미지/폰트/광고 차단, 렌더러 메모리 상한)')
+    add('--no-gemini-cache', action='store_true', default=default(False), help='캐시된 Gemini 응답을 사용하지 않고 새로 생성')
+    add('--digest', type=int, default=default(GEMINI_DIGEST_SIZE), metavar='N',
+        help=f'동시에 생성 중인 영상 최대 N개를 한 번의 Gemini 요청으로 묶어서 생성 (기본값: {GEMINI_DIGEST_SIZE}, 1이면 사용 안 함)')
+    add('--stream', action='store_true', default=default(GEMINI_STREAM), help='Gemini 스트리밍 생성 사용 (제목이 나오는 즉시 입력, 멈춘 스트림은 중단)')
+    add('--retry-uncertain', action='store_true', default=default(False), help='발행 도중 중단되어 발행 여부를 알 수 없는 작업도 다시 발행')
+    add('--rank', action='store_true', default=default(SEARCH_RANK), help='검색 결과 첫 번째 영상 대신 후보 전체를 점수로 비교해서 선택')
+    add('--per-query', type=int, default=default(SEARCH_PER_QUERY), help=f'검색어 하나로 만들 포스트 수, 점수 상위 N개 영상 (기본값: {SEARCH_PER_QUERY})')
+    add('--search-pages', type=int, default=default(SEARCH_PAGES), help=f'순위 모드에서 후보를 모을 검색 결과 페이지 수 (기본값: {SEARCH_PAGES}, 페이지마다 할당량 100)')
+    add('--allow-duplicates', action='store_true', default=default(False), help='이미 발행한 영상과 같거나 비슷한 영상도 생성/발행')
+
+
+# 단계별 하위 명령이 실제로 사용하는 공통 옵션 (run/daemon은 전부 사용)
+STAGE_COMMAND_OPTIONS = {
+    'fetch': ('--batch', '--sheet', '--rank', '--per-query', '--search-pages'),
+    'generate': ('--sheet', '--workers', '--no-gemini-cache', '--digest', '--stream', '--allow-duplicates'),
+    'render': ('--sheet',),
+    'publish': ('--sheet', '--publisher', '--lean', '--retry-uncertain'),
+}
+
+
+def parse_args():
+    """명령행 인자 처리
+    
+    하위 명령 없이 실행하면 기존처럼 대화형(또는 --batch) 모드로 동작하고,
+    fetch/generate/render/publish는 작업 저장소를 거쳐 한 단계씩 실행한다.
+    """
+    parser = argparse.ArgumentParser(description='YouTube 영상 기반 티스토리 자동 포스팅 도구')
+    add_common_args(parser)
+    parser.add_argument('--jobs', action='store_true', help='배치 작업 저장소의 단계별 진행 상태를 출력하고 종료')
+    parser.add_argument('--quota', action='store_true', help='YouTube/Gemini/티스토리 할당량의 오늘 사용량과 남은 양을 출력하고 종료')
+    parser.add_argument('--videos', metavar='YYYY-MM-DD', help='해당 날짜에 수집한 영상과 글 생성 여부를 출력하고 종료')
+    parser.set_defaults(command=None, queries=[])
+    
+    subparsers = parser.add_subparsers(dest='command', metavar='명령')
+    commands = {
+        'fetch': '영상 정보만 수집해서 작업 저장소에 기록',
+        'generate': '수집된 작업의 Gemini 콘텐츠 생성',
+        'render': '생성된 마크다운을 제목/HTML로 변환',
+        'publish': '변환된 작업을 티스토리에 발행',
+        'run': '수집부터 발행까지 전체 파이프라인 실행 (--batch와 같음)',
+        'daemon': '--batch 파일 또는 --sheet 시트를 주기적으로 다시 읽어 계속 실행 (브라우저 메모리 감시/재시작)'
+    }
+    for name, help_text in commands.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        add_common_args(subparser, suppress=True, options=STAGE_COMMAND_OPTIONS.get(name))
+        if name in ('fetch', 'run'):
+            subparser.add_argument('queries', nargs='*', metavar='URL_OR_QUERY', help='YouTube URL 또는 검색어')
+        if name == 'daemon':
+            subparser.add_argument('--poll-interval', type=int, default=DAEMON_POLL_INTERVAL, metavar='SECONDS',
+                                   help=f'작업 원본을 다시 읽는 간격(초) (기본값: {DAEMON_POLL_INTERVAL})')
+    return parser.parse_args()
+
+
+def apply_search_args(args):
+    """검색 결과 순위 옵션을 공유 순위 계산기에 반영"""
+    ranker = get_search_ranker()
+    ranker.per_query = max(1, args.per_query)
+    ranker.pages = max(1, args.search_pages)
+    ranker.enabled = args.rank or ranker.per_query > 1
+
+
+def collect_queries(args):
+    """명령행 인자, --batch 파일, --sheet 시트의 URL/검색어를 합쳐서 반환 (읽을 수 없으면 None)"""
+    queries = list(args.queries)
+    if args.batch:
+        try:
+            queries += read_batch_file(args.batch)
+        except Exception as e:
+            print(f"{C_RED}오류: 배치 파일을 읽을 수 없습니다: {str(e)}{C_END}")
+            return None
+    if args.sheet is not None:
+        if not args.sheet:
+            print(f"{C_RED}오류: 시트 ID가 없습니다. --sheet ID 또는 SHEET_ID를 설정하세요.{C_END}")
+            return None
+        try:
+            queries += open_sheet_source(args.sheet)
+        except Exception as e:
+            print(f"{C_RED}오류: 시트를 읽을 수 없습니다: {str(e)}{C_END}")
+            return None
+    return queries
+
+
+def run_stage_command(args):
+    """fetch/generate/render 하위 명령 실행 (각 단계에 필요한 라이브러리만 불러옴)"""
+    if not get_job_store():
+        print(f"{C_RED}오류: 단계별 실행에는 작업 저장소가 필요합니다. (JOB_DB){C_END}")
+        return None
+        
+    # 시트 입력이면 단계 결과도 시트에 기록되도록 먼저 행 목록을 읽어둠
+    if args.command != 'fetch' and args.sheet is not None and collect_queries(args) is None:
+        return None
+        
+    if args.command == 'fetch':
+        queries = collect_queries(args)
+        if queries is None:
+            return None
+        if not queries:
+            print(f"{C_RED}오류: 수집할 URL/검색어가 없습니다.{C_END}")
+            return None
+        results = fetch_stage(queries)
+    elif args.command == 'generate':
+        if not GEMINI_API_KEY:
+            print(f"{C_RED}오류: Gemini API 키가 설정되지 않았습니다.{C_END}")
+            return None
+        if args.no_gemini_cache:
+            get_gemini_cache().bypass = True
+        set_digest_size(args.digest)
+        if args.allow_duplicates:
+            get_duplicate_index().enabled = False
+        results = generate_stage(max(1, args.workers), args.stream)
+    else:
+        results = render_stage()
+        
+    write_metrics()
+    return results
 
 
 def main():
     """메인 함수"""
     
+    args = parse_args()
+    
+    if args.jobs:
+        print_job_status()
+        return
+    
+    if args.videos:
+        print_video_records(args.videos)
+        return
+    
+    if args.quota:
+        print_quota_status()
+        return
+    
+    apply_search_args(args)
+    
+    # 브라우저가 필요 없는 단계는 환경 확인과 브라우저 초기화 없이 바로 실행
+    if args.command in ('fetch', 'generate', 'render'):
+        run_stage_command(args)
+        return
+    
     print(f"\n{C_BOLD}{C_BGGREEN}{C_BLACK} YouTube 영상 기반 티스토리 자동 포스팅 도구 {C_END}")
     print(f"{C_BOLD}=== 환경 설정 확인 ==={C_END}")
     
@@ -539,7 +4220,7 @@ def main():
     if not YOUTUBE_API_KEY:
         print(f"{C_RED}경고: YouTube API 키가 설정되지 않았습니다. 영상 URL을 직접 입력해야 합니다.{C_END}")
     
-    if not GEMINI_API_KEY:
+    if not GEMINI_API_KEY and args.command != 'publish':
         print(f"{C_RED}경고: Gemini API 키가 설정되지 않았습니다. 콘텐츠 생성이 불가능합니다.{C_END}")
         return
     
@@ -547,15 +4228,74 @@ def main():
         print(f"{C_RED}경고: 카카오 로그인 정보가 설정되지 않았습니다. 티스토리 로그인이 불가능합니다.{C_END}")
         return
     
-    # 웹드라이버 초기화
-    driver = init_driver()
-    if not driver:
-        print(f"{C_RED}오류: 웹드라이버를 초기화할 수 없습니다.{C_END}")
+    if args.no_gemini_cache:
+        get_gemini_cache().bypass = True
+    
+    set_digest_size(args.digest)
+    
+    if args.allow_duplicates:
+        get_duplicate_index().enabled = False
+    
+    if args.command == 'publish' and not get_job_store():
+        print(f"{C_RED}오류: 단계별 실행에는 작업 저장소가 필요합니다. (JOB_DB){C_END}")
+        return
+    
+    # 상주 모드는 주기마다 작업 원본을 다시 읽으므로 원본이 있는지만 확인
+    if args.command == 'daemon' and not args.batch and args.sheet is None:
+        print(f"{C_RED}오류: 상주 모드에는 --batch 파일 또는 --sheet가 필요합니다.{C_END}")
+        return
+    
+    # 배치 입력 파일 확인 (브라우저를 띄우기 전에)
+    queries = None
+    if args.command != 'daemon' and (args.batch or args.sheet is not None or args.command == 'run'):
+        queries = collect_queries(args)
+        if queries is None:
+            return
+        if not queries and args.command != 'publish':
+            print(f"{C_RED}오류: 처리할 항목이 없습니다.{C_END}")
+            return
+    
+    # 여러 브라우저로 발행하는 배치는 각 작업자가 브라우저를 직접 띄운다
+    if args.command == 'daemon' and args.publisher == 'selenium' and args.browsers > 1:
+        run_daemon(None, args)
+        return
+    if queries and args.command != 'publish' and args.publisher == 'selenium' and args.browsers > 1:
+        run_batch(None, queries, workers=max(1, args.workers), stream=args.stream,
+                  browsers=args.browsers, lean=args.lean, retry_uncertain=args.retry_uncertain)
         return
     
+    # 발행 백엔드 초기화
+    if args.publisher == 'http':
+        publisher = HttpPublisher()
+        if not publisher.ready:
+            print(f"{C_RED}오류: 저장된 로그인 세션이 없습니다. 먼저 브라우저로 한 번 로그인하세요.{C_END}")
+            return
+    else:
+        # 웹드라이버 초기화
+        driver = init_driver(lean=args.lean)
+        if not driver:
+            print(f"{C_RED}오류: 웹드라이버를 초기화할 수 없습니다.{C_END}")
+            return
+        publisher = SeleniumPublisher(driver, lean=args.lean)
+    
     try:
         # 티스토리 로그인
-        tistory_login(driver)
+        if isinstance(publisher, SeleniumPublisher):
+            tistory_login(publisher.driver)
+        
+        if args.command == 'publish':
+            publish_stage(publisher, args.retry_uncertain)
+            write_metrics()
+            return
+        
+        if args.command == 'daemon':
+            run_daemon(publisher, args)
+            return
+        
+        if queries:
+            run_batch(publisher, queries, workers=max(1, args.workers), stream=args.stream,
+                      retry_uncertain=args.retry_uncertain)
+            return
         
         while True:
             print(f"\n{C_BOLD}=== 작업 선택 ==={C_END}")
@@ -567,14 +4307,14 @@ def main():
             
             if choice == "1":
                 video_url = input("YouTube 영상 URL을 입력하세요: ")
-                json_file = search_youtube(video_url)
+                video_data = search_youtube(video_url)
                 
-                if json_file:
-                    print(f"\n{C_BOLD}YouTube 정보를 저장했습니다: {json_file}{C_END}")
+                if video_data:
+                    print(f"\n{C_BOLD}YouTube 정보를 저장했습니다: {video_data['title']} ({video_data['video_id']}){C_END}")
                     
                     # 티스토리에 포스팅
                     print(f"\n{C_BOLD}티스토리에 포스팅을 시작합니다...{C_END}")
-                    success = tistory_write(driver, json_file)
+                    success = write_post(publisher, video_data, stream=args.stream)
                     
                     if success:
                         print(f"{C_GREEN}포스팅이 완료되었습니다!{C_END}")
@@ -585,14 +4325,14 @@ def main():
                     
             elif choice == "2":
                 search_query = input("YouTube 검색어를 입력하세요: ")
-                json_file = search_youtube(search_query)
+                video_data = search_youtube(search_query)
                 
-                if json_file:
-                    print(f"\n{C_BOLD}YouTube 정보를 저장했습니다: {json_file}{C_END}")
+                if video_data:
+                    print(f"\n{C_BOLD}YouTube 정보를 저장했습니다: {video_data['title']} ({video_data['video_id']}){C_END}")
                     
                     # 티스토리에 포스팅
                     print(f"\n{C_BOLD}티스토리에 포스팅을 시작합니다...{C_END}")
-                    success = tistory_write(driver, json_file)
+                    success = write_post(publisher, video_data, stream=args.stream)
                     
                     if success:
                         print(f"{C_GREEN}포스팅이 완료되었습니다!{C_END}")
@@ -602,6 +4342,7 @@ def main():
                     print(f"{C_RED}YouTube 정보를 가져오는 데 실패했습니다.{C_END}")
                     
             elif choice == "3":
+                print_gemini_cache_stats()
                 print(f"{C_BOLD}프로그램을 종료합니다.{C_END}")
                 break
                 
@@ -611,10 +4352,13 @@ def main():
     except Exception as e:
         print(f"{C_RED}예상치 못한 오류가 발생했습니다: {str(e)}{C_END}")
     finally:
-        # 브라우저 종료
-        if driver:
-            driver.quit()
+        # 브라우저/세션 종료
+        publisher.close()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # 시트에 아직 기록하지 않은 상태가 있으면 기록
+        close_sheet_source()
\ No newline at end of file